@@ -0,0 +1,169 @@
+# bench/fakes.py
+# 실제 cog 코드를 디스코드 연결 없이 실행하기 위한 가짜 Discord 계층과 봇
+
+import asyncio
+import itertools
+
+import discord
+
+from core.database import Database
+from core.dm import DMDispatcher
+from core.guilds import GuildStates
+from core.journal import Journal
+from core.memory_backend import MemorySupabase
+from core.metrics import Metrics
+from core.resolver import UserResolver
+from core.throttle import Throttle
+
+_ids = itertools.count(10_000)
+
+class FakeUser:
+    def __init__(self, user_id: int, discord_latency: float = 0.0):
+        self.id = user_id
+        self.name = f"user{user_id}"
+        self.display_name = self.name
+        self.mention = f"<@{user_id}>"
+        self.discord_latency = discord_latency
+        self.dms = []
+
+    async def send(self, content=None, **kwargs):
+        await asyncio.sleep(self.discord_latency)
+        self.dms.append(content or kwargs)
+
+class FakeMessage:
+    def __init__(self, channel, content=None, embed=None, discord_latency: float = 0.0):
+        self.id = next(_ids)
+        self.channel = channel
+        self.content = content
+        self.embeds = [embed] if embed else []
+        self.discord_latency = discord_latency
+        self.edits = 0
+
+    async def edit(self, content=None, embed=None, **kwargs):
+        await asyncio.sleep(self.discord_latency)
+        self.edits += 1
+        if embed:
+            self.embeds = [embed]
+
+class FakeChannel:
+    def __init__(self, discord_latency: float = 0.0):
+        self.id = next(_ids)
+        self.discord_latency = discord_latency
+        self.messages = {}
+
+    async def send(self, content=None, embed=None, **kwargs):
+        await asyncio.sleep(self.discord_latency)
+        message = FakeMessage(self, content, embed, self.discord_latency)
+        self.messages[message.id] = message
+        return message
+
+    def get_partial_message(self, message_id: int):
+        return self.messages[message_id]
+
+class FakeGuild:
+    def __init__(self, members: dict, guild_id: int = None):
+        self.id = guild_id or next(_ids)
+        self.name = f"guild{self.id}"
+        self.members = members
+        self.chunked = True
+
+    def get_member(self, user_id: int):
+        return self.members.get(user_id)
+
+class FakeResponse:
+    def __init__(self, interaction):
+        self.interaction = interaction
+        self._done = False
+
+    def is_done(self) -> bool:
+        return self._done
+
+    async def defer(self, ephemeral: bool = False, thinking: bool = False):
+        await asyncio.sleep(self.interaction.discord_latency)
+        self._done = True
+
+    async def send_message(self, content=None, embed=None, **kwargs):
+        await asyncio.sleep(self.interaction.discord_latency)
+        self._done = True
+        self.interaction._original = FakeMessage(self.interaction.channel, content, embed, self.interaction.discord_latency)
+        self.interaction.channel.messages[self.interaction._original.id] = self.interaction._original
+        self.interaction.replies.append(content or embed)
+
+class FakeFollowup:
+    def __init__(self, interaction):
+        self.interaction = interaction
+
+    async def send(self, content=None, embed=None, wait: bool = False, **kwargs):
+        message = await self.interaction.channel.send(content, embed=embed)
+        self.interaction.replies.append(content or embed)
+        return message
+
+class FakeInteraction:
+    def __init__(self, user: FakeUser, guild: FakeGuild, channel: FakeChannel, message: FakeMessage = None, discord_latency: float = 0.0):
+        self.id = next(_ids)
+        self.user = user
+        self.guild = guild
+        self.guild_id = guild.id
+        self.channel = channel
+        self.message = message
+        self.discord_latency = discord_latency
+        self.response = FakeResponse(self)
+        self.followup = FakeFollowup(self)
+        self.replies = []
+        self._original = None
+
+    async def original_response(self):
+        return self._original
+
+    async def edit_original_response(self, **kwargs):
+        await self._original.edit(**kwargs)
+
+# bot.py 의 ValorantBot 과 같은 구성 요소를 인메모리 백엔드 위에 조립한 봇
+class FakeBot:
+    def __init__(self, backend: MemorySupabase, members: dict, discord_latency: float = 0.0, guild_ids=(1,)):
+        self.supabase = backend
+        self.members = members
+        self.discord_latency = discord_latency
+        self.channel = FakeChannel(discord_latency)
+        self.guilds = [FakeGuild(members, guild_id) for guild_id in guild_ids]
+        self.guild = self.guilds[0]
+        self.shard_count = 1
+        self.metrics = Metrics()
+        self.db = Database(backend, metrics=self.metrics)
+        self.throttle = Throttle({}, metrics=self.metrics)
+        self.journal = Journal(':memory:')
+        self.guild_states = GuildStates(self, cache_size=4096, board_interval=1.0)
+        self.user_resolver = UserResolver(self)
+        self.dm_dispatcher = DMDispatcher(self)
+
+    async def start(self):
+        for guild in self.guilds:
+            await self.guild_states.get(guild.id)
+
+    def get_guild(self, guild_id: int):
+        return next((guild for guild in self.guilds if guild.id == guild_id), None)
+
+    def get_user(self, user_id: int):
+        return self.members.get(user_id)
+
+    async def fetch_user(self, user_id: int):
+        await asyncio.sleep(self.discord_latency)
+        if user_id not in self.members:
+            raise discord.NotFound(_FakeHTTPResponse(404), "Unknown User")
+        return self.members[user_id]
+
+    def get_channel(self, channel_id: int):
+        return self.channel if channel_id == self.channel.id else None
+
+    def interaction(self, user_id: int, message: FakeMessage = None, guild_id: int = None) -> FakeInteraction:
+        guild = self.get_guild(guild_id) if guild_id else self.guild
+        return FakeInteraction(self.members[user_id], guild, self.channel, message, self.discord_latency)
+
+    def close(self):
+        self.db.close()
+        self.journal.close()
+
+class _FakeHTTPResponse:
+    def __init__(self, status: int):
+        self.status = status
+        self.reason = "Not Found"
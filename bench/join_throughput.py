@@ -0,0 +1,49 @@
+# bench/join_throughput.py
+# 로컬 인메모리 백엔드로 '내전 참여' 배치 파이프라인의 처리량을 측정합니다.
+# 실행: python -m bench.join_throughput [클릭 수]
+
+import asyncio
+import sys
+import time
+
+from core.database import Database
+from core.join_batcher import JOINED, JoinBatcher
+from core.journal import Journal, JournalWriter
+from core.memory_backend import MemorySupabase
+from core.penalties import PenaltyScheduler
+from core.queue_store import QueueStore
+from core.ranking import RankingIndex
+from core.repositories import PlayerRepository, QueueRepository
+
+GUILD_ID = 1
+
+async def main(clicks: int):
+    backend = MemorySupabase({'players': [{'guild_id': GUILD_ID, 'id': player_id} for player_id in range(clicks)]})
+    db = Database(backend)
+    player_repo = PlayerRepository(db, GUILD_ID)
+    journal = Journal(':memory:')
+    writer = JournalWriter(journal, GUILD_ID)
+    queue_store = QueueStore(QueueRepository(db, GUILD_ID), writer)
+    ranking = RankingIndex(player_repo)
+    penalties = PenaltyScheduler(player_repo)
+    await queue_store.load()
+    await ranking.load()
+    await penalties.load()
+    writer.start()
+    batcher = JoinBatcher(ranking, penalties, queue_store)
+    batcher.start()
+
+    started = time.perf_counter()
+    results = await asyncio.gather(*(batcher.submit(player_id) for player_id in range(clicks)))
+    elapsed = time.perf_counter() - started
+    await queue_store.flush()
+
+    joined = sum(result.status == JOINED for result in results)
+    in_order = [result.position for result in results] == list(range(1, clicks + 1))
+    print(f"클릭 {clicks}건 / {elapsed * 1000:.1f}ms -> {clicks / elapsed:,.0f} joins/s")
+    print(f"등록 {joined}건, 클릭 순서 유지: {in_order}, DB 왕복 {backend.round_trips}회, DB 대기열 {len(backend.tables['queue'])}행")
+    db.close()
+    journal.close()
+
+if __name__ == '__main__':
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else 300))
@@ -0,0 +1,130 @@
+# bench/run.py
+# 실제 cog(JoinView.join_button, /내전종료, /포인트, /랭킹)를 인메모리 Supabase 와 가짜 Discord 계층으로 부하 테스트합니다.
+# 실행: python -m bench.run --clicks 300 --db-latency 0.03 --discord-latency 0.05
+
+import argparse
+import asyncio
+import statistics
+import time
+
+from cogs.events import JoinView
+from cogs.management import Management
+from cogs.registration import Registration
+from core.memory_backend import MemorySupabase
+
+from .fakes import FakeBot, FakeUser
+
+# 이벤트 루프 지연(블로킹) 측정기: 주기적으로 잠들었다 깨어나며 예정보다 늦어진 시간을 기록합니다.
+class LoopLagMonitor:
+    def __init__(self, interval: float = 0.005):
+        self.interval = interval
+        self.samples = []
+        self._task = None
+
+    def start(self):
+        self._task = asyncio.create_task(self._run())
+
+    def stop(self):
+        self._task.cancel()
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            started = loop.time()
+            await asyncio.sleep(self.interval)
+            self.samples.append(loop.time() - started - self.interval)
+
+def percentile(values: list, pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+class Recorder:
+    def __init__(self, backend: MemorySupabase):
+        self.backend = backend
+        self.rows = {}  # 명령 -> [지연 목록, DB 왕복 합계]
+
+    async def measure(self, name: str, calls):
+        # calls: 동시에 실행할 코루틴 목록. 각 호출의 지연과 명령어당 DB 왕복 수를 기록합니다.
+        latencies = []
+
+        async def timed(coro):
+            started = time.perf_counter()
+            await coro
+            latencies.append(time.perf_counter() - started)
+
+        round_trips = self.backend.round_trips
+        await asyncio.gather(*(timed(coro) for coro in calls))
+        row = self.rows.setdefault(name, [[], 0])
+        row[0].extend(latencies)
+        row[1] += self.backend.round_trips - round_trips
+
+    def report(self, lag: LoopLagMonitor):
+        print(f"{'명령':<14}{'횟수':>6}{'p50(ms)':>10}{'p95(ms)':>10}{'p99(ms)':>10}{'max(ms)':>10}{'DB왕복/회':>11}")
+        for name, (latencies, round_trips) in self.rows.items():
+            ms = [value * 1000 for value in latencies]
+            print(f"{name:<14}{len(ms):>6}{percentile(ms, 50):>10.1f}{percentile(ms, 95):>10.1f}{percentile(ms, 99):>10.1f}{max(ms):>10.1f}{round_trips / len(ms):>11.2f}")
+        lags = [value * 1000 for value in lag.samples]
+        blocked = sum(value for value in lags if value > 5)
+        print(f"\n이벤트 루프 지연: p50 {percentile(lags, 50):.2f}ms / p99 {percentile(lags, 99):.2f}ms / max {max(lags, default=0):.2f}ms / 5ms 초과 누적 {blocked:.1f}ms")
+        print(f"DB 왕복 (대상별): {dict(sorted(self.backend.round_trips_by_target.items()))}")
+
+GUILD_ID, OTHER_GUILD_ID = 1, 2
+
+async def main(args):
+    player_ids = list(range(1, args.clicks + 1))
+    players = [{'guild_id': guild_id, 'id': player_id, 'points': player_id % 50} for guild_id in (GUILD_ID, OTHER_GUILD_ID) for player_id in player_ids]
+    backend = MemorySupabase({'players': players}, latency=args.db_latency)
+    members = {player_id: FakeUser(player_id, args.discord_latency) for player_id in player_ids}
+    bot = FakeBot(backend, members, args.discord_latency, guild_ids=(GUILD_ID, OTHER_GUILD_ID))
+    await bot.start()
+    management, registration = Management(bot), Registration(bot)
+    recorder = Recorder(backend)
+    lag = LoopLagMonitor()
+    lag.start()
+
+    # 1. 모집 메시지 게시 후 동시 클릭 폭주, 같은 시각 다른 서버의 /포인트 (동시 실행이므로 DB 왕복은 두 행에 겹쳐 집계됩니다)
+    recruit = bot.interaction(player_ids[0])
+    await Management.recruit_command.callback(management, recruit, "벤치마크 내전")
+    recruit_message = await recruit.original_response()
+    view = JoinView(bot)
+    await asyncio.gather(
+        recorder.measure("join_button", [view.join_button.callback(bot.interaction(player_id, recruit_message)) for player_id in player_ids]),
+        recorder.measure("/포인트 (다른 서버)", [Registration.my_points_command.callback(registration, bot.interaction(player_id, guild_id=OTHER_GUILD_ID)) for player_id in player_ids[:args.reads]]),
+    )
+    # 클릭 폭주 동안의 대기열 변경은 현황판 수정 간격이 지난 뒤 한 번의 수정으로 반영됩니다.
+    state = bot.guild_states.loaded(GUILD_ID)
+    await asyncio.sleep(state.queue_board.interval + 0.1)
+    print(f"클릭 {len(player_ids)}건 후 모집 메시지 수정 {recruit_message.edits}회")
+
+    # 2. 플레이어 조회 명령어
+    await recorder.measure("/포인트", [Registration.my_points_command.callback(registration, bot.interaction(player_id)) for player_id in player_ids[:args.reads]])
+    await recorder.measure("/랭킹", [Registration.rank_command.callback(registration, bot.interaction(player_id)) for player_id in player_ids[:args.reads]])
+
+    # 3. 내전 종료 (10명씩 정산, 순차 실행)
+    for _ in range(args.matches):
+        await recorder.measure("/내전종료", [Management.end_civil_war_command.callback(management, bot.interaction(player_ids[0]), 10, 10)])
+
+    # 4. 동시 진행 로비: 대기열 앞쪽으로 여러 로비를 만들고, 경기 중인 유저의 클릭을 처리한 뒤 로비별 정산을 동시에 실행합니다.
+    await recorder.measure("/로비생성", [Management.create_lobby_command.callback(management, bot.interaction(player_ids[0]), args.lobbies)])
+    lobby_ids = [lobby.id for lobby in state.lobbies]
+    in_play = [player_id for lobby in state.lobbies for player_id in lobby.player_ids]
+    await recorder.measure("join_button (경기 중)", [view.join_button.callback(bot.interaction(player_id, recruit_message)) for player_id in in_play[:args.reads]])
+    await recorder.measure("/내전종료 로비", [Management.end_civil_war_command.callback(management, bot.interaction(player_ids[0]), None, 10, lobby_id) for lobby_id in lobby_ids])
+
+    await bot.guild_states.flush()
+    lag.stop()
+    recorder.report(lag)
+    print(f"현황판 수정 {state.queue_board.edits}회, 남은 대기열 {len(state.queue_store)}명, 다른 서버 대기열 {len(bot.guild_states.loaded(OTHER_GUILD_ID).queue_store)}명")
+    bot.close()
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="valpassbot 부하 테스트")
+    parser.add_argument('--clicks', type=int, default=300, help="동시에 '내전 참여'를 누르는 인원")
+    parser.add_argument('--reads', type=int, default=100, help="/포인트, /랭킹 동시 호출 수")
+    parser.add_argument('--matches', type=int, default=5, help="연속으로 처리할 /내전종료 횟수")
+    parser.add_argument('--lobbies', type=int, default=3, help="동시에 진행할 로비 수")
+    parser.add_argument('--db-latency', type=float, default=0.03, help="DB 요청당 지연(초)")
+    parser.add_argument('--discord-latency', type=float, default=0.05, help="Discord API 호출당 지연(초)")
+    asyncio.run(main(parser.parse_args()))
@@ -1,18 +1,61 @@
 # bot.py 
 
+import asyncio
 import os
+import time
 import discord
+from discord import app_commands
 from discord.ext import commands
 from dotenv import load_dotenv
 from supabase import create_client, Client
 
+from core.change_feed import ChangeFeedSync, RealtimeChangeFeed
+from core.command_sync import sync_if_changed
+from core.database import Database
+from core.dm import DMDispatcher
+from core.guilds import GuildStates
+from core.journal import Journal
+from core.metrics import Metrics, MetricsServer
+from core.resolver import UserResolver
+from core.throttle import Throttle
+
 # --- 1. 환경 변수 로드 및 클라이언트 초기화 ---
 load_dotenv()
 DISCORD_TOKEN = os.getenv("DISCORD_TOKEN")
 SUPABASE_URL = os.getenv("SUPABASE_URL")
 SUPABASE_KEY = os.getenv("SUPABASE_KEY")
+# DB 동시 요청 수 제한과 요청당 타임아웃(초)
+DB_MAX_CONCURRENCY = int(os.getenv("DB_MAX_CONCURRENCY", "8"))
+DB_TIMEOUT = float(os.getenv("DB_TIMEOUT", "10"))
+# 서버별 플레이어 정보 캐시 크기와 유효 시간(초)
+PLAYER_CACHE_SIZE = int(os.getenv("PLAYER_CACHE_SIZE", "2048"))
+PLAYER_CACHE_TTL = float(os.getenv("PLAYER_CACHE_TTL", "600"))
+# 동시에 보내는 DM 수
+DM_CONCURRENCY = int(os.getenv("DM_CONCURRENCY", "5"))
+# '내전 참여' 클릭을 모아 처리하는 구간(초)과 배치당 최대 인원
+JOIN_BATCH_WINDOW = float(os.getenv("JOIN_BATCH_WINDOW", "0.02"))
+JOIN_BATCH_MAX = int(os.getenv("JOIN_BATCH_MAX", "500"))
+# DB 외부 변경을 실시간으로 받아 로컬 상태에 반영할지 여부
+REALTIME_ENABLED = os.getenv("REALTIME_ENABLED", "1") == "1"
+# 모집 메시지 대기열 현황판의 최소 수정 간격(초)
+QUEUE_BOARD_INTERVAL = float(os.getenv("QUEUE_BOARD_INTERVAL", "5"))
+# 지표 노출 포트 (127.0.0.1 전용, 0이면 사용 안 함)
+METRICS_PORT = int(os.getenv("METRICS_PORT", "9091"))
+# 마지막으로 동기화한 슬래시 커맨드 트리의 해시를 저장할 파일, 1이면 바뀌지 않았어도 동기화
+COMMAND_HASH_FILE = os.getenv("COMMAND_HASH_FILE", ".command_tree_hash")
+FORCE_COMMAND_SYNC = os.getenv("FORCE_COMMAND_SYNC", "0") == "1"
+# 대기열/정산 변경을 DB 반영 전에 기록하는 로컬 저널 파일 (SQLite)
+JOURNAL_PATH = os.getenv("JOURNAL_PATH", "valpassbot_journal.sqlite3")
+# 전적 집계 시즌 이름 (예: 2026-S1), 비우면 한국 시간 기준 분기 단위 ('2026-Q4')
+SEASON = os.getenv("SEASON") or None
+# 유저별 요청 제한: 초당 충전 횟수와 연속 허용 횟수 ('내전 참여' 버튼 / 그 외 조회 명령어)
+THROTTLE_JOIN_RATE = float(os.getenv("THROTTLE_JOIN_RATE", "0.5"))
+THROTTLE_JOIN_BURST = int(os.getenv("THROTTLE_JOIN_BURST", "3"))
+THROTTLE_COMMAND_RATE = float(os.getenv("THROTTLE_COMMAND_RATE", "0.2"))
+THROTTLE_COMMAND_BURST = int(os.getenv("THROTTLE_COMMAND_BURST", "5"))
 
-class ValorantBot(commands.Bot):
+# 여러 서버를 지원하므로 샤드 수는 디스코드 권장값을 따릅니다. (AutoShardedBot)
+class ValorantBot(commands.AutoShardedBot):
     def __init__(self):
         intents = discord.Intents.default()
         intents.members = True
@@ -20,25 +63,116 @@ class ValorantBot(commands.Bot):
         
         # Supabase 클라이언트를 봇 인스턴스의 속성으로 추가
         self.supabase: Client = create_client(SUPABASE_URL, SUPABASE_KEY)
+        # 명령어 처리 시간, DB 왕복 수, 이벤트 루프 지연 등 런타임 지표 (/봇상태, http://127.0.0.1:METRICS_PORT/metrics)
+        self.metrics = Metrics()
+        self.metrics_server = MetricsServer(self.metrics, port=METRICS_PORT) if METRICS_PORT else None
+        # 이벤트 루프를 막지 않도록 모든 DB 호출은 아래 비동기 계층을 거칩니다.
+        self.db = Database(self.supabase, max_concurrency=DB_MAX_CONCURRENCY, timeout=DB_TIMEOUT, metrics=self.metrics)
+        # 버튼 연타/명령어 반복 요청을 유저별로 제한하고, 처리 중인 같은 요청은 하나로 합칩니다.
+        self.throttle = Throttle({'join': (THROTTLE_JOIN_RATE, THROTTLE_JOIN_BURST)}, default=(THROTTLE_COMMAND_RATE, THROTTLE_COMMAND_BURST), metrics=self.metrics)
+        # Supabase 가 느리거나 잠시 끊겨도 참여/정산이 유실되지 않도록 로컬 저널에 먼저 기록합니다.
+        self.journal = Journal(JOURNAL_PATH)
+        # 대기열, 포인트 랭킹, 페널티는 서버마다 따로 관리합니다. (core/guilds.py)
+        # - 대기열 순서/인원 조회는 메모리에서 바로 응답하고, DB 반영은 백그라운드에서 처리합니다.
+        # - /포인트, /랭킹 은 DB 전체를 읽지 않고 랭킹 인덱스에서 바로 응답합니다.
+        # - 스트라이크 누적/타임아웃 중인 유저를 메모리에 두고, 타임아웃이 끝나는 시점에 알림을 보냅니다.
+        self.guild_states = GuildStates(
+            self,
+            cache_size=PLAYER_CACHE_SIZE,
+            cache_ttl=PLAYER_CACHE_TTL,
+            board_interval=QUEUE_BOARD_INTERVAL,
+            batch_window=JOIN_BATCH_WINDOW,
+            batch_max=JOIN_BATCH_MAX,
+            season=SEASON,
+        )
+        # 유저 멘션/이름은 게이트웨이 캐시와 멤버 청킹을 우선 사용해 REST 호출을 줄입니다.
+        self.user_resolver = UserResolver(self)
+        self.dm_dispatcher = DMDispatcher(self, concurrency=DM_CONCURRENCY)
+        # 대시보드나 다른 프로세스가 DB를 바꾸면 변경 피드로 로컬 상태를 맞춥니다.
+        self.change_sync = ChangeFeedSync(RealtimeChangeFeed(SUPABASE_URL, SUPABASE_KEY), self.guild_states) if REALTIME_ENABLED else None
+        # 실패한 슬래시 커맨드도 처리 시간을 기록할 수 있도록 오류를 이벤트(on_app_command_error)로 알립니다.
+        self.tree.on_error = self._on_app_command_error
+
+    async def _on_app_command_error(self, interaction: discord.Interaction, error: app_commands.AppCommandError):
+        self.dispatch('app_command_error', interaction, error)
+        await app_commands.CommandTree.on_error(self.tree, interaction, error)
 
     async def setup_hook(self):
-        # cogs 폴더에 있는 .py 파일들을 모두 불러옵니다.
+        # 시작 단계별 소요 시간을 기록해 재시작이 느려지는 구간을 확인합니다.
+        timings = []
+        started = phase_started = time.perf_counter()
+        def phase(name: str):
+            nonlocal phase_started
+            now = time.perf_counter()
+            timings.append(f"{name} {(now - phase_started) * 1000:.0f}ms")
+            phase_started = now
+
+        # 1. 지표 엔드포인트와 변경 피드 구독을 동시에 시작합니다.
+        self.metrics.start_loop_monitor()
+        await asyncio.gather(self._start_metrics_server(), self._start_change_sync())
+        phase("지표/변경 피드")
+
+        # 2. 봇이 속한 서버들의 대기열/랭킹/페널티를 동시에 미리 불러옵니다.
+        #    (게이트웨이 연결 전이므로 서버 목록은 REST 로 한 번 조회합니다. 실패한 서버는 처음 사용할 때 다시 불러옵니다)
+        try:
+            guild_ids = [guild.id async for guild in self.fetch_guilds(limit=None)]
+            for guild_id, error in await self.guild_states.warm(guild_ids):
+                print(f"⚠️ 서버 {guild_id} 상태 불러오기 실패 (처음 사용할 때 다시 시도합니다): {error}")
+        except Exception as e:
+            print(f"⚠️ 서버 목록 조회 실패 (각 서버에서 처음 사용할 때 불러옵니다): {e}")
+        phase(f"상태 불러오기({len(self.guild_states)}곳)")
+
+        # 3. cogs 폴더에 있는 .py 파일들을 동시에 불러옵니다.
         print("--- Cogs Loading ---")
-        for filename in os.listdir('./cogs'):
-            if filename.endswith('.py'):
-                try:
-                    await self.load_extension(f'cogs.{filename[:-3]}')
-                    print(f"✅ {filename[:-3]}")
-                except Exception as e:
-                    print(f"❌ {filename[:-3]}: {e}")
+        names = sorted(filename[:-3] for filename in os.listdir('./cogs') if filename.endswith('.py'))
+        results = await asyncio.gather(*(self.load_extension(f'cogs.{name}') for name in names), return_exceptions=True)
+        for name, result in zip(names, results):
+            print(f"❌ {name}: {result}" if isinstance(result, BaseException) else f"✅ {name}")
         print("--------------------")
+        phase("cogs")
 
-        # 슬래시 커맨드를 서버에 동기화합니다.
+        # 4. 슬래시 커맨드 트리가 바뀐 경우에만 서버에 동기화합니다.
         try:
-            synced = await self.tree.sync()
-            print(f'{len(synced)}개의 슬래시 커맨드를 동기화했습니다.')
+            synced = await sync_if_changed(self.tree, COMMAND_HASH_FILE, force=FORCE_COMMAND_SYNC)
+            if synced is None:
+                print('슬래시 커맨드가 바뀌지 않아 동기화를 건너뜁니다.')
+            else:
+                print(f'{synced}개의 슬래시 커맨드를 동기화했습니다.')
         except Exception as e:
             print(f'커맨드 동기화 중 오류 발생: {e}')
+        phase("커맨드 동기화")
+
+        print(f"⏱️ 시작 준비 완료 {(time.perf_counter() - started) * 1000:.0f}ms ({', '.join(timings)})")
+
+    async def _start_metrics_server(self):
+        if self.metrics_server:
+            try:
+                await self.metrics_server.start()
+                print(f"지표 엔드포인트: http://127.0.0.1:{METRICS_PORT}/metrics")
+            except OSError as e:
+                print(f"⚠️ 지표 엔드포인트 시작 실패: {e}")
+
+    async def _start_change_sync(self):
+        if self.change_sync:
+            try:
+                await self.change_sync.start()
+            except Exception as e:
+                print(f"⚠️ 변경 피드 구독 실패 (주기적 랭킹 검증만 사용합니다): {e}")
+
+    async def close(self):
+        # 1. 변경 피드 재연결이 종료 중에(닫힌 db/journal 로) 돌지 않도록 먼저 멈춥니다.
+        if self.change_sync:
+            try:
+                await self.change_sync.stop()
+            except Exception as e:
+                print(f"변경 피드 종료 오류: {e}")
+        # 2. 남은 변경을 DB에 반영한 뒤 디스코드 연결을 닫습니다. (반영하지 못한 항목은 저널에 남습니다)
+        await self.guild_states.flush()
+        await super().close()
+        if self.metrics_server:
+            await self.metrics_server.stop()
+        self.db.close()
+        self.journal.close()
 
 bot = ValorantBot()
 
@@ -1,7 +1,10 @@
 # cogs/events.py
 
 import discord
-from discord.ext import commands
+from discord.ext import commands, tasks
+
+from core.join_batcher import ALREADY_IN_QUEUE, IN_MATCH, NOT_REGISTERED, TIMED_OUT, TOO_MANY_STRIKES
+from core.throttle import Throttled
 
 # '내전 참여' 버튼을 포함하는 View 클래스
 class JoinView(discord.ui.View):
@@ -12,49 +15,131 @@ class JoinView(discord.ui.View):
     @discord.ui.button(label="내전 대기열 참여", style=discord.ButtonStyle.success, custom_id="join_civil_war_button")
     async def join_button(self, interaction: discord.Interaction, button: discord.ui.Button):
         user_id = interaction.user.id
+        self.bot.metrics.interaction_started(interaction.id)
         await interaction.response.defer(ephemeral=True)
         try:
-            # players 테이블에서 페널티 정보를 조회합니다.
-            player_response = self.bot.supabase.table('players').select('strikes, penalty_ends_at').eq('id', user_id).single().execute()
-        
+            # 대기열은 서버마다 따로 관리됩니다.
+            state = await self.bot.guild_states.get(interaction.guild_id)
+
+            # 재시작 등으로 현황판 목록에서 빠진 모집 메시지는 클릭 시 다시 등록합니다.
+            if interaction.message and interaction.message.embeds and interaction.message.id not in state.queue_board:
+                state.queue_board.register(interaction.message)
+
+            # 클릭은 JoinBatcher 에서 짧은 구간 단위로 모아 처리됩니다. (등록 여부/참여 제한 확인과 대기열 등록 모두 메모리에서 즉시)
+            # 연타는 유저별 요청 제한으로 막고, 처리 중인 클릭과 겹친 클릭은 그 결과를 함께 받습니다.
+            try:
+                result = await self.bot.throttle.run('join', interaction.guild_id, user_id, lambda: state.join_batcher.submit(user_id))
+            except Throttled as e:
+                await interaction.followup.send(e.notice, ephemeral=True)
+                return
+
             # 정보가 등록되지 않은 유저 먼저 확인합니다.
-            if not player_response.data:
+            if result.status == NOT_REGISTERED:
                 await interaction.followup.send("⚠️ 먼저 `/정보등록`으로 정보를 등록해야 참여할 수 있습니다.", ephemeral=True)
                 return
         
-            player_data = player_response.data
-        
             # 1. 스트라이크 개수 확인 (3개 이상이면 참여 불가)
-            if player_data.get('strikes', 0) >= 3:
+            if result.status == TOO_MANY_STRIKES:
                 await interaction.followup.send("❌ 스트라이크가 3개 이상 누적되어 참여가 제한됩니다. 운영자에게 문의하세요.", ephemeral=True)
                 return
 
             # 2. 타임아웃 페널티 확인
-            if player_data.get('penalty_ends_at'):
-                from datetime import datetime, timezone
-                penalty_end_time = datetime.fromisoformat(player_data['penalty_ends_at'])
-                if penalty_end_time > datetime.now(timezone.utc):
-                    end_time_timestamp = f"<t:{int(penalty_end_time.timestamp())}:R>"
-                    await interaction.followup.send(f"❌ 타임아웃 페널티가 적용 중입니다. {end_time_timestamp}에 다시 시도해주세요.", ephemeral=True)
-                    return
-
-            # 이하 대기열 참여 로직은 기존과 동일합니다.
-            in_queue = self.bot.supabase.table('queue').select('player_id').eq('player_id', user_id).execute().data
-            if in_queue:
+            if result.status == TIMED_OUT:
+                end_time_timestamp = f"<t:{int(result.penalty_ends_at.timestamp())}:R>"
+                await interaction.followup.send(f"❌ 타임아웃 페널티가 적용 중입니다. {end_time_timestamp}에 다시 시도해주세요.", ephemeral=True)
+                return
+
+            if result.status == IN_MATCH:
+                lobby = state.lobbies.lobby_of(user_id)
+                lobby_text = f"로비 {lobby.id} " if lobby else ""
+                await interaction.followup.send(f"이미 {lobby_text}내전에 참여 중입니다. 내전이 끝난 뒤 다시 참여해주세요.", ephemeral=True)
+                return
+
+            if result.status == ALREADY_IN_QUEUE:
                 await interaction.followup.send("이미 내전 대기열에 등록되어 있습니다.", ephemeral=True)
                 return
         
-            self.bot.supabase.table('queue').insert({'player_id': user_id}).execute()
-            queue_response = self.bot.supabase.table('queue').select('player_id', count='exact').order('created_at').execute()
-            total_in_queue = queue_response.count
-            await interaction.followup.send(f"✅ 내전 대기열 참여 신청이 완료되었습니다! 현재 대기 순서는 {total_in_queue}번입니다.", ephemeral=True)
+            await interaction.followup.send(f"✅ 내전 대기열 참여 신청이 완료되었습니다! 현재 대기 순서는 {result.position}번입니다.", ephemeral=True)
         except Exception as e:
             print(f"내전 참여 처리 오류: {e}")
+            self.bot.metrics.increment('join_errors_total')
             await interaction.followup.send("❌ 내전 참여 처리 중 오류가 발생했습니다.", ephemeral=True)
+        finally:
+            self.bot.metrics.interaction_finished(interaction.id, 'button:join')
 
 class Events(commands.Cog):
     def __init__(self, bot: commands.Bot):
         self.bot = bot
+        self.ranking_check.start()
+        self.bot.guild_states.penalty_listeners.append(self.on_penalty_expired)
+        self.bot.guild_states.refusal_listeners.append(self.on_join_refused)
+
+    def cog_unload(self):
+        self.ranking_check.cancel()
+        self.bot.guild_states.penalty_listeners.remove(self.on_penalty_expired)
+        self.bot.guild_states.refusal_listeners.remove(self.on_join_refused)
+
+    # 타임아웃 페널티가 끝나는 순간 해당 유저에게 DM으로 알려줍니다.
+    async def on_penalty_expired(self, guild_id: int, player_id: int):
+        try:
+            guild = self.bot.get_guild(guild_id)
+            where = f"**{guild.name}** 서버의 " if guild else ""
+            _, failed = await self.bot.dm_dispatcher.send_many([player_id], guild=guild, content=f"⏰ {where}타임아웃 페널티가 종료되었습니다. 다시 내전 대기열에 참여할 수 있습니다.")
+            if failed:
+                print(f"타임아웃 종료 알림 DM 실패: {player_id} ({failed[0][2]})")
+        except Exception as e:
+            print(f"타임아웃 종료 알림 오류: {e}")
+
+    # 버튼에서 참여 완료로 응답했지만 DB가 뒤늦게 등록을 거절한 유저(메모리 상태가 뒤처진 사이 페널티가 부여된 경우 등)에게 DM으로 알려줍니다.
+    async def on_join_refused(self, guild_id: int, player_id: int, status: str):
+        self.bot.metrics.increment('join_refused_total')
+        reasons = {
+            NOT_REGISTERED: "등록된 정보가 없습니다. `/정보등록`으로 정보를 등록해주세요.",
+            TOO_MANY_STRIKES: "스트라이크가 3개 이상 누적되어 참여가 제한됩니다. 운영자에게 문의하세요.",
+            TIMED_OUT: "타임아웃 페널티가 적용 중입니다.",
+        }
+        try:
+            guild = self.bot.get_guild(guild_id)
+            where = f"**{guild.name}** 서버의 " if guild else ""
+            reason = reasons.get(status, f"({status})")
+            _, failed = await self.bot.dm_dispatcher.send_many([player_id], guild=guild, content=f"❌ {where}내전 대기열 등록이 취소되었습니다. {reason}")
+            if failed:
+                print(f"대기열 등록 거절 알림 DM 실패: {player_id} ({failed[0][2]})")
+        except Exception as e:
+            print(f"대기열 등록 거절 알림 오류: {e}")
+
+    # 서버별 랭킹 인덱스가 DB(players.points)와 어긋나지 않았는지 주기적으로 확인하고, 어긋난 유저만 DB 값으로 고칩니다.
+    @tasks.loop(minutes=30)
+    async def ranking_check(self):
+        for state in self.bot.guild_states:
+            try:
+                mismatches = await state.check_ranking()
+                if mismatches is None:
+                    print(f"서버 {state.guild_id}: DB 반영 대기 중인 변경이 있어 랭킹 일관성 확인을 다음으로 미룹니다.")
+                elif mismatches:
+                    print(f"⚠️ 서버 {state.guild_id} 랭킹 인덱스 불일치 {len(mismatches)}건을 DB 기준으로 복구했습니다: {mismatches[:5]}")
+            except Exception as e:
+                print(f"서버 {state.guild_id} 랭킹 일관성 확인 오류: {e}")
+
+    @ranking_check.before_loop
+    async def before_ranking_check(self):
+        await self.bot.wait_until_ready()
+
+    # 슬래시 커맨드의 시작 시각을 기록하고, 끝나면(실패 포함) 처리 시간을 기록합니다. 버튼은 각 콜백에서 직접 기록합니다.
+    @commands.Cog.listener()
+    async def on_interaction(self, interaction: discord.Interaction):
+        if interaction.type == discord.InteractionType.application_command:
+            self.bot.metrics.interaction_started(interaction.id)
+
+    @commands.Cog.listener()
+    async def on_app_command_completion(self, interaction: discord.Interaction, command):
+        self.bot.metrics.interaction_finished(interaction.id, f"command:{command.qualified_name}")
+
+    # bot.py 의 명령어 트리 오류 처리기가 보내는 이벤트입니다. (디스코드 기본 이벤트에는 실패 알림이 없습니다)
+    @commands.Cog.listener()
+    async def on_app_command_error(self, interaction: discord.Interaction, error):
+        name = interaction.command.qualified_name if interaction.command else 'unknown'
+        self.bot.metrics.interaction_finished(interaction.id, f"command_error:{name}")
 
     @commands.Cog.listener()
     async def on_ready(self):
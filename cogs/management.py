@@ -4,14 +4,23 @@ import discord
 from discord import app_commands
 from discord.ext import commands
 import asyncio
+import re
+import tempfile
+import time
 from datetime import datetime, timedelta, timezone
 
 # events.py 파일에 있는 JoinView를 가져옵니다.
 from .events import JoinView
+from core.player_io import export_players, format_of, import_players
+from core.queue_store import PRIORITY_LANE
+from core.resolver import mention as mention_of
+from core.tasks import TaskSet
+from core.teams import CURRENT_WEIGHT, LOBBY_SIZE, balance_pool, player_rating, tier_name
 
 class Management(commands.Cog):
     def __init__(self, bot: commands.Bot):
         self.bot = bot
+        self._tasks = TaskSet("운영자 우선 참여")
 
     # Cog 내부의 모든 슬래시 커맨드 에러를 처리하는 핸들러
     async def cog_app_command_error(self, interaction: discord.Interaction, error: app_commands.AppCommandError):
@@ -19,6 +28,7 @@ class Management(commands.Cog):
             await interaction.response.send_message("이 명령어를 사용할 권한이 없습니다.", ephemeral=True)
         else:
             print(f"An error occurred in a command: {error}")
+            self.bot.metrics.increment('command_errors_total')
             if not interaction.response.is_done():
                 await interaction.response.send_message("명령어 실행 중 오류가 발생했습니다.", ephemeral=True)
             else:
@@ -30,23 +40,20 @@ class Management(commands.Cog):
     async def show_members_command(self, interaction: discord.Interaction):
         await interaction.response.defer()
         try:
-            query = self.bot.supabase.table('queue').select('players(id, valorant_nickname, highest_tier, current_tier)').order('created_at').limit(10)
-            response = query.execute()
-            members = response.data
-            count_response = self.bot.supabase.table('queue').select('player_id', count='exact').execute()
-            total_count = count_response.count
-            if not members:
+            state = await self.bot.guild_states.get(interaction.guild_id)
+            member_ids = state.queue_store.head(10)
+            total_count = len(state.queue_store)
+            if not member_ids:
                 await interaction.followup.send("현재 대기 중인 멤버가 없습니다."); return
+            players_by_id = {p['id']: p for p in await state.player_repo.get_many(member_ids)}
+            users = await self.bot.user_resolver.resolve_many(member_ids, interaction.guild)
             
             embed = discord.Embed(title="⚔️ 다음 내전 참여 예정 멤버", description=f"총 {total_count}명이 대기 중입니다.", color=discord.Color.gold())
             member_list = []
-            for idx, member_data in enumerate(members):
-                player = member_data['players']
+            for idx, member_id in enumerate(member_ids):
+                player = players_by_id.get(member_id)
                 if player:
-                    try:
-                        user = await self.bot.fetch_user(player['id']); mention = user.mention
-                    except discord.NotFound:
-                        mention = f"ID: {player['id']} (찾을 수 없음)"
+                    mention = mention_of(users.get(player['id']), player['id'])
                     h_tier = player.get('highest_tier') or '정보없음'
                     c_tier = player.get('current_tier') or '정보없음'
                     line = f"`{idx + 1:2d}` {mention} | `{player['valorant_nickname']}` (`{h_tier}` / `{c_tier}`)"
@@ -57,79 +64,201 @@ class Management(commands.Cog):
         except Exception as e:
             print(f"멤버 공개 오류: {e}"); await interaction.followup.send("❌ 멤버 목록을 불러오는 중 오류가 발생했습니다.")
 
+    @app_commands.command(name="팀배정", description="대기열 상위 인원을 티어 기준으로 균형 있게 5:5 팀으로 나눕니다. (관리자용)")
+    @app_commands.describe(
+        인원="팀을 나눌 인원 (10의 배수, 20명 이상이면 여러 로비로 나눕니다)",
+        같은팀="같은 팀에 넣을 유저 멘션 묶음, 쉼표로 구분 (예: @a @b, @c @d)",
+        다른팀="서로 다른 팀에 넣을 유저 멘션 쌍, 쉼표로 구분 (예: @a @b, @c @d)",
+        로비="대기열 대신 이 로비의 인원으로 팀을 나눕니다 (/로비생성 으로 만든 로비 번호)",
+    )
+    @app_commands.checks.has_permissions(administrator=True)
+    async def assign_teams_command(self, interaction: discord.Interaction, 인원: int = LOBBY_SIZE, 같은팀: str = None, 다른팀: str = None, 로비: int = None):
+        await interaction.response.defer()
+        try:
+            state = await self.bot.guild_states.get(interaction.guild_id)
+            if 로비 is not None:
+                lobby = state.lobbies.get(로비)
+                if lobby is None:
+                    await interaction.followup.send(f"❌ 로비 {로비}을(를) 찾을 수 없습니다.", ephemeral=True); return
+                member_ids = list(lobby.player_ids)
+                인원 = len(member_ids)
+            else:
+                member_ids = state.queue_store.head(인원)
+            if 인원 <= 0 or 인원 % LOBBY_SIZE:
+                await interaction.followup.send(f"❌ 인원은 {LOBBY_SIZE}의 배수여야 합니다.", ephemeral=True); return
+            if len(member_ids) < 인원:
+                await interaction.followup.send(f"❌ 대기 인원이 {len(member_ids)}명이라 {인원}명을 배정할 수 없습니다.", ephemeral=True); return
+            players_by_id = {p['id']: p for p in await state.player_repo.get_many(member_ids)}
+            ratings = [player_rating(players_by_id.get(member_id, {})) for member_id in member_ids]
+
+            # 멘션 묶음을 대기열 순번 쌍으로 바꿉니다. 대상 인원에 없는 유저는 무시합니다.
+            index_of = {member_id: idx for idx, member_id in enumerate(member_ids)}
+            def pairs(text: str, chain: bool) -> list:
+                result = []
+                for group in (text or "").split(','):
+                    ids = [index_of[int(user_id)] for user_id in re.findall(r'<@!?(\d+)>', group) if int(user_id) in index_of]
+                    result.extend(zip(ids, ids[1:]) if chain else [(a, b) for a_idx, a in enumerate(ids) for b in ids[a_idx + 1:]])
+                return result
+            together, apart = pairs(같은팀, chain=True), pairs(다른팀, chain=False)
+
+            # 252가지 분할 평가(로비가 여러 개면 휴리스틱 탐색)는 이벤트 루프를 막지 않도록 스레드에서 실행합니다.
+            started = time.perf_counter()
+            splits = await asyncio.to_thread(balance_pool, ratings, together, apart)
+            elapsed = (time.perf_counter() - started) * 1000
+
+            users = await self.bot.user_resolver.resolve_many(member_ids, interaction.guild)
+            def team_lines(team: list) -> str:
+                return "\n".join(f"`{tier_name(ratings[idx])}` {mention_of(users.get(member_ids[idx]), member_ids[idx])}" for idx in sorted(team, key=lambda idx: -ratings[idx]))
+
+            source = f"로비 {로비}의 {인원}명을" if 로비 is not None else f"대기열 상위 {인원}명을"
+            embed = discord.Embed(title="⚖️ 팀 배정 결과", description=f"{source} {len(splits)}개 로비로 나눴습니다.", color=discord.Color.purple())
+            for lobby, split in enumerate(splits, start=1):
+                prefix = f"로비 {lobby} · " if len(splits) > 1 else ""
+                embed.add_field(name=f"🔴 {prefix}A팀 (평균 {tier_name(split.sum_a / len(split.team_a))})", value=team_lines(split.team_a), inline=True)
+                embed.add_field(name=f"🔵 {prefix}B팀 (평균 {tier_name(split.sum_b / len(split.team_b))})", value=team_lines(split.team_b), inline=True)
+                embed.add_field(name="\u200b", value=f"팀 점수 차이 {split.diff:.1f}" + (f" · ⚠️ 지키지 못한 조건 {split.violations}개" if split.violations else ""), inline=False)
+            embed.set_footer(text=f"티어는 현재 {CURRENT_WEIGHT:.0%} · 최고 {1 - CURRENT_WEIGHT:.0%} 비율로 환산했습니다. 계산 {elapsed:.1f}ms")
+            await interaction.followup.send(embed=embed)
+        except Exception as e:
+            print(f"팀 배정 오류: {e}"); await interaction.followup.send("❌ 팀 배정 중 오류가 발생했습니다.")
+
     @app_commands.command(name="내전모집", description="내전 대기열 참여 메시지를 보냅니다. (관리자용)")
     @app_commands.checks.has_permissions(administrator=True)
     async def recruit_command(self, interaction: discord.Interaction, 제목: str, 내용: str = "아래 버튼을 눌러 내전 대기열에 참여하세요!"):
+        state = await self.bot.guild_states.get(interaction.guild_id)
         embed = discord.Embed(title=f"⚔️ {제목}", description=내용, color=discord.Color.blue())
         embed.set_footer(text="이 버튼은 항상 활성화되어 있으며, 언제든 눌러 대기열에 참여할 수 있습니다.")
-        await interaction.response.send_message(embed=embed, view=JoinView(self.bot))
+        # 모집 메시지에 대기열 현황판을 붙이고, 이후 대기열이 바뀔 때마다 자동으로 갱신합니다.
+        await interaction.response.send_message(embed=state.queue_board.render(embed), view=JoinView(self.bot))
+        state.queue_board.register(await interaction.original_response(), embed, refresh=False)
 
-    @app_commands.command(name="내전시작", description="대기열 상위 인원에게 내전 시작 DM을 보냅니다. (관리자용)")
+    @app_commands.command(name="내전시작", description="대기열 상위 인원(또는 로비 인원)에게 내전 시작 DM을 보냅니다. (관리자용)")
+    @app_commands.describe(로비="시작할 로비 번호 (비우면 대기열 상위 10명)")
     @app_commands.checks.has_permissions(administrator=True)
-    async def start_civil_war_command(self, interaction: discord.Interaction, 공지내용: str = "내전이 시작되었습니다! 지정된 음성 채널로 모여주세요."):
+    async def start_civil_war_command(self, interaction: discord.Interaction, 공지내용: str = "내전이 시작되었습니다! 지정된 음성 채널로 모여주세요.", 로비: int = None):
         await interaction.response.defer()
         try:
-            team_response = self.bot.supabase.table('queue').select('players(id)').order('created_at').limit(10).execute()
-            members = team_response.data
+            state = await self.bot.guild_states.get(interaction.guild_id)
+            if 로비 is not None:
+                try:
+                    members = list(state.lobbies.start(로비).player_ids)
+                except ValueError as e:
+                    await interaction.followup.send(f"❌ {e}", ephemeral=True); return
+            else:
+                members = state.queue_store.head(10)
             if not members:
                 await interaction.followup.send(f"❌ 대기열에 멤버가 없습니다.", ephemeral=True); return
             
-            sent_users, failed_users = [], []
-            embed = discord.Embed(title="🔔 내전 시작 알림", description=공지내용, color=discord.Color.green())
-            for member_data in members:
-                player = member_data['players']
-                if player:
-                    user = await self.bot.fetch_user(player['id'])
-                    try:
-                        await user.send(embed=embed); sent_users.append(user.mention)
-                    except discord.Forbidden:
-                        failed_users.append(user.mention)
+            embed = discord.Embed(title="🔔 내전 시작 알림" + (f" (로비 {로비})" if 로비 is not None else ""), description=공지내용, color=discord.Color.green())
+            progress_message = await interaction.followup.send(embed=discord.Embed(title="⏳ 내전 시작 알림 발송 중", description=f"0 / {len(members)}", color=discord.Color.blue()), wait=True)
+
+            # 진행 상황은 최대 1초에 한 번만 메시지를 수정해 반영합니다.
+            last_edit = 0.0
+            async def on_progress(done: int, total: int):
+                nonlocal last_edit
+                now = asyncio.get_running_loop().time()
+                if done < total and now - last_edit >= 1.0:
+                    last_edit = now
+                    await progress_message.edit(embed=discord.Embed(title="⏳ 내전 시작 알림 발송 중", description=f"{done} / {total}", color=discord.Color.blue()))
+
+            sent, failed = await self.bot.dm_dispatcher.send_many(members, guild=interaction.guild, progress=on_progress, embed=embed)
+            sent_users = [user.mention for user in sent]
+            failed_users = [f"{user.mention if user else f'ID: {user_id}'} ({reason})" for user_id, user, reason in failed]
             
             result_embed = discord.Embed(title="✅ 내전 시작 알림 발송 완료", description=f"총 {len(members)}명에게 DM 발송을 시도했습니다.", color=discord.Color.blue())
             result_embed.add_field(name="✉️ DM 발송 성공", value="\n".join(sent_users) if sent_users else "없음", inline=False)
             if failed_users:
-                result_embed.add_field(name="⚠️ DM 발송 실패 (DM을 차단한 유저)", value="\n".join(failed_users), inline=False)
-            await interaction.followup.send(embed=result_embed)
+                result_embed.add_field(name="⚠️ DM 발송 실패", value="\n".join(failed_users), inline=False)
+            await progress_message.edit(embed=result_embed)
         except Exception as e:
             print(f"내전 시작 오류: {e}"); await interaction.followup.send("❌ 내전 시작 처리 중 오류가 발생했습니다.", ephemeral=True)
 
     @app_commands.command(name="내전종료", description="진행된 내전을 종료하고, 참여자에게 포인트를 지급합니다. (관리자용)")
-    @app_commands.describe(참여인원="실제 내전에 참여한 인원 수", 지급포인트="참여자에게 지급할 포인트 (기본 10점)")
+    @app_commands.describe(참여인원="실제 내전에 참여한 인원 수 (로비를 지정하면 생략)", 지급포인트="참여자에게 지급할 포인트 (기본 10점)", 로비="종료할 로비 번호 (비우면 대기열 상위 참여인원)")
     @app_commands.checks.has_permissions(administrator=True)
-    async def end_civil_war_command(self, interaction: discord.Interaction, 참여인원: int, 지급포인트: int = 10):
+    async def end_civil_war_command(self, interaction: discord.Interaction, 참여인원: int = None, 지급포인트: int = 10, 로비: int = None):
         await interaction.response.defer(ephemeral=True)
-        if 참여인원 <= 0:
+        if 로비 is None and (참여인원 is None or 참여인원 <= 0):
             await interaction.followup.send("❌ 참여인원은 1 이상의 숫자여야 합니다.", ephemeral=True); return
         try:
-            # 1. 게임에 참여한 멤버들의 ID를 가져옵니다.
-            current_players_response = self.bot.supabase.table('queue').select('player_id').order('created_at').limit(참여인원).execute()
-            if not current_players_response.data:
-                await interaction.followup.send("종료할 내전 대기열이 없습니다.", ephemeral=True); return
-        
-            player_ids_to_process = [player['player_id'] for player in current_players_response.data]
-
-            # 2. [신규] 참여한 멤버들에게 포인트를 지급합니다.
-            # supabase에는 한번에 여러 값을 더하는 기능이 없으므로, 한 명씩 처리합니다.
-            for player_id in player_ids_to_process:
-                # PostgreSQL의 RPC 함수를 사용하면 더 효율적이지만, 이 방식이 더 간단합니다.
-                player_res = self.bot.supabase.table('players').select('points').eq('id', player_id).single().execute()
-                current_points = player_res.data.get('points', 0)
-                new_points = current_points + 지급포인트
-                self.bot.supabase.table('players').update({'points': new_points}).eq('id', player_id).execute()
-
-            # 3. 참여한 멤버들을 대기열에서 제외합니다.
-            self.bot.supabase.table('queue').delete().in_('player_id', player_ids_to_process).execute()
+            state = await self.bot.guild_states.get(interaction.guild_id)
+            # 포인트 지급과 대기열 제외를 로컬 저널에 기록하고 메모리(대기열, 랭킹)에 바로 반영합니다.
+            # DB에는 앞선 대기열 변경 뒤에 DB 함수(settle_match) 한 번으로 원자적으로 반영됩니다. (DB가 느리거나 끊겨도 유실되지 않음)
+            if 로비 is not None:
+                # 로비 단위 정산은 다른 로비의 진행과 무관하게 해당 로비 인원에게만 적용됩니다.
+                try:
+                    player_ids_to_process = (await state.settle_lobby(로비, 지급포인트)).player_ids
+                except ValueError as e:
+                    await interaction.followup.send(f"❌ {e}", ephemeral=True); return
+            else:
+                # 1. 게임에 참여한 멤버들의 ID를 가져옵니다.
+                player_ids_to_process = state.queue_store.head(참여인원)
+                if not player_ids_to_process:
+                    await interaction.followup.send("종료할 내전 대기열이 없습니다.", ephemeral=True); return
+                # 2. 정산
+                await state.settle_match(player_ids_to_process, 지급포인트)
         
-            await interaction.followup.send(f"✅ 내전이 종료되었습니다. 참여한 {len(player_ids_to_process)}명에게 각각 {지급포인트} 포인트를 지급하고 대기열에서 제외했습니다.", ephemeral=True)
+            ended = f"로비 {로비} 내전이" if 로비 is not None else "내전이"
+            await interaction.followup.send(f"✅ {ended} 종료되었습니다. 참여한 {len(player_ids_to_process)}명에게 각각 {지급포인트} 포인트를 지급하고 대기열에서 제외했습니다.", ephemeral=True)
         
-            # 4. 다음 대기자를 알립니다.
-            next_player_response = self.bot.supabase.table('queue').select('player_id').order('created_at').limit(1).execute()
-            if next_player_response.data:
-                next_user = await self.bot.fetch_user(next_player_response.data[0]['player_id'])
+            # 3. 다음 대기자를 알립니다.
+            next_player = state.queue_store.head(1)
+            if next_player:
+                next_user = await self.bot.user_resolver.resolve(next_player[0], interaction.guild)
                 if next_user: await interaction.channel.send(f"🔔 다음 내전 대기 1순위는 {next_user.mention} 님입니다!")
         except Exception as e:
             print(f"내전 종료 처리 오류: {e}"); await interaction.followup.send("❌ 내전 종료 처리 중 오류가 발생했습니다.", ephemeral=True)
 
+    # --- 동시 진행 로비 ---
+    @app_commands.command(name="로비생성", description="대기열 앞쪽 인원으로 동시에 진행할 내전 로비를 만듭니다. (관리자용)")
+    @app_commands.describe(개수="만들 로비 수 (기본 1개)", 인원="로비당 인원 (기본 10명)")
+    @app_commands.checks.has_permissions(administrator=True)
+    async def create_lobby_command(self, interaction: discord.Interaction, 개수: int = 1, 인원: int = LOBBY_SIZE):
+        await interaction.response.defer()
+        if 개수 <= 0 or 인원 <= 0:
+            await interaction.followup.send("❌ 개수와 인원은 1 이상의 숫자여야 합니다.", ephemeral=True); return
+        try:
+            state = await self.bot.guild_states.get(interaction.guild_id)
+            # 로비에 배정된 인원은 대기 순서에서 빠지므로 다음 로비/대기자가 바로 앞으로 당겨집니다.
+            lobbies = state.lobbies.create(개수, 인원)
+            if not lobbies:
+                await interaction.followup.send(f"❌ 대기 인원이 {len(state.queue_store)}명이라 {인원}명 로비를 만들 수 없습니다.", ephemeral=True); return
+            users = await self.bot.user_resolver.resolve_many([player_id for lobby in lobbies for player_id in lobby.player_ids], interaction.guild)
+            embed = discord.Embed(title="🏟️ 로비 생성", description=f"{len(lobbies)}개 로비를 만들었습니다. 남은 대기 인원 {len(state.queue_store)}명", color=discord.Color.gold())
+            for lobby in lobbies:
+                embed.add_field(name=f"로비 {lobby.id} ({len(lobby.player_ids)}명)", value="\n".join(mention_of(users.get(player_id), player_id) for player_id in lobby.player_ids), inline=True)
+            embed.set_footer(text="/팀배정 로비:<번호> · /내전시작 로비:<번호> · /내전종료 로비:<번호>")
+            await interaction.followup.send(embed=embed)
+        except Exception as e:
+            print(f"로비 생성 오류: {e}"); await interaction.followup.send("❌ 로비 생성 중 오류가 발생했습니다.")
+
+    @app_commands.command(name="로비목록", description="진행 중인 내전 로비 목록을 보여줍니다. (관리자용)")
+    @app_commands.checks.has_permissions(administrator=True)
+    async def list_lobbies_command(self, interaction: discord.Interaction):
+        state = await self.bot.guild_states.get(interaction.guild_id)
+        lobbies = list(state.lobbies)
+        if not lobbies:
+            await interaction.response.send_message("진행 중인 로비가 없습니다.", ephemeral=True); return
+        status_names = {'forming': '시작 전', 'playing': '진행 중', 'ending': '정산 중'}
+        lines = []
+        for lobby in lobbies:
+            since = f" · <t:{int(lobby.started_at)}:R> 시작" if lobby.started_at else f" · <t:{int(lobby.created_at)}:R> 생성"
+            lines.append(f"**로비 {lobby.id}** {status_names.get(lobby.status, lobby.status)} · {len(lobby.player_ids)}명{since}")
+        embed = discord.Embed(title="🏟️ 로비 목록", description="\n".join(lines), color=discord.Color.gold())
+        embed.set_footer(text=f"경기 중 {state.lobbies.in_play()}명 · 대기 {len(state.queue_store)}명")
+        await interaction.response.send_message(embed=embed, ephemeral=True)
+
+    @app_commands.command(name="로비취소", description="로비를 정산 없이 닫고 인원을 원래 대기 순서로 돌려보냅니다. (관리자용)")
+    @app_commands.describe(로비="취소할 로비 번호")
+    @app_commands.checks.has_permissions(administrator=True)
+    async def cancel_lobby_command(self, interaction: discord.Interaction, 로비: int):
+        state = await self.bot.guild_states.get(interaction.guild_id)
+        try:
+            lobby = state.lobbies.cancel(로비)
+        except ValueError as e:
+            await interaction.response.send_message(f"❌ {e}", ephemeral=True); return
+        await interaction.response.send_message(f"✅ 로비 {lobby.id}을(를) 취소했습니다. {len(lobby.player_ids)}명이 원래 대기 순서로 돌아갔습니다.", ephemeral=True)
+
     @app_commands.command(name="모집마감", description="특정 내전 모집 메시지의 참여 버튼을 비활성화합니다. (관리자용)")
     @app_commands.describe(메시지링크="버튼을 비활성화할 모집 공고 메시지의 링크")
     @app_commands.checks.has_permissions(administrator=True)
@@ -149,12 +278,14 @@ class Management(commands.Cog):
                 return
             
             target_message = await target_channel.fetch_message(message_id)
+            state = await self.bot.guild_states.get(interaction.guild_id)
 
             disabled_view = JoinView(self.bot)
             for item in disabled_view.children:
                 if isinstance(item, discord.ui.Button):
                     item.disabled = True
         
+            state.queue_board.unregister(message_id)
             await target_message.edit(view=disabled_view)
         
             await interaction.response.send_message("✅ 해당 모집 메시지의 '내전 참여' 버튼을 비활성화했습니다.", ephemeral=True)
@@ -182,9 +313,11 @@ class Management(commands.Cog):
         response_messages = []
 
         try:
-            in_queue_res = self.bot.supabase.table('queue').select('player_id').eq('player_id', target_id).execute()
-            if in_queue_res.data:
-                self.bot.supabase.table('queue').delete().eq('player_id', target_id).execute()
+            state = await self.bot.guild_states.get(interaction.guild_id)
+            removed, dropped = state.kick([target_id])
+            for lobby_id in dropped:
+                response_messages.append(f"✅ {유저.mention} 님을 로비 {lobby_id}에서 제외했습니다. (정산 대상에서도 빠집니다)")
+            if removed:
                 response_messages.append(f"✅ {유저.mention} 님을 대기열에서 제외했습니다.")
             else:
                 # 대기열에 없는 유저에게도 페널티는 줄 수 있으므로, 여기서 종료하지 않습니다.
@@ -193,17 +326,15 @@ class Management(commands.Cog):
             if 시간 > 0:
                 penalty_duration = timedelta(minutes=시간)
                 penalty_end_time = datetime.now(timezone.utc) + penalty_duration
-                self.bot.supabase.table('players').update({'penalty_ends_at': penalty_end_time.isoformat()}).eq('id', target_id).execute()
+                await state.player_repo.update(target_id, {'penalty_ends_at': penalty_end_time.isoformat()})
                 
                 end_time_timestamp = f"<t:{int(penalty_end_time.timestamp())}:R>"
                 response_messages.append(f"🚫 {시간}분 타임아웃이 부여되었습니다. ({end_time_timestamp}까지)")
 
             if 스트라이크 > 0:
-                player_res = self.bot.supabase.table('players').select('strikes').eq('id', target_id).single().execute()
-                if player_res.data:
-                    current_strikes = player_res.data.get('strikes', 0)
-                    new_strikes = current_strikes + 스트라이크
-                    self.bot.supabase.table('players').update({'strikes': new_strikes}).eq('id', target_id).execute()
+                player_data = await state.player_repo.increment(target_id, 'strikes', 스트라이크)
+                if player_data:
+                    new_strikes = player_data['strikes']
                     response_messages.append(f"🏏 스트라이크 {스트라이크}개를 부여했습니다. (현재 총 {new_strikes}개)")
                 else:
                     response_messages.append(f"⚠️ {유저.mention} 님은 `/정보등록`을 하지 않아 스트라이크를 부여할 수 없습니다.")
@@ -221,12 +352,11 @@ class Management(commands.Cog):
     async def reduce_strike_command(self, interaction: discord.Interaction, 유저: discord.User, 개수: int = 1):
         await interaction.response.defer(ephemeral=True)
         try:
-            player_res = self.bot.supabase.table('players').select('strikes').eq('id', 유저.id).single().execute()
-            if not player_res.data:
+            state = await self.bot.guild_states.get(interaction.guild_id)
+            player_data = await state.player_repo.increment(유저.id, 'strikes', -개수)
+            if not player_data:
                 await interaction.followup.send(f"❌ {유저.mention} 님은 정보가 등록되지 않은 유저입니다.", ephemeral=True); return
-            current_strikes = player_res.data.get('strikes', 0)
-            new_strikes = max(0, current_strikes - 개수)
-            self.bot.supabase.table('players').update({'strikes': new_strikes}).eq('id', 유저.id).execute()
+            new_strikes = player_data['strikes']
             await interaction.followup.send(f"✅ {유저.mention} 님의 스트라이크를 {개수}개 감소시켰습니다. (현재 총 {new_strikes}개)", ephemeral=True)
         except Exception as e:
             print(f"스트라이크 감소 오류: {e}"); await interaction.followup.send("❌ 스트라이크 감소 처리 중 오류가 발생했습니다.", ephemeral=True)
@@ -237,9 +367,10 @@ class Management(commands.Cog):
     async def check_strikes_command(self, interaction: discord.Interaction, 유저: discord.User):
         await interaction.response.defer(ephemeral=True)
         try:
-            player_res = self.bot.supabase.table('players').select('strikes').eq('id', 유저.id).single().execute()
-            if player_res.data:
-                strikes = player_res.data.get('strikes', 0)
+            state = await self.bot.guild_states.get(interaction.guild_id)
+            player_data = await state.player_repo.get(유저.id)
+            if player_data:
+                strikes = player_data.get('strikes', 0)
                 await interaction.followup.send(f"{유저.mention} 님의 현재 스트라이크는 **{strikes}개**입니다.", ephemeral=True)
             else:
                 await interaction.followup.send(f"{유저.mention} 님은 아직 `/정보등록`을 하지 않았습니다.", ephemeral=True)
@@ -252,7 +383,8 @@ class Management(commands.Cog):
     async def reset_strikes_command(self, interaction: discord.Interaction, 유저: discord.User):
         await interaction.response.defer(ephemeral=True)
         try:
-            self.bot.supabase.table('players').update({'strikes': 0}).eq('id', 유저.id).execute()
+            state = await self.bot.guild_states.get(interaction.guild_id)
+            await state.player_repo.update(유저.id, {'strikes': 0})
             await interaction.followup.send(f"✅ {유저.mention} 님의 스트라이크를 0개로 초기화했습니다.", ephemeral=True)
         except Exception as e:
             print(f"스트라이크 초기화 오류: {e}"); await interaction.followup.send("❌ 스트라이크 초기화 처리 중 오류가 발생했습니다.", ephemeral=True)
@@ -263,37 +395,21 @@ class Management(commands.Cog):
     async def run_admin_join_task(self, interaction: discord.Interaction, admin_user: discord.User):
         admin_id = admin_user.id
         try:
-            player_info = self.bot.supabase.table('players').select('id').eq('id', admin_id).execute().data
+            state = await self.bot.guild_states.get(interaction.guild_id)
+            player_info = await state.player_repo.get(admin_id)
             if not player_info:
                 await interaction.channel.send(f"⚠️ {admin_user.mention}님, `/정보등록`을 먼저 해야 이 기능을 사용할 수 있습니다.")
                 return
 
-            # 1. 운영자가 이미 대기열에 있다면, 우선 현재 위치에서 삭제
-            self.bot.supabase.table('queue').delete().eq('player_id', admin_id).execute()
-
-            # 2. [수정] 현재 1순위 멤버의 신청 시간을 기준으로, 그것보다 1초 빠르게 운영자를 삽입
-            first_in_queue = self.bot.supabase.table('queue').select('created_at').order('created_at').limit(1).execute().data
-        
-            if first_in_queue:
-                from datetime import datetime, timedelta
-                # 현재 1순위의 시간을 가져와서 1초를 뺀다
-                first_user_time_str = first_in_queue[0]['created_at']
-                first_user_time = datetime.fromisoformat(first_user_time_str)
-                admin_priority_time = first_user_time - timedelta(seconds=1)
-                # DB에 넣기 위해 다시 문자열로 변환
-                priority_timestamp = admin_priority_time.isoformat()
+            # 1. 운영자 우선 레인에 등록합니다. 이미 대기 중이면 레인만 바꿉니다. (운영자끼리는 선착순)
+            queue_store = state.queue_store
+            if admin_id in queue_store:
+                position = queue_store.move(admin_id, PRIORITY_LANE)
             else:
-                # 대기열에 아무도 없다면 지금 시간으로 바로 등록
-                from datetime import datetime, timezone
-                priority_timestamp = datetime.now(timezone.utc).isoformat()
-
-            self.bot.supabase.table('queue').insert({
-                'player_id': admin_id,
-                'created_at': priority_timestamp
-            }).execute()
+                position = queue_store.add(admin_id, lane=PRIORITY_LANE)
         
-            # 3. 작업이 모두 끝난 후, 채널에 새로운 메시지를 보내 결과를 알립니다.
-            await interaction.channel.send(f"✅ {admin_user.mention} 님을 대기열 1순위로 등록했습니다. `/멤버공개`로 최종 명단을 확인하세요.")
+            # 2. 작업이 모두 끝난 후, 채널에 새로운 메시지를 보내 결과를 알립니다.
+            await interaction.channel.send(f"✅ {admin_user.mention} 님을 대기열 우선 순위({position}순위)로 등록했습니다. `/멤버공개`로 최종 명단을 확인하세요.")
 
         except Exception as e:
             print(f"운영자 우선 참여 백그라운드 작업 오류: {e}")
@@ -303,7 +419,7 @@ class Management(commands.Cog):
     @app_commands.checks.has_permissions(administrator=True)
     async def admin_join_priority_command(self, interaction: discord.Interaction):
         await interaction.response.send_message(f"⏳ {interaction.user.mention} 님의 우선 참여 요청을 접수했습니다. 잠시 후 처리됩니다.", ephemeral=True)
-        asyncio.create_task(self.run_admin_join_task(interaction, interaction.user))
+        self._tasks.spawn(self.run_admin_join_task(interaction, interaction.user))
     
     # cogs/management.py 파일에 새로 추가될 /포인트관리 명령어
 
@@ -330,20 +446,17 @@ class Management(commands.Cog):
         action_name = 작업.name   # '증가' or '감소'
 
         try:
-            player_res = self.bot.supabase.table('players').select('points').eq('id', target_id).single().execute()
+            state = await self.bot.guild_states.get(interaction.guild_id)
+            # DB 함수로 원자적으로 증감합니다. 감소 시 포인트가 0 미만으로 내려가지 않습니다.
+            # 실제로 바뀐 만큼이 포인트 원장과 이번 시즌 집계에 함께 기록됩니다.
+            delta = 포인트 if action_value == "increase" else -포인트
+            player_data = await state.player_repo.adjust_points(target_id, delta, state.season)
         
-            if not player_res.data:
+            if not player_data:
                 await interaction.followup.send(f"❌ {유저.mention} 님은 정보가 등록되지 않은 유저입니다.", ephemeral=True)
                 return
 
-            current_points = player_res.data.get('points', 0)
-        
-            if action_value == "increase":
-                new_points = current_points + 포인트
-            else:  # action_value == "decrease"
-                new_points = max(0, current_points - 포인트) # 포인트가 0 미만으로 내려가지 않도록 합니다.
-            
-            self.bot.supabase.table('players').update({'points': new_points}).eq('id', target_id).execute()
+            new_points = player_data['points']
         
             await interaction.followup.send(f"✅ {유저.mention} 님의 포인트를 {포인트}점 {action_name}시켰습니다. (현재 총 {new_points}점)", ephemeral=True)
 
@@ -351,6 +464,190 @@ class Management(commands.Cog):
             print(f"포인트 관리 오류: {e}")
             await interaction.followup.send("❌ 포인트 관리 중 오류가 발생했습니다.", ephemeral=True)
 
+    # --- 여러 유저 일괄 관리 ---
+    # 대상은 유저목록(멘션/ID), 역할, 서버 전체 중 하나이며, 인원과 관계없이 DB 함수 한 번으로 처리합니다. (sql/009_bulk_admin.sql)
+
+    def resolve_targets(self, 유저목록: str, 역할: discord.Role, 전체: bool):
+        # (player_id 목록 또는 서버 전체면 None, 대상 설명) 을 반환합니다. 대상을 하나만 고르지 않으면 ValueError
+        if sum((bool(유저목록), 역할 is not None, 전체)) != 1:
+            raise ValueError("`유저목록`, `역할`, `전체` 중 하나만 지정해주세요.")
+        if 전체:
+            return None, "서버 전체"
+        if 역할 is not None:
+            # 역할 멤버 목록은 게이트웨이 캐시에서 바로 읽습니다. (members 인텐트)
+            return [member.id for member in 역할.members], f"{역할.mention} 역할 {len(역할.members)}명"
+        player_ids = list(dict.fromkeys(int(user_id) for user_id in re.findall(r'\d{15,20}', 유저목록)))
+        return player_ids, f"유저 {len(player_ids)}명"
+
+    @app_commands.command(name="멤버일괄제외", description="[페널티 겸용] 여러 유저를 대기열에서 제외하고, 선택적으로 페널티를 한 번에 부여합니다.")
+    @app_commands.describe(
+        유저목록="대상 유저 멘션 또는 ID (공백/쉼표로 구분)",
+        역할="이 역할을 가진 모든 유저를 대상으로 합니다",
+        전체="서버 전체를 대상으로 합니다 (대기열은 대기 중인 인원만 제외)",
+        시간="부여할 타임아웃(분 단위, 0은 미부여)",
+        스트라이크="부여할 스트라이크 개수 (0은 미부여)"
+    )
+    @app_commands.checks.has_permissions(administrator=True)
+    async def bulk_kick_command(self, interaction: discord.Interaction, 유저목록: str = None, 역할: discord.Role = None, 전체: bool = False, 시간: int = 0, 스트라이크: int = 0):
+        await interaction.response.defer(ephemeral=True)
+        try:
+            player_ids, label = self.resolve_targets(유저목록, 역할, 전체)
+        except ValueError as e:
+            await interaction.followup.send(f"❌ {e}", ephemeral=True); return
+        if player_ids == []:
+            await interaction.followup.send(f"ℹ️ 대상 유저가 없습니다. ({label})", ephemeral=True); return
+
+        try:
+            state = await self.bot.guild_states.get(interaction.guild_id)
+            # 경기 중인 로비에서도 빼고(정산 제외), 대기열 제외는 메모리에 바로 반영한 뒤 DB에는 저널을 거쳐 삭제 요청 하나로 반영됩니다.
+            removed, dropped = state.kick(state.queue_store.head() if player_ids is None else player_ids)
+            response_messages = [f"✅ 대상: {label} · 대기열에서 {len(removed)}명을 제외했습니다."]
+            if dropped:
+                response_messages.append("🎮 경기 중이던 로비에서도 제외했습니다: " + ", ".join(f"로비 {lobby_id} ({len(ids)}명)" for lobby_id, ids in sorted(dropped.items())))
+
+            if 시간 > 0 or 스트라이크 > 0:
+                penalty_end_time = datetime.now(timezone.utc) + timedelta(minutes=시간) if 시간 > 0 else None
+                rows = await state.player_repo.penalize_many(player_ids, strikes=스트라이크, penalty_ends_at=penalty_end_time.isoformat() if penalty_end_time else None)
+                if 시간 > 0:
+                    response_messages.append(f"🚫 {len(rows)}명에게 {시간}분 타임아웃을 부여했습니다. (<t:{int(penalty_end_time.timestamp())}:R>까지)")
+                if 스트라이크 > 0:
+                    response_messages.append(f"🏏 {len(rows)}명에게 스트라이크 {스트라이크}개를 부여했습니다.")
+                if player_ids is not None and len(rows) < len(player_ids):
+                    response_messages.append(f"⚠️ `/정보등록`을 하지 않은 {len(player_ids) - len(rows)}명에게는 페널티를 부여하지 못했습니다.")
+
+            await interaction.followup.send("\n".join(response_messages), ephemeral=True)
+        except Exception as e:
+            print(f"멤버 일괄 제외 오류: {e}")
+            await interaction.followup.send("❌ 처리 중 오류가 발생했습니다.", ephemeral=True)
+
+    @app_commands.command(name="스트라이크일괄초기화", description="[페널티 관리] 여러 유저의 스트라이크를 한 번에 0개로 초기화합니다.")
+    @app_commands.describe(유저목록="대상 유저 멘션 또는 ID (공백/쉼표로 구분)", 역할="이 역할을 가진 모든 유저를 대상으로 합니다", 전체="서버 전체를 대상으로 합니다 (시즌 초기화 등)")
+    @app_commands.checks.has_permissions(administrator=True)
+    async def bulk_reset_strikes_command(self, interaction: discord.Interaction, 유저목록: str = None, 역할: discord.Role = None, 전체: bool = False):
+        await interaction.response.defer(ephemeral=True)
+        try:
+            player_ids, label = self.resolve_targets(유저목록, 역할, 전체)
+        except ValueError as e:
+            await interaction.followup.send(f"❌ {e}", ephemeral=True); return
+        if player_ids == []:
+            await interaction.followup.send(f"ℹ️ 대상 유저가 없습니다. ({label})", ephemeral=True); return
+        try:
+            state = await self.bot.guild_states.get(interaction.guild_id)
+            rows = await state.player_repo.reset_strikes_many(player_ids)
+            await interaction.followup.send(f"✅ 대상: {label} · 스트라이크가 남아 있던 {len(rows)}명을 0개로 초기화했습니다.", ephemeral=True)
+        except Exception as e:
+            print(f"스트라이크 일괄 초기화 오류: {e}"); await interaction.followup.send("❌ 스트라이크 초기화 처리 중 오류가 발생했습니다.", ephemeral=True)
+
+    @app_commands.command(name="포인트일괄관리", description="[포인트 관리] 여러 유저의 포인트를 한 번에 조정합니다.")
+    @app_commands.describe(
+        작업="포인트를 증가시킬지 또는 감소시킬지 선택하세요.",
+        포인트="조정할 포인트 값",
+        유저목록="대상 유저 멘션 또는 ID (공백/쉼표로 구분)",
+        역할="이 역할을 가진 모든 유저를 대상으로 합니다",
+        전체="서버 전체를 대상으로 합니다",
+    )
+    @app_commands.choices(작업=[
+        app_commands.Choice(name="증가", value="increase"),
+        app_commands.Choice(name="감소", value="decrease"),
+    ])
+    @app_commands.checks.has_permissions(administrator=True)
+    async def bulk_manage_points_command(self, interaction: discord.Interaction, 작업: app_commands.Choice[str], 포인트: int, 유저목록: str = None, 역할: discord.Role = None, 전체: bool = False):
+        await interaction.response.defer(ephemeral=True)
+        if 포인트 <= 0:
+            await interaction.followup.send("❌ 포인트는 1 이상의 숫자여야 합니다.", ephemeral=True); return
+        try:
+            player_ids, label = self.resolve_targets(유저목록, 역할, 전체)
+        except ValueError as e:
+            await interaction.followup.send(f"❌ {e}", ephemeral=True); return
+        if player_ids == []:
+            await interaction.followup.send(f"ℹ️ 대상 유저가 없습니다. ({label})", ephemeral=True); return
+
+        try:
+            state = await self.bot.guild_states.get(interaction.guild_id)
+            # /포인트관리 와 같은 규칙(0 미만 불가, 바뀐 만큼 원장/시즌 집계 기록)을 대상 전체에 한 번에 적용합니다.
+            delta = 포인트 if 작업.value == "increase" else -포인트
+            rows = await state.player_repo.adjust_points_many(player_ids, delta, state.season)
+            message = f"✅ 대상: {label} · 등록된 {len(rows)}명의 포인트를 {포인트}점 {작업.name}시켰습니다."
+            if player_ids is not None and len(rows) < len(player_ids):
+                message += f"\n⚠️ `/정보등록`을 하지 않은 {len(player_ids) - len(rows)}명은 제외되었습니다."
+            await interaction.followup.send(message, ephemeral=True)
+        except Exception as e:
+            print(f"포인트 일괄 관리 오류: {e}")
+            await interaction.followup.send("❌ 포인트 관리 중 오류가 발생했습니다.", ephemeral=True)
+
+    @app_commands.command(name="플레이어내보내기", description="이 서버의 플레이어 정보를 CSV/JSON 파일로 내보냅니다. (관리자용)")
+    @app_commands.describe(형식="파일 형식 (기본 CSV)")
+    @app_commands.choices(형식=[
+        app_commands.Choice(name="CSV", value="csv"),
+        app_commands.Choice(name="JSON (한 줄에 한 명)", value="jsonl"),
+    ])
+    @app_commands.checks.has_permissions(administrator=True)
+    async def export_players_command(self, interaction: discord.Interaction, 형식: app_commands.Choice[str] = None):
+        await interaction.response.defer(ephemeral=True)
+        fmt = 형식.value if 형식 else 'csv'
+        try:
+            state = await self.bot.guild_states.get(interaction.guild_id)
+            # 페이지 단위로 임시 파일에 바로 기록하므로 인원이 많아도 메모리에는 한 페이지만 올라갑니다.
+            with tempfile.TemporaryFile() as fp:
+                count = await export_players(state.player_repo, fp, fmt)
+                fp.seek(0)
+                filename = f"players_{interaction.guild_id}_{datetime.now(timezone.utc):%Y%m%d}.{fmt}"
+                await interaction.followup.send(f"✅ 플레이어 {count}명의 정보를 내보냈습니다.", file=discord.File(fp, filename=filename), ephemeral=True)
+        except Exception as e:
+            print(f"플레이어 내보내기 오류: {e}")
+            await interaction.followup.send("❌ 플레이어 정보를 내보내는 중 오류가 발생했습니다.", ephemeral=True)
+
+    @app_commands.command(name="플레이어가져오기", description="CSV/JSON 파일의 플레이어 정보를 이 서버에 등록(덮어쓰기)합니다. (관리자용)")
+    @app_commands.describe(파일="/플레이어내보내기 형식의 .csv 또는 .jsonl 파일 (파일에 있는 항목만 덮어씁니다)")
+    @app_commands.checks.has_permissions(administrator=True)
+    async def import_players_command(self, interaction: discord.Interaction, 파일: discord.Attachment):
+        await interaction.response.defer(ephemeral=True)
+        fmt = format_of(파일.filename)
+        if fmt is None:
+            await interaction.followup.send("❌ `.csv` 또는 `.jsonl` 파일만 가져올 수 있습니다.", ephemeral=True); return
+        try:
+            state = await self.bot.guild_states.get(interaction.guild_id)
+            with tempfile.TemporaryFile() as fp:
+                await 파일.save(fp)
+                fp.seek(0)
+                imported, skipped = await import_players(state.player_repo, fp, fmt)
+            message = f"✅ 플레이어 {imported}명의 정보를 가져왔습니다."
+            if skipped:
+                message += f" (읽을 수 없는 행 {skipped}개는 건너뛰었습니다)"
+            await interaction.followup.send(message, ephemeral=True)
+        except Exception as e:
+            print(f"플레이어 가져오기 오류: {e}")
+            await interaction.followup.send("❌ 플레이어 정보를 가져오는 중 오류가 발생했습니다.", ephemeral=True)
+
+
+    @app_commands.command(name="봇상태", description="명령어 처리 시간, DB 요청 수, 이벤트 루프 지연 등 봇 상태를 확인합니다. (관리자용)")
+    @app_commands.checks.has_permissions(administrator=True)
+    async def status_command(self, interaction: discord.Interaction):
+        state = await self.bot.guild_states.get(interaction.guild_id)
+        metrics = self.bot.metrics
+        uptime = int(time.time() - metrics.started_at)
+        embed = discord.Embed(title="📊 봇 상태", description=f"가동 시간 {uptime // 3600}시간 {uptime % 3600 // 60}분", color=discord.Color.blurple())
+
+        lag = metrics.loop_lag
+        embed.add_field(name="⏱️ 이벤트 루프 지연", value=f"p50 `{lag.quantile(0.5) * 1000:.1f}ms` / p99 `{lag.quantile(0.99) * 1000:.1f}ms` / 최대 `{lag.max * 1000:.1f}ms`", inline=False)
+
+        # 평균 처리 시간이 긴 순서로 최대 10개
+        handlers = sorted(metrics.latency.items(), key=lambda item: item[1].sum / item[1].count, reverse=True)[:10]
+        handler_lines = [f"`{name}` {h.count}회 · p50 `{h.quantile(0.5) * 1000:.0f}ms` · p95 `{h.quantile(0.95) * 1000:.0f}ms`" for name, h in handlers]
+        embed.add_field(name="⚙️ 명령어/버튼 처리 시간", value="\n".join(handler_lines) or "기록 없음", inline=False)
+
+        db_lines = [f"`{target}` {h.count}회 · 오류 {metrics.db_errors.get(target, 0)} · p95 `{h.quantile(0.95) * 1000:.0f}ms`" for target, h in sorted(metrics.db_latency.items())]
+        embed.add_field(name="🗄️ DB 요청", value="\n".join(db_lines) or "기록 없음", inline=False)
+        throttle_lines = [f"`{name}` {value}회" for name, value in sorted(metrics.counters.items()) if name.startswith('throttle_')]
+        embed.add_field(name="🚦 요청 제한", value="\n".join(throttle_lines) or "기록 없음", inline=False)
+        journal_lines = [f"`{name}` {value}건" for name, value in sorted(metrics.counters.items()) if name.startswith('journal_')]
+        if journal_lines:
+            embed.add_field(name="🧾 DB 반영 실패 (저널)", value="\n".join(journal_lines), inline=False)
+
+        cache = state.player_repo.cache.stats()
+        embed.add_field(name="📦 이 서버 상태", value=f"대기열 {len(state.queue_store)}명 · 로비 {len(state.lobbies)}개 (경기 중 {state.lobbies.in_play()}명) · DB 미반영 {len(state.writer)}건 · 랭킹 {len(state.ranking)}명 · 플레이어 캐시 적중률 {cache['hit_rate'] * 100:.0f}% ({cache['hits']}/{cache['hits'] + cache['misses']}) · 랭킹 페이지 캐시 {len(state.leaderboard)}장 (적중 {state.leaderboard.hits}/{state.leaderboard.hits + state.leaderboard.misses})", inline=False)
+        embed.add_field(name="🌐 서버", value=f"불러온 서버 {len(self.bot.guild_states)}곳 · 샤드 {self.bot.shard_count or 1}개", inline=False)
+        await interaction.response.send_message(embed=embed, ephemeral=True)
 
     @app_commands.command(name="db테스트", description="Supabase DB 쓰기 권한을 테스트합니다. (관리자용)")
     @app_commands.checks.has_permissions(administrator=True)
@@ -361,7 +658,7 @@ class Management(commands.Cog):
 
             # 2. test_logs 테이블에 간단한 데이터를 하나 추가(INSERT)합니다.
             log_entry = {'log_message': 'Test from Raspberry Pi'}
-            response = self.bot.supabase.table('test_logs').insert(log_entry).execute()
+            response = await self.bot.db.execute(self.bot.db.table('test_logs').insert(log_entry))
 
             # 3. 성공 여부에 따라 원래 보냈던 메시지를 수정합니다.
             if response.data:
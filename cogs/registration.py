@@ -4,6 +4,10 @@ import discord
 from discord import app_commands
 from discord.ext import commands
 
+from core.leaderboard import LeaderboardPage
+from core.seasons import active_streak
+from core.throttle import Throttled
+
 # 정보 등록을 위한 팝업(Modal) 클래스
 class PlayerInfoModal(discord.ui.Modal, title="내전 참여 정보 등록"):
     def __init__(self, bot: commands.Bot):
@@ -17,114 +21,202 @@ class PlayerInfoModal(discord.ui.Modal, title="내전 참여 정보 등록"):
 
     async def on_submit(self, interaction: discord.Interaction):
         try:
-            response = self.bot.supabase.table('players').upsert({'id': interaction.user.id, 'valorant_nickname': self.valorant_nickname.value, 'chzzk_nickname': self.chzzk_nickname.value, 'highest_tier': self.highest_tier.value, 'current_tier': self.current_tier.value}).execute()
-            if response.data: await interaction.response.send_message("✅ 정보가 성공적으로 등록(수정)되었습니다!", ephemeral=True)
+            self.bot.throttle.take('register', interaction.guild_id, interaction.user.id)
+        except Throttled as e:
+            await interaction.response.send_message(e.notice, ephemeral=True); return
+        try:
+            state = await self.bot.guild_states.get(interaction.guild_id)
+            saved = await state.player_repo.upsert({'id': interaction.user.id, 'valorant_nickname': self.valorant_nickname.value, 'chzzk_nickname': self.chzzk_nickname.value, 'highest_tier': self.highest_tier.value, 'current_tier': self.current_tier.value})
+            if saved: await interaction.response.send_message("✅ 정보가 성공적으로 등록(수정)되었습니다!", ephemeral=True)
             else: raise Exception("Supabase 응답에 데이터가 없습니다.")
         except Exception as e:
             print(f"DB 저장 오류: {e}"); await interaction.response.send_message("❌ 정보를 저장하는 중 오류가 발생했습니다.", ephemeral=True)
 
+# 랭킹 이전/다음 버튼
+# 키셋 커서(포인트, player_id)를 custom_id 에 담으므로 저장해 둘 상태가 없고, 재시작 후에도 예전 랭킹 메시지의 버튼이 동작합니다.
+class LeaderboardButton(discord.ui.DynamicItem[discord.ui.Button], template=r'leaderboard:(?P<direction>after|before):(?P<points>-?\d+):(?P<player_id>\d+)'):
+    def __init__(self, direction: str, cursor: tuple, enabled: bool = True):
+        neg_points, player_id = cursor
+        super().__init__(discord.ui.Button(
+            label="◀ 이전" if direction == 'before' else "다음 ▶",
+            style=discord.ButtonStyle.secondary,
+            custom_id=f"leaderboard:{direction}:{-neg_points}:{player_id}",
+            disabled=not enabled,
+        ))
+        self.direction = direction
+        self.cursor = cursor
+
+    @classmethod
+    async def from_custom_id(cls, interaction: discord.Interaction, item: discord.ui.Button, match):
+        return cls(match['direction'], (-int(match['points']), int(match['player_id'])))
+
+    async def callback(self, interaction: discord.Interaction):
+        bot = interaction.client
+        bot.metrics.interaction_started(interaction.id)
+        try:
+            leaderboard = (await bot.guild_states.get(interaction.guild_id)).leaderboard
+            page = leaderboard.page(self.direction, self.cursor)
+            embed, view = leaderboard.embed(page), leaderboard_view(page)
+            # 공개 랭킹 메시지에서 누르면 누른 사람에게만 보이는 페이지를 새로 열어, 여러 시청자가 한 메시지를 두고 다투지 않게 합니다.
+            if interaction.message and interaction.message.flags.ephemeral:
+                await interaction.response.edit_message(embed=embed, view=view)
+            elif view is None:
+                await interaction.response.send_message(embed=embed, ephemeral=True)
+            else:
+                await interaction.response.send_message(embed=embed, view=view, ephemeral=True)
+        except Exception as e:
+            print(f"랭킹 페이지 오류: {e}")
+            if not interaction.response.is_done():
+                await interaction.response.send_message("❌ 랭킹을 불러오는 중 오류가 발생했습니다.", ephemeral=True)
+        finally:
+            bot.metrics.interaction_finished(interaction.id, 'button:leaderboard')
+
+def leaderboard_view(page: LeaderboardPage):
+    # 한 페이지로 끝나면 버튼을 붙이지 않습니다.
+    if not page.has_prev and not page.has_next:
+        return None
+    view = discord.ui.View(timeout=None)
+    view.add_item(LeaderboardButton('before', page.first, page.has_prev))
+    view.add_item(LeaderboardButton('after', page.last, page.has_next))
+    return view
+
 class Registration(commands.Cog):
     def __init__(self, bot: commands.Bot):
         self.bot = bot
 
+    async def _reply(self, interaction: discord.Interaction, scope: str, build, args: tuple = (), ephemeral: bool = True):
+        # 유저별 요청 제한을 거친 뒤 응답 내용(send 인자)을 만듭니다. 같은 유저의 같은 요청이 처리 중이면 그 결과를 함께 씁니다.
+        try:
+            return await self.bot.throttle.run(scope, interaction.guild_id, interaction.user.id, build, args)
+        except Throttled as e:
+            await interaction.followup.send(e.notice, ephemeral=True)
+            return None
+
     @app_commands.command(name="정보등록", description="내전 참여를 위한 정보를 등록하거나 수정합니다.")
+    @app_commands.guild_only()
     async def register_command(self, interaction: discord.Interaction):
         await interaction.response.send_modal(PlayerInfoModal(self.bot))
 
     # cogs/registration.py 파일의 my_rank_command 함수
 
     @app_commands.command(name="내순서", description="현재 나의 내전 대기열 순서를 확인합니다.")
+    @app_commands.guild_only()
     async def my_rank_command(self, interaction: discord.Interaction):
         await interaction.response.defer(ephemeral=True)
         try:
-            queue_response = self.bot.supabase.table('queue').select('player_id').order('created_at').execute()
-            if not queue_response.data:
-                await interaction.followup.send("현재 대기열이 비어있습니다.", ephemeral=True)
-                return
-            
-            all_player_ids = [player['player_id'] for player in queue_response.data]
-        
-            if interaction.user.id in all_player_ids:
-                rank = all_player_ids.index(interaction.user.id) + 1
-            
-                # [수정] 10순위 이내인지, 대기열인지 구분하여 응답
-                if rank <= 10:
-                    await interaction.followup.send(f"회원님은 현재 **다음 내전 참여 멤버({rank}순위)**입니다!", ephemeral=True)
-                else:
-                    wait_rank = rank - 10
-                    await interaction.followup.send(f"현재 회원님의 실제 대기 순서는 **{wait_rank}번**입니다. (전체 순위: {rank}번)", ephemeral=True)
-            else:
-                await interaction.followup.send("회원님은 현재 대기열에 없습니다. '내전 참여' 버튼을 눌러주세요.", ephemeral=True)
+            reply = await self._reply(interaction, 'my_rank', lambda: self._my_rank_reply(interaction))
+            if reply:
+                await interaction.followup.send(**reply, ephemeral=True)
         except Exception as e:
             print(f"내 순서 확인 오류: {e}")
             await interaction.followup.send("❌ 순서 확인 중 오류가 발생했습니다.", ephemeral=True)
+
+    async def _my_rank_reply(self, interaction: discord.Interaction) -> dict:
+        state = await self.bot.guild_states.get(interaction.guild_id)
+        queue_store = state.queue_store
+        lobby = state.lobbies.lobby_of(interaction.user.id)
+        if lobby is not None:
+            return {'content': f"회원님은 현재 **로비 {lobby.id}** 내전에 참여 중입니다."}
+        if not len(queue_store):
+            return {'content': "현재 대기열이 비어있습니다."}
+
+        rank = queue_store.position(interaction.user.id)
+        if rank is None:
+            return {'content': "회원님은 현재 대기열에 없습니다. '내전 참여' 버튼을 눌러주세요."}
+        # [수정] 10순위 이내인지, 대기열인지 구분하여 응답
+        if rank <= 10:
+            return {'content': f"회원님은 현재 **다음 내전 참여 멤버({rank}순위)**입니다!"}
+        wait_rank = rank - 10
+        return {'content': f"현재 회원님의 실제 대기 순서는 **{wait_rank}번**입니다. (전체 순위: {rank}번)"}
     
     @app_commands.command(name="포인트", description="나의 현재 내전 포인트와 전체 랭킹을 확인합니다.")
+    @app_commands.guild_only()
     async def my_points_command(self, interaction: discord.Interaction):
         await interaction.response.defer(ephemeral=True)
         try:
-            user_id = interaction.user.id
-        
-            # 1. [수정] DB에서 모든 유저의 포인트 정보를 랭킹 순으로 가져옵니다.
-            all_players_res = self.bot.supabase.table('players').select('id, points').order('points', desc=True).execute()
-        
-            if not all_players_res.data:
-                await interaction.followup.send("아직 랭킹 데이터가 없습니다.", ephemeral=True)
-                return
-
-            all_players = all_players_res.data
-        
-            # 2. [신규] 내 순위와 포인트를 찾습니다.
-            my_rank = -1
-            my_points = 0
-        
-            for idx, player in enumerate(all_players):
-                if player['id'] == user_id:
-                    my_rank = idx + 1
-                    my_points = player.get('points', 0)
-                    break
-        
-            # 3. [수정] 결과에 따라 다른 메시지를 보냅니다.
-            if my_rank != -1:
-                await interaction.followup.send(
-                    f"현재 {interaction.user.mention} 님의 내전 포인트는 **{my_points}점** 입니다. (전체 랭킹: **{my_rank}등**)",
-                    ephemeral=True
-                )
-            else:
-                # 랭킹에 없다는 것은 정보 등록을 안 했거나 포인트가 0점인 경우
-                await interaction.followup.send("아직 `/정보등록`을 하지 않았거나 내전 참여 기록이 없습니다.", ephemeral=True)
-
+            reply = await self._reply(interaction, 'points', lambda: self._my_points_reply(interaction))
+            if reply:
+                await interaction.followup.send(**reply, ephemeral=True)
         except Exception as e:
             print(f"포인트 확인 오류: {e}")
             await interaction.followup.send("❌ 포인트 확인 중 오류가 발생했습니다.", ephemeral=True)
+
+    async def _my_points_reply(self, interaction: discord.Interaction) -> dict:
+        user_id = interaction.user.id
+        ranking = (await self.bot.guild_states.get(interaction.guild_id)).ranking
+
+        # 1. 이 서버의 랭킹 인덱스를 확인합니다. (DB 요청 없음)
+        if not len(ranking):
+            return {'content': "아직 랭킹 데이터가 없습니다."}
+
+        # 2. 내 순위와 포인트를 찾습니다. 동점자는 같은 순위입니다.
+        my_rank = ranking.rank(user_id)
+        my_points = ranking.points(user_id)
+
+        # 3. [수정] 결과에 따라 다른 메시지를 보냅니다.
+        if my_rank is not None:
+            return {'content': f"현재 {interaction.user.mention} 님의 내전 포인트는 **{my_points}점** 입니다. (전체 랭킹: **{my_rank}등**)"}
+        # 랭킹에 없다는 것은 정보 등록을 안 했거나 포인트가 0점인 경우
+        return {'content': "아직 `/정보등록`을 하지 않았거나 내전 참여 기록이 없습니다."}
+
+    @app_commands.command(name="전적", description="시즌별 내전 참여 횟수, 획득 포인트, 연속 참여 기록을 확인합니다.")
+    @app_commands.describe(유저="전적을 확인할 유저 (기본: 나)", 시즌="확인할 시즌 (기본: 현재 시즌, 예: 2026-Q3)")
+    @app_commands.guild_only()
+    async def match_record_command(self, interaction: discord.Interaction, 유저: discord.User = None, 시즌: str = None):
+        await interaction.response.defer(ephemeral=True)
+        try:
+            target = 유저 or interaction.user
+            reply = await self._reply(interaction, 'record', lambda: self._match_record_reply(interaction, target, 시즌), args=(target.id, 시즌))
+            if reply:
+                await interaction.followup.send(**reply, ephemeral=True)
+        except Exception as e:
+            print(f"전적 확인 오류: {e}")
+            await interaction.followup.send("❌ 전적 확인 중 오류가 발생했습니다.", ephemeral=True)
+
+    async def _match_record_reply(self, interaction: discord.Interaction, target, season: str) -> dict:
+        state = await self.bot.guild_states.get(interaction.guild_id)
+        season = season or state.season
+        # 정산 때마다 증분 갱신되는 시즌 집계 행 하나만 읽습니다. (기록 길이와 무관한 조회)
+        stats = await state.season_stats.get(target.id, season)
+        if not stats:
+            return {'content': f"{target.mention} 님의 `{season}` 시즌 내전 기록이 없습니다."}
+
+        embed = discord.Embed(title=f"📜 {target.display_name} 님의 전적", description=f"시즌 `{season}`", color=discord.Color.teal())
+        embed.add_field(name="참여 경기", value=f"**{stats['games']}**회", inline=True)
+        embed.add_field(name="시즌 포인트", value=f"**{stats['match_points'] + stats['adjusted_points']}**점", inline=True)
+        embed.add_field(name="내전 / 조정", value=f"{stats['match_points']}점 / {stats['adjusted_points']:+d}점", inline=True)
+        embed.add_field(name="연속 참여", value=f"현재 **{active_streak(stats['current_streak'], stats['last_played_on'])}**일 · 최고 **{stats['best_streak']}**일", inline=True)
+        embed.add_field(name="마지막 참여", value=str(stats['last_played_on']) if stats['last_played_on'] else "없음", inline=True)
+        rank = state.ranking.rank(target.id)
+        if rank is not None:
+            embed.add_field(name="전체 랭킹", value=f"**{rank}등** ({state.ranking.points(target.id)}점)", inline=True)
+        return {'embed': embed}
     
-    @app_commands.command(name="랭킹", description="서버 내 내전 포인트 랭킹 TOP 10을 보여줍니다.")
+    @app_commands.command(name="랭킹", description="서버 내 내전 포인트 랭킹을 페이지 단위로 보여줍니다.")
+    @app_commands.guild_only()
     async def rank_command(self, interaction: discord.Interaction):
         await interaction.response.defer()
         try:
-            # points 컬럼을 기준으로 내림차순 정렬하여 상위 10명을 가져옵니다.
-            rankers_res = self.bot.supabase.table('players').select('id, points').order('points', desc=True).limit(10).execute()
-        
-            if not rankers_res.data:
+            # 이 서버의 랭킹 인덱스에서 첫 페이지를 가져옵니다. (그려 둔 페이지가 있으면 그대로 사용, DB/Discord API 요청 없음)
+            leaderboard = (await self.bot.guild_states.get(interaction.guild_id)).leaderboard
+            page = await self._reply(interaction, 'rank', lambda: self._first_page(leaderboard))
+            if page is None:
+                return
+            if not page.keys:
                 await interaction.followup.send("아직 랭킹 데이터가 없습니다."); return
-
-            embed = discord.Embed(title="🏆 내전 포인트 랭킹", description="서버 내 포인트 랭킹 TOP 10입니다.", color=discord.Color.blue())
-        
-            rank_list = []
-            for idx, ranker in enumerate(rankers_res.data):
-                try:
-                    user = await self.bot.fetch_user(ranker['id'])
-                    mention = user.mention
-                except discord.NotFound:
-                    mention = f"ID: {ranker['id']} (알 수 없음)"
-            
-                points = ranker.get('points', 0)
-                rank_list.append(f"`{idx + 1:2d}` {mention} - **{points}점**")
-        
-            embed.add_field(name="TOP 10", value="\n".join(rank_list), inline=False)
-            await interaction.followup.send(embed=embed)
+            # 버튼(View)은 메시지마다 따로 만들어야 하므로 합쳐진 요청도 각자 만듭니다.
+            view = leaderboard_view(page)
+            if view is None:
+                await interaction.followup.send(embed=leaderboard.embed(page))
+            else:
+                await interaction.followup.send(embed=leaderboard.embed(page), view=view)
         except Exception as e:
             print(f"랭킹 확인 오류: {e}"); await interaction.followup.send("❌ 랭킹을 불러오는 중 오류가 발생했습니다.")
 
+    async def _first_page(self, leaderboard) -> LeaderboardPage:
+        return leaderboard.page()
+
 async def setup(bot: commands.Bot):
+    # 랭킹 페이지 버튼은 custom_id 패턴으로 처리하므로 재시작 전에 보낸 메시지의 버튼도 동작합니다.
+    bot.add_dynamic_items(LeaderboardButton)
     await bot.add_cog(Registration(bot))
\ No newline at end of file
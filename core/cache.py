@@ -0,0 +1,111 @@
+# core/cache.py
+
+import time
+from collections import OrderedDict, deque
+
+MISSING = object()
+
+# 크기 제한(LRU)과 유효 시간(TTL)을 함께 적용하는 간단한 캐시
+class TTLCache:
+    def __init__(self, maxsize: int = 1024, ttl: float = 300.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()  # key -> (만료 시각, 값)
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def get(self, key):
+        # 없거나 만료되었으면 MISSING 을 반환합니다. (None 도 유효한 값으로 저장할 수 있습니다)
+        item = self._data.get(key)
+        if item is None or item[0] < time.monotonic():
+            if item is not None:
+                del self._data[key]
+            self.misses += 1
+            return MISSING
+        self._data.move_to_end(key)
+        self.hits += 1
+        return item[1]
+
+    def set(self, key, value):
+        self._data[key] = (time.monotonic() + self.ttl, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def update(self, key, fields: dict):
+        # 캐시에 있는 dict 값만 제자리에서 갱신합니다. 없으면 아무것도 하지 않습니다.
+        item = self._data.get(key)
+        if item is None or not isinstance(item[1], dict):
+            return False
+        item[1].update(fields)
+        return True
+
+    def invalidate(self, key):
+        self._data.pop(key, None)
+
+    def clear(self):
+        self._data.clear()
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            'size': len(self._data),
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / total if total else 0.0,
+        }
+
+# 최근 window 초 안에 로컬에서 변경한 키 집합
+# 주기적인 DB 비교(랭킹 검증, 대기열 다시 불러오기)에서 아직 반영 중일 수 있는 유저를 건너뛰는 데 사용합니다.
+class RecentKeys:
+    def __init__(self, window: float = 10.0):
+        self.window = window
+        self._touched = {}  # key -> 마지막 변경 시각
+
+    def touch(self, key):
+        now = time.monotonic()
+        self._touched[key] = now
+        if len(self._touched) > 1024:
+            self._touched = {k: t for k, t in self._touched.items() if now - t < self.window}
+
+    def __contains__(self, key) -> bool:
+        touched = self._touched.get(key)
+        return touched is not None and time.monotonic() - touched < self.window
+
+# 로컬에서 DB에 쓴 값 목록 (키마다 쓴 순서대로)
+# 변경 피드(core/change_feed.py)로 돌아온 값을 시간 창이 아니라 쓴 값과 비교해 자기 자신의 변경(에코)을 알아봅니다.
+# - 에코 뒤에 로컬에서 더 쓴 값이 남아 있으면 이미 지난 값이므로 적용하지 않습니다. (superseded)
+# - 쓴 값과 다른 변경(대시보드, 다른 샤드)은 언제 도착해도 적용합니다. 저널 재생처럼 늦게 도착한 에코도 값으로 걸러냅니다.
+class EchoFilter:
+    def __init__(self, same=None, maxlen: int = 16, ttl: float = 3600.0):
+        self.same = same or (lambda expected, value: expected == value)
+        self.maxlen = maxlen
+        self.ttl = ttl
+        self._pending = {}  # key -> deque[(쓴 시각, 값)]
+
+    def expect(self, key, value):
+        now = time.monotonic()
+        pending = self._pending.get(key)
+        if pending is None:
+            pending = self._pending[key] = deque(maxlen=self.maxlen)
+        pending.append((now, value))
+        # DB가 거절해 돌아오지 않는 값은 오래되면 정리합니다.
+        if len(self._pending) > 1024:
+            self._pending = {k: q for k, q in self._pending.items() if now - q[-1][0] < self.ttl}
+
+    def superseded(self, key, value) -> bool:
+        # value 가 로컬에서 쓴 값의 에코이면 그 값까지 확인 처리하고, 그 뒤에 쓴 값이 남아 있으면 True 를 반환합니다.
+        pending = self._pending.get(key)
+        if not pending:
+            return False
+        for index, (_, expected) in enumerate(pending):
+            if self.same(expected, value):
+                for _ in range(index + 1):
+                    pending.popleft()
+                if not pending:
+                    del self._pending[key]
+                return bool(pending)
+        return False
@@ -0,0 +1,182 @@
+# core/change_feed.py
+
+import asyncio
+import time
+from datetime import datetime
+
+from .guilds import GuildStates
+
+TABLES = ('players', 'queue')
+
+# Supabase realtime(postgres_changes) 구독
+# DB에서 publication/replica identity 설정이 필요합니다. (sql/004_realtime_publication.sql)
+class RealtimeChangeFeed:
+    def __init__(self, url: str, key: str, tables=TABLES):
+        self.url = url
+        self.key = key
+        self.tables = tables
+        self._client = None
+        self._channel = None
+
+    async def start(self, on_event, on_status):
+        from supabase import acreate_client
+        self._on_event, self._on_status = on_event, on_status
+        self._client = await acreate_client(self.url, self.key)
+        await self._subscribe()
+
+    async def restart(self):
+        channel, self._channel = self._channel, None
+        if channel is not None:
+            await self._client.remove_channel(channel)
+        await self._subscribe()
+
+    async def stop(self):
+        self._channel = None
+        if self._client is not None:
+            await self._client.remove_all_channels()
+
+    async def _subscribe(self):
+        channel = self._channel = self._client.channel('valpassbot-db-changes')
+        for table in self.tables:
+            channel.on_postgres_changes('*', schema='public', table=table, callback=lambda payload: self._on_event(payload['data']))
+        await channel.subscribe(lambda state, error: self._channel_status(channel, state, error))
+
+    def _channel_status(self, channel, state, error):
+        # 재연결로 교체했거나 stop() 으로 지운 채널의 상태(CLOSED 등)는 무시합니다.
+        if channel is self._channel:
+            self._on_status(getattr(state, 'value', state), error)
+
+# 로컬 테스트용 변경 피드: core/memory_backend.py 의 MemorySupabase 가 발생시키는 이벤트를 전달합니다.
+class MemoryChangeFeed:
+    def __init__(self, backend):
+        self.backend = backend
+        self.connected = False
+
+    async def start(self, on_event, on_status):
+        self._loop = asyncio.get_running_loop()
+        self._on_event, self._on_status = on_event, on_status
+        self.backend.subscribers.append(self._publish)
+        self.connected = True
+        on_status('SUBSCRIBED', None)
+
+    async def restart(self):
+        self.connected = True
+        self._on_status('SUBSCRIBED', None)
+
+    async def stop(self):
+        self.backend.subscribers.remove(self._publish)
+
+    def disconnect(self):
+        # 연결 끊김을 흉내 냅니다. 끊긴 동안의 이벤트는 유실됩니다.
+        self.connected = False
+        self._on_status('CLOSED', None)
+
+    def _publish(self, payload):
+        # DB 작업은 스레드 풀에서 실행되므로 이벤트 루프로 넘겨서 처리합니다.
+        if self.connected:
+            self._loop.call_soon_threadsafe(self._on_event, payload['data'])
+
+# 변경 피드를 서버별 로컬 상태(대기열, 플레이어 캐시, 랭킹)에 증분 적용합니다.
+# 아직 불러오지 않은 서버의 변경은 무시합니다. (처음 사용할 때 최신 스냅샷을 불러옵니다)
+# 연결이 끊겼다가 다시 연결되거나 이벤트가 max_lag 초 이상 늦게 도착하면 DB 스냅샷으로 다시 맞춥니다.
+class ChangeFeedSync:
+    def __init__(self, feed, guild_states: GuildStates, max_lag: float = 30.0, reconnect_delay: float = 5.0):
+        self.feed = feed
+        self.guild_states = guild_states
+        self.max_lag = max_lag
+        self.reconnect_delay = reconnect_delay
+        self.applied = 0
+        self.resyncs = 0
+        self._stale = False
+        self._resync_task = None
+        self._reconnect_task = None
+        self._stopping = False
+        # 지금까지 가장 빨리 도착한 이벤트의 (로컬 단조 시각 - DB 커밋 시각). 두 시계의 차이(skew)가 그대로 담긴 기준값입니다.
+        self._min_offset = None
+
+    def _lag(self, commit_timestamp: str) -> float:
+        # DB 커밋 시각과 로컬 시계를 직접 비교하지 않고, 가장 빨랐던 이벤트보다 얼마나 늦게 도착했는지로 지연을 잽니다. (시계 차이와 무관)
+        committed = datetime.fromisoformat(commit_timestamp.replace('Z', '+00:00')).timestamp()
+        offset = time.monotonic() - committed
+        if self._min_offset is None or offset < self._min_offset:
+            self._min_offset = offset
+        return offset - self._min_offset
+
+    async def start(self):
+        self._stopping = False
+        await self.feed.start(self._on_event, self._on_status)
+
+    async def stop(self):
+        self._stopping = True
+        # 종료 후 닫힌 db 로 재연결/재동기화하지 않도록 진행 중인 작업도 멈춥니다.
+        for task in (self._reconnect_task, self._resync_task):
+            if task is not None:
+                task.cancel()
+        await self.feed.stop()
+
+    def _on_event(self, data: dict):
+        try:
+            if self._lag(data['commit_timestamp']) > self.max_lag:
+                print(f"⚠️ 변경 피드 지연 감지 ({data['commit_timestamp']}), 스냅샷으로 다시 맞춥니다.")
+                self.schedule_resync()
+                return
+            self._apply(data)
+            self.applied += 1
+        except Exception as e:
+            print(f"변경 피드 적용 오류: {e}")
+            self.schedule_resync()
+
+    def _apply(self, data: dict):
+        record, old_record = data.get('record'), data.get('old_record')
+        deleted = data['type'] == 'DELETE'
+        row = old_record if deleted else record
+        state = self.guild_states.loaded(row['guild_id'])
+        if state is None:
+            return
+        if data['table'] == 'players':
+            state.player_repo.apply_remote(row['id'], None if deleted else record)
+        elif data['table'] == 'queue':
+            if deleted:
+                state.queue_store.apply_remote(row['player_id'], deleted=True)
+            else:
+                state.queue_store.apply_remote(row['player_id'], row['lane'], row['seq'])
+
+    def _on_status(self, state: str, error):
+        if state == 'SUBSCRIBED':
+            # 끊겨 있던 동안 놓친 변경이 있을 수 있으므로 다시 맞춥니다.
+            if self._stale:
+                self._stale = False
+                self.schedule_resync()
+            return
+        if self._stopping:
+            return
+        print(f"⚠️ 변경 피드 상태: {state} {error or ''}")
+        self._stale = True
+        # 소켓이 끊기거나 서버가 채널을 닫은 경우(CLOSED)도 다시 구독합니다. (stop() 으로 닫은 경우는 위에서 제외)
+        if state in ('CHANNEL_ERROR', 'TIMED_OUT', 'CLOSED') and (self._reconnect_task is None or self._reconnect_task.done()):
+            self._reconnect_task = asyncio.create_task(self._reconnect())
+
+    async def _reconnect(self):
+        # 다시 구독될 때까지 reconnect_delay 간격으로 재시도합니다.
+        while not self._stopping:
+            await asyncio.sleep(self.reconnect_delay)
+            try:
+                await self.feed.restart()
+                return
+            except Exception as e:
+                print(f"변경 피드 재연결 오류: {e}")
+
+    def schedule_resync(self):
+        if self._stopping:
+            return
+        if self._resync_task is None or self._resync_task.done():
+            self._resync_task = asyncio.create_task(self.resync())
+
+    async def resync(self):
+        try:
+            for state in self.guild_states:
+                await state.reload()
+            self.resyncs += 1
+            print(f"변경 피드 재동기화 완료 (서버 {len(self.guild_states)}곳)")
+        except Exception as e:
+            print(f"변경 피드 재동기화 오류: {e}")
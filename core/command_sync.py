@@ -0,0 +1,39 @@
+# core/command_sync.py
+
+import hashlib
+import json
+import os
+
+from discord import app_commands
+
+# 슬래시 커맨드 트리의 내용(이름, 설명, 옵션, 권한 등)을 해시해서 바뀐 경우에만 동기화합니다.
+# tree.sync() 는 느리고 레이트 리밋이 엄격한 전역 호출이므로 재시작마다 부르지 않습니다.
+def command_tree_hash(tree: app_commands.CommandTree) -> str:
+    payload = sorted((command.to_dict(tree) for command in tree.get_commands()), key=lambda command: (command.get('type', 1), command['name']))
+    return hashlib.sha256(json.dumps(payload, sort_keys=True, ensure_ascii=False).encode('utf-8')).hexdigest()
+
+def _read_hashes(path: str) -> dict:
+    # 파일 형식: 한 줄에 '애플리케이션ID 해시' (개발/운영 봇 토큰을 번갈아 써도 봇마다 따로 기억합니다)
+    hashes = {}
+    if os.path.exists(path):
+        with open(path, encoding='utf-8') as f:
+            for line in f:
+                parts = line.split()
+                if len(parts) == 2:
+                    hashes[parts[0]] = parts[1]
+    return hashes
+
+async def sync_if_changed(tree: app_commands.CommandTree, path: str, force: bool = False):
+    # 동기화했으면 커맨드 수, 바뀐 것이 없어 건너뛰었으면 None 을 반환합니다.
+    # 커맨드는 애플리케이션(봇)마다 등록되므로 애플리케이션 ID별로 마지막 해시를 비교합니다.
+    application_id = str(tree.client.application_id)
+    digest = command_tree_hash(tree)
+    hashes = _read_hashes(path)
+    if not force and hashes.get(application_id) == digest:
+        return None
+    synced = await tree.sync()
+    # 동기화가 성공한 뒤에만 기록해야 실패 시 다음 시작에서 다시 시도합니다.
+    hashes[application_id] = digest
+    with open(path, 'w', encoding='utf-8') as f:
+        f.writelines(f"{app_id} {value}\n" for app_id, value in hashes.items())
+    return len(synced)
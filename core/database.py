@@ -0,0 +1,55 @@
+# core/database.py
+
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# 동기 Supabase 클라이언트를 이벤트 루프 밖(스레드 풀)에서 실행하는 비동기 래퍼
+# 모든 cog는 self.bot.supabase 를 직접 호출하지 않고 이 계층(또는 repositories)을 거칩니다.
+class Database:
+    def __init__(self, client, max_concurrency: int = 8, timeout: float = 10.0, metrics=None):
+        self.client = client
+        self.timeout = timeout
+        self.metrics = metrics  # core/metrics.py 의 Metrics (테이블별 왕복/오류 수 기록)
+        # 동시에 진행되는 PostgREST 요청 수를 제한합니다. (풀 크기와 동일하게 맞춥니다)
+        self._executor = ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix="supabase")
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+
+    def table(self, name: str):
+        return self.client.table(name)
+
+    def rpc(self, name: str, params: dict = None):
+        return self.client.rpc(name, params or {})
+
+    async def execute(self, query, timeout: float = None):
+        # query 는 .execute() 를 호출하기 직전의 쿼리 빌더입니다.
+        # 타임아웃이 나도 스레드의 요청은 끝까지 실행되므로, 동시 요청 자리는 그 요청이 실제로 끝날 때 돌려줍니다.
+        # (먼저 돌려주면 타임아웃이 몰릴 때 제한을 넘는 요청과 스레드가 쌓입니다)
+        await self._semaphore.acquire()
+        loop = asyncio.get_running_loop()
+        started = time.perf_counter()
+        error = False
+        try:
+            future = self._executor.submit(query.execute)
+        except BaseException:
+            self._semaphore.release()
+            raise
+        future.add_done_callback(lambda _: self._release_from_thread(loop))
+        try:
+            return await asyncio.wait_for(asyncio.wrap_future(future, loop=loop), timeout or self.timeout)
+        except Exception:
+            error = True
+            raise
+        finally:
+            if self.metrics:
+                self.metrics.record_db(getattr(query, 'path', '?').lstrip('/'), time.perf_counter() - started, error)
+
+    def _release_from_thread(self, loop):
+        # 작업 스레드(또는 취소 시 이벤트 루프)에서 호출됩니다. 루프가 이미 닫혔으면 돌려줄 필요가 없습니다.
+        try:
+            loop.call_soon_threadsafe(self._semaphore.release)
+        except RuntimeError:
+            pass
+
+    def close(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
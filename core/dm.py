@@ -0,0 +1,61 @@
+# core/dm.py
+
+import asyncio
+
+import aiohttp
+import discord
+
+# 여러 유저에게 DM을 동시에(개수 제한) 보내는 발송기
+# - discord.py 의 HTTP 클라이언트가 엔드포인트별 rate limit 버킷을 지키므로, 여기서는 동시 요청 수만 제한합니다.
+# - 일시적인 오류(5xx, 429, 네트워크 오류)는 지수 백오프로 재시도하고, DM 차단 등은 바로 실패로 처리합니다.
+class DMDispatcher:
+    def __init__(self, bot, concurrency: int = 5, max_retries: int = 3, backoff: float = 1.0):
+        self.bot = bot
+        self.max_retries = max_retries
+        self.backoff = backoff  # 재시도 대기 시간 = backoff * 2^시도 횟수 (초)
+        self._semaphore = asyncio.Semaphore(concurrency)
+
+    async def send_many(self, user_ids: list, guild: discord.Guild = None, progress=None, **message) -> tuple:
+        # (성공한 유저 목록, (user_id, 유저 또는 None, 실패 사유) 목록)을 입력 순서대로 반환합니다.
+        # progress(완료 수, 전체 수) 콜백은 한 명씩 끝날 때마다 호출됩니다.
+        results = [None] * len(user_ids)
+        done = 0
+        # 받는 사람은 캐시/멤버 청킹으로 한 번에 찾아 두고, 찾지 못한 유저는 바로 실패 처리합니다.
+        users = await self.bot.user_resolver.resolve_many(user_ids, guild)
+
+        async def worker(index: int, user_id: int):
+            nonlocal done
+            results[index] = await self._send(user_id, users.get(user_id), message)
+            done += 1
+            if progress:
+                await progress(done, len(user_ids))
+
+        await asyncio.gather(*(worker(i, user_id) for i, user_id in enumerate(user_ids)))
+        sent = [user for ok, user, _ in results if ok]
+        failed = [(user_id, user, reason) for user_id, (ok, user, reason) in zip(user_ids, results) if not ok]
+        return sent, failed
+
+    async def _send(self, user_id: int, user, message: dict) -> tuple:
+        if user is None:
+            return False, None, "유저를 찾을 수 없음"
+        async with self._semaphore:
+            for attempt in range(1, self.max_retries + 1):
+                try:
+                    await user.send(**message)
+                    return True, user, None
+                except discord.Forbidden:
+                    return False, user, "DM 차단"
+                except discord.NotFound:
+                    return False, user, "유저를 찾을 수 없음"
+                except discord.RateLimited as e:
+                    reason, delay = "rate limit", e.retry_after
+                except discord.HTTPException as e:
+                    if e.status < 500 and e.status != 429:
+                        return False, user, f"HTTP {e.status}"
+                    reason, delay = f"HTTP {e.status}", self.backoff * 2 ** attempt
+                except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                    reason, delay = type(e).__name__, self.backoff * 2 ** attempt
+                if attempt < self.max_retries:
+                    await asyncio.sleep(delay)
+            print(f"DM 발송 실패 ({user_id}): {reason}")
+            return False, user, reason
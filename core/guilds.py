@@ -0,0 +1,181 @@
+# core/guilds.py
+
+import asyncio
+from functools import partial
+
+from .cache import TTLCache
+from .join_batcher import JoinBatcher
+from .journal import JournalWriter
+from .leaderboard import Leaderboard
+from .lobbies import LobbyManager
+from .penalties import PenaltyScheduler
+from .queue_board import QueueBoard
+from .queue_store import QueueStore
+from .ranking import RankingIndex
+from .repositories import PlayerRepository, QueueRepository, SeasonStatsRepository
+from .seasons import current_season
+
+# 서버(길드) 하나의 대기열/포인트 파티션
+# 대기열 저장, 참여 배치, 현황판, 페널티 스케줄러가 서버마다 따로 돌기 때문에 한 서버의 클릭 폭주가 다른 서버의 처리를 막지 않습니다.
+class GuildState:
+    def __init__(self, bot, guild_id: int, cache_size: int = 2048, cache_ttl: float = 600, board_interval: float = 5.0, batch_window: float = 0.02, batch_max: int = 500, season: str = None):
+        self.guild_id = guild_id
+        self.fixed_season = season  # 고정 시즌 이름, None 이면 분기 단위 (core/seasons.py)
+        # 대기열/정산 변경은 로컬 저널(bot.journal)에 먼저 기록하고 이 작업자가 DB에 순서대로 반영합니다.
+        self.writer = JournalWriter(bot.journal, guild_id, metrics=bot.metrics)
+        self.player_repo = PlayerRepository(bot.db, guild_id, TTLCache(cache_size, cache_ttl))
+        self.queue_repo = QueueRepository(bot.db, guild_id)
+        self.season_stats = SeasonStatsRepository(bot.db, guild_id)
+        self.queue_store = QueueStore(self.queue_repo, self.writer)
+        self.ranking = RankingIndex(self.player_repo)
+        self.leaderboard = Leaderboard(self.ranking)
+        self.penalties = PenaltyScheduler(self.player_repo)
+        self.lobbies = LobbyManager(self.queue_store)
+        self.queue_board = QueueBoard(bot, self.queue_store, interval=board_interval)
+        self.join_batcher = JoinBatcher(self.ranking, self.penalties, self.queue_store, window=batch_window, max_batch=batch_max)
+        # 정산은 랭킹/리더보드에 이미 반영되었으므로 failed_ops 로 옮기지 않습니다.
+        self.writer.register('settle', self._persist_settle, park=False)
+        self.queue_store.refusal_listeners.append(self._on_join_refused)
+        self._restored = False
+
+    async def load(self):
+        # 서로 독립적인 스냅샷이므로 동시에 불러옵니다.
+        await asyncio.gather(self.queue_store.load(), self.ranking.load(), self.penalties.load())
+        if not self._restored:
+            await self.writer.restore()
+            self._restored = True
+        # 아직 DB에 반영되지 않은 변경(저널)을 스냅샷 위에 다시 적용합니다.
+        for entry in self.writer.unacked():
+            self._apply_local(entry.kind, entry.values)
+
+    def _apply_local(self, kind: str, values):
+        if kind == 'settle':
+            self.queue_store.remove(values['player_ids'], persist=False)
+            for player_id in values['player_ids']:
+                self.player_repo.cache.invalidate(player_id)
+                # 랭킹에 없는 유저는 현재 포인트를 모르므로 여기서 더하지 않습니다. 등록된 유저였다면 DB 반영 시
+                # settle_match 응답 행(PlayerRepository._store)으로 랭킹에 들어가고, 미등록 유저는 DB에서도 지급되지 않습니다.
+                if player_id in self.ranking:
+                    self.ranking.set(player_id, self.ranking.points(player_id) + values['points'])
+        else:
+            self.queue_store.replay(kind, values)
+
+    @property
+    def season(self) -> str:
+        return current_season(self.fixed_season)
+
+    async def settle_match(self, player_ids: list, points: int):
+        # 내전 정산(포인트 지급 + 대기열 제외 + 원장 기록)을 저널에 기록하고 메모리 상태에 바로 반영합니다.
+        # DB 반영(settle_match 함수)은 앞선 대기열 변경 뒤에 순서대로, 같은 멱등 키로 재생됩니다.
+        # 시즌은 정산 시점 값으로 고정해 두므로 시즌 경계를 넘겨 재생되어도 원래 시즌에 집계됩니다.
+        values = {'player_ids': list(player_ids), 'points': points, 'season': self.season}
+        self.writer.enqueue('settle', values)
+        self._apply_local('settle', values)
+        await self.writer.durable()
+
+    def kick(self, player_ids) -> tuple:
+        # 운영자 제외: 경기 중인 로비와 대기열에서 함께 뺍니다. (대기열에서 제외된 player_id 목록, {lobby_id: [player_id]})
+        player_ids = list(player_ids)
+        dropped = self.lobbies.drop(player_ids)
+        return self.queue_store.remove(player_ids), dropped
+
+    async def _on_join_refused(self, player_id: int, status: str):
+        # 등록이 거절된 유저가 그 사이 로비에 배정되었으면 로비에서도 뺍니다. (정산 대상에서 제외)
+        dropped = self.lobbies.drop([player_id])
+        if dropped:
+            print(f"서버 {self.guild_id}: 등록이 거절된 {player_id}을(를) 로비 {', '.join(map(str, dropped))}에서 뺐습니다.")
+
+    async def check_ranking(self):
+        # 랭킹 인덱스를 DB와 비교해 어긋난 유저만 고칩니다. 저널에 아직 DB에 반영되지 않은 변경(정산 등)이 있으면
+        # DB 값이 메모리보다 뒤처져 있으므로 다음 확인으로 미루고 None 을 반환합니다.
+        if len(self.writer):
+            return None
+        return await self.ranking.check_consistency()
+
+    async def settle_lobby(self, lobby_id: int, points: int):
+        # 로비 하나를 정산합니다. 다른 로비의 진행/정산과 독립적으로 동시에 처리할 수 있습니다.
+        lobby = self.lobbies.begin_settle(lobby_id)
+        try:
+            await self.settle_match(lobby.player_ids, points)
+        finally:
+            # 저널 기록에 실패해도 메모리 상태와 DB 반영은 이미 진행되므로 로비는 닫습니다.
+            self.lobbies.finish(lobby)
+        return lobby
+
+    async def _persist_settle(self, values: dict, key: str):
+        await self.player_repo.settle_match(values['player_ids'], values['points'], op_key=key, season=values.get('season'))
+
+    def start(self):
+        self.writer.start()
+        self.penalties.start()
+        self.join_batcher.start()
+        self.queue_board.start()
+
+    async def reload(self):
+        # 아직 반영되지 않은 로컬 변경을 먼저 DB에 쓰고 스냅샷을 다시 불러옵니다.
+        await self.writer.flush()
+        await self.load()
+        self.player_repo.cache.clear()
+
+# 서버별 파티션 목록
+# 서버마다 처음 사용할 때 한 번만 DB에서 불러오고, 동시에 들어온 요청은 같은 로딩을 기다립니다.
+class GuildStates:
+    def __init__(self, bot, **options):
+        self.bot = bot
+        self.options = options  # GuildState 생성 옵션 (캐시 크기, 현황판 간격, 배치 구간 등)
+        self._states = {}   # guild_id -> GuildState
+        self._loading = {}  # guild_id -> 로딩 중인 Task
+        self.penalty_listeners = []  # 타임아웃 만료 시 호출되는 async 콜백(guild_id, player_id)
+        self.refusal_listeners = []  # DB가 대기열 등록을 거절했을 때 호출되는 async 콜백(guild_id, player_id, status)
+
+    def __len__(self) -> int:
+        return len(self._states)
+
+    def __iter__(self):
+        return iter(list(self._states.values()))
+
+    def loaded(self, guild_id: int):
+        # 이미 불러온 서버의 상태, 없으면 None (DB 요청 없음)
+        return self._states.get(guild_id)
+
+    async def get(self, guild_id: int) -> GuildState:
+        if guild_id is None:
+            raise ValueError("서버 밖에서는 사용할 수 없습니다.")
+        state = self._states.get(guild_id)
+        if state is not None:
+            return state
+        task = self._loading.get(guild_id)
+        if task is None:
+            task = self._loading[guild_id] = asyncio.create_task(self._load(guild_id))
+        # 먼저 요청한 상호작용이 취소되어도 로딩은 계속되도록 합니다.
+        return await asyncio.shield(task)
+
+    async def _load(self, guild_id: int) -> GuildState:
+        try:
+            state = GuildState(self.bot, guild_id, **self.options)
+            await state.load()
+            state.penalties.listeners.append(partial(self._on_penalty_expired, guild_id))
+            state.queue_store.refusal_listeners.append(partial(self._on_join_refused, guild_id))
+            state.start()
+            self._states[guild_id] = state
+            print(f"서버 {guild_id}: 대기열 {len(state.queue_store)}명, 랭킹 {len(state.ranking)}명, 참여 제한 {len(state.penalties)}명을 불러왔습니다.")
+            return state
+        finally:
+            self._loading.pop(guild_id, None)
+
+    async def warm(self, guild_ids) -> list:
+        # 여러 서버를 동시에 미리 불러옵니다. 실패한 서버는 (guild_id, 오류) 로 돌려주고, 처음 사용할 때 다시 시도합니다.
+        guild_ids = list(guild_ids)
+        results = await asyncio.gather(*(self.get(guild_id) for guild_id in guild_ids), return_exceptions=True)
+        return [(guild_id, result) for guild_id, result in zip(guild_ids, results) if isinstance(result, BaseException)]
+
+    async def _on_penalty_expired(self, guild_id: int, player_id: int):
+        for listener in self.penalty_listeners:
+            await listener(guild_id, player_id)
+
+    async def _on_join_refused(self, guild_id: int, player_id: int, status: str):
+        for listener in self.refusal_listeners:
+            await listener(guild_id, player_id, status)
+
+    async def flush(self):
+        await asyncio.gather(*(state.writer.flush() for state in self))
@@ -0,0 +1,95 @@
+# core/join_batcher.py
+
+import asyncio
+from datetime import datetime
+
+from .penalties import PenaltyScheduler
+from .queue_store import QueueStore
+from .ranking import RankingIndex
+
+# 참여 결과 상태
+JOINED = 'joined'
+ALREADY_IN_QUEUE = 'already_in_queue'
+NOT_REGISTERED = 'not_registered'
+TOO_MANY_STRIKES = 'too_many_strikes'
+TIMED_OUT = 'timed_out'
+IN_MATCH = 'in_match'
+
+class JoinResult:
+    def __init__(self, status: str, position: int = None, penalty_ends_at: datetime = None):
+        self.status = status
+        self.position = position
+        self.penalty_ends_at = penalty_ends_at
+
+def check_eligibility(player_id: int, ranking: RankingIndex, penalties: PenaltyScheduler):
+    # 참여할 수 없으면 JoinResult, 참여 가능하면 None 을 반환합니다. (DB 요청 없음)
+    # 등록된 유저는 모두 랭킹 인덱스에 있고, 참여 제한 중인 유저는 PenaltyScheduler 가 들고 있습니다.
+    if player_id not in ranking:
+        return JoinResult(NOT_REGISTERED)
+    if penalties.is_struck_out(player_id):
+        return JoinResult(TOO_MANY_STRIKES)
+    penalty_ends_at = penalties.timeout_ends_at(player_id)
+    if penalty_ends_at is not None:
+        return JoinResult(TIMED_OUT, penalty_ends_at=penalty_ends_at)
+    return None
+
+# 모집 직후 몰리는 '내전 참여' 클릭을 짧은 구간(window) 단위로 모아 한 번에 처리합니다.
+# - 등록 여부와 참여 제한은 메모리 인덱스(랭킹, 페널티)에서 확인하므로 클릭 처리에 DB 조회가 없습니다.
+# - 클릭 순서대로 대기열에 넣으므로 선착순이 유지되고, 각 클릭에 정확한 대기 순서를 돌려줍니다.
+# - 등록은 로컬 저널에 기록된 뒤 응답하고, DB 반영은 연속된 등록을 join_queue DB 함수 한 번(자격 재확인 + 중복 무시 등록)으로 묶어 처리합니다.
+class JoinBatcher:
+    def __init__(self, ranking: RankingIndex, penalties: PenaltyScheduler, queue_store: QueueStore, window: float = 0.02, max_batch: int = 500):
+        self.ranking = ranking
+        self.penalties = penalties
+        self.queue_store = queue_store
+        self.window = window
+        self.max_batch = max_batch
+        self._requests = []  # (player_id, future) 클릭 순서
+        self._wakeup = asyncio.Event()
+        self._worker = None
+
+    def start(self):
+        if self._worker is None or self._worker.done():
+            self._worker = asyncio.create_task(self._run())
+
+    async def submit(self, player_id: int) -> JoinResult:
+        future = asyncio.get_running_loop().create_future()
+        self._requests.append((player_id, future))
+        self._wakeup.set()
+        return await future
+
+    async def _run(self):
+        while True:
+            await self._wakeup.wait()
+            # 첫 클릭 이후 window 동안 들어온 클릭을 함께 처리합니다.
+            if len(self._requests) < self.max_batch:
+                await asyncio.sleep(self.window)
+            batch, self._requests = self._requests[:self.max_batch], self._requests[self.max_batch:]
+            if not self._requests:
+                self._wakeup.clear()
+            try:
+                await self._process(batch)
+            except Exception as e:
+                print(f"참여 배치 처리 오류: {e}")
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+
+    async def _process(self, batch: list):
+        results = []
+        for player_id, future in batch:
+            if future.done():  # 응답을 기다리던 상호작용이 취소된 경우
+                continue
+            result = check_eligibility(player_id, self.ranking, self.penalties)
+            if result is None and self.queue_store.is_held(player_id):
+                # 로비에 배정되어 경기 중인 유저는 정산될 때까지 다시 참여할 수 없습니다.
+                result = JoinResult(IN_MATCH)
+            if result is None:
+                position = self.queue_store.add(player_id)
+                result = JoinResult(ALREADY_IN_QUEUE, self.queue_store.position(player_id)) if position is None else JoinResult(JOINED, position)
+            results.append((future, result))
+        # 배치의 등록이 로컬 저널에 기록된 뒤에 응답합니다. (배치당 한 번의 기록, DB 왕복 없음)
+        await self.queue_store.durable()
+        for future, result in results:
+            if not future.done():
+                future.set_result(result)
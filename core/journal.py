@@ -0,0 +1,244 @@
+# core/journal.py
+
+import asyncio
+import json
+import logging
+import sqlite3
+import time
+import uuid
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+import httpx
+from postgrest.exceptions import APIError
+
+log = logging.getLogger(__name__)
+
+# PostgREST 가 DB에 연결하지 못했을 때 쓰는 오류 코드 (HTTP 503/504 로 응답)
+UNAVAILABLE_CODES = ('PGRST000', 'PGRST001', 'PGRST002', 'PGRST003')
+
+def is_transient(error: Exception) -> bool:
+    # DB가 돌아오면 다시 시도해 성공할 수 있는 오류인지 판단합니다. (타임아웃, 연결 오류, 5xx/429 응답)
+    if isinstance(error, (asyncio.TimeoutError, ConnectionError, httpx.TransportError)):
+        return True
+    if isinstance(error, APIError):
+        code = str(error.code or '')
+        # JSON 이 아닌 오류 응답(게이트웨이 5xx/429 등)은 HTTP 상태 코드가 code 에 담깁니다.
+        return code in UNAVAILABLE_CODES or code == '429' or (code.isdigit() and 500 <= int(code) < 600)
+    return False
+
+class JournalEntry:
+    def __init__(self, guild_id: int, kind: str, values, key: str = None, seq: int = None):
+        self.guild_id = guild_id
+        self.kind = kind
+        self.values = values
+        self.key = key or uuid.uuid4().hex  # DB 함수에 전달하는 멱등 키 (sql/006_journal_idempotency.sql)
+        self.seq = seq                      # 저널에 기록된 순번, 아직 기록 전이면 None
+
+# 로컬 쓰기 선행 로그(write-ahead journal)
+# 대기열/정산 변경을 Supabase 에 보내기 전에 SQLite 파일에 먼저 기록하고, DB 반영이 끝나면 지웁니다.
+# 재시작 시 남아 있는 항목은 다시 재생됩니다. 모든 SQLite 작업은 전용 스레드 하나에서 순서대로 실행합니다.
+# 저널 대상: 대기열 등록/제외/레인 변경, 내전 정산(포인트 지급). 유저 클릭과 /내전종료 는 DB 왕복 없이 응답합니다.
+# 저널 대상이 아님: 운영자의 포인트 조정(/포인트관리, /포인트일괄관리)과 스트라이크/타임아웃 변경(단건/일괄).
+#   응답에 DB가 확정한 값(0 미만 보정 후 총점 등)을 보여주고, DB 장애 시에는 운영자가 오류를 보고 다시 실행하는 관리 작업이므로 DB에 바로 씁니다.
+class Journal:
+    def __init__(self, path: str):
+        self.path = path
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("pragma journal_mode=wal")
+        self._conn.execute("pragma synchronous=full")
+        for table in ('ops', 'failed_ops'):
+            self._conn.execute(f"create table if not exists {table} (seq integer primary key autoincrement, op_key text not null unique, guild_id integer not null, kind text not null, payload text not null, created_at real not null)")
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="journal")
+
+    async def _call(self, fn, *args):
+        return await asyncio.get_running_loop().run_in_executor(self._executor, fn, *args)
+
+    def _transaction(self, fn, *args):
+        self._conn.execute("begin immediate")
+        try:
+            result = fn(*args)
+            self._conn.execute("commit")
+            return result
+        except BaseException:
+            self._conn.execute("rollback")
+            raise
+
+    def _append(self, entries: list):
+        for entry in entries:
+            cursor = self._conn.execute(
+                "insert into ops (op_key, guild_id, kind, payload, created_at) values (?, ?, ?, ?, ?)",
+                (entry.key, entry.guild_id, entry.kind, json.dumps(entry.values), time.time()),
+            )
+            entry.seq = cursor.lastrowid
+
+    async def append(self, entries: list):
+        # 한 트랜잭션(fsync 한 번)으로 기록합니다. (group commit)
+        await self._call(self._transaction, self._append, entries)
+
+    def _pending(self, guild_id: int) -> list:
+        rows = self._conn.execute("select seq, op_key, kind, payload from ops where guild_id = ? order by seq", (guild_id,)).fetchall()
+        return [JournalEntry(guild_id, kind, json.loads(payload), key, seq) for seq, key, kind, payload in rows]
+
+    async def pending(self, guild_id: int) -> list:
+        return await self._call(self._pending, guild_id)
+
+    def _delete(self, seqs: list):
+        self._conn.executemany("delete from ops where seq = ?", [(seq,) for seq in seqs])
+
+    async def ack(self, seqs: list):
+        await self._call(self._transaction, self._delete, seqs)
+
+    def _park(self, seqs: list):
+        self._conn.executemany("insert or ignore into failed_ops select * from ops where seq = ?", [(seq,) for seq in seqs])
+        self._delete(seqs)
+
+    async def park(self, seqs: list):
+        # 재시도해도 계속 실패하는 항목은 failed_ops 로 옮겨 뒤의 변경이 막히지 않게 합니다. (수동 확인용)
+        await self._call(self._transaction, self._park, seqs)
+
+    def close(self):
+        self._executor.shutdown(wait=True)
+        self._conn.close()
+
+# 서버 하나의 변경 사항을 저널에 기록한 뒤 Supabase 에 순서대로 반영하는 작업자 (write-behind)
+# - enqueue() 는 즉시 반환하고, durable() 을 기다리면 그때까지의 변경이 저널에 기록된 것이 보장됩니다.
+# - 같은 종류의 연속된 변경(coalesce 로 등록한 종류)은 한 번의 요청으로 묶습니다. (순서 유지)
+# - 타임아웃/연결 오류/5xx·429 응답은 DB가 돌아올 때까지 계속 재시도하고, 그 밖의 오류는 max_retries 번 뒤 failed_ops 로 옮깁니다.
+# - 정산(settle)처럼 메모리에 이미 반영된 변경은 failed_ops 로 옮기지 않고(park=False) 반영될 때까지 계속 재시도합니다.
+# - failed_ops 로 옮긴 항목은 metrics 카운터(journal_parked_total)와 오류 로그로 남깁니다.
+class JournalWriter:
+    def __init__(self, journal: Journal, guild_id: int, max_retries: int = 5, metrics=None):
+        self.journal = journal
+        self.guild_id = guild_id
+        self.max_retries = max_retries
+        self.metrics = metrics
+        self.max_delay = 30.0   # 재시도 간격 상한 (초)
+        self._handlers = {}     # 종류 -> (async 함수(values, key), 묶음 여부, failed_ops 로 옮길 수 있는지)
+        self._entries = deque() # DB에 아직 반영되지 않은 항목 (저널 기록 전 항목 포함, 순서대로)
+        self._unjournaled = []  # 다음 저널 기록에 포함될 항목
+        self._commit_future = None  # 다음 저널 기록 완료 시점
+        self._inflight_future = None
+        self._committer = None
+        self._wakeup = asyncio.Event()
+        self._idle = asyncio.Event()
+        self._idle.set()
+        self._worker = None
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def register(self, kind: str, handler, coalesce: bool = False, park: bool = True):
+        self._handlers[kind] = (handler, coalesce, park)
+
+    def unacked(self) -> list:
+        return list(self._entries)
+
+    async def restore(self):
+        # 이전 실행에서 DB에 반영하지 못한 항목을 불러옵니다. (시작 시 한 번)
+        self._entries.extendleft(reversed(await self.journal.pending(self.guild_id)))
+        if self._entries:
+            print(f"서버 {self.guild_id}: 저널에 남은 변경 {len(self._entries)}건을 다시 반영합니다.")
+            self._idle.clear()
+            self._wakeup.set()
+
+    def enqueue(self, kind: str, values) -> JournalEntry:
+        entry = JournalEntry(self.guild_id, kind, values)
+        self._entries.append(entry)
+        self._unjournaled.append(entry)
+        self._idle.clear()
+        if self._commit_future is None:
+            self._commit_future = asyncio.get_running_loop().create_future()
+        if self._committer is None or self._committer.done():
+            self._committer = asyncio.create_task(self._commit())
+        return entry
+
+    async def durable(self):
+        # 지금까지 enqueue 한 변경이 저널에 기록될 때까지 기다립니다.
+        future = self._commit_future or self._inflight_future
+        if future is not None:
+            await asyncio.shield(future)
+
+    async def _commit(self):
+        while self._unjournaled:
+            batch, self._unjournaled = self._unjournaled, []
+            future, self._commit_future = self._commit_future, None
+            self._inflight_future = future
+            try:
+                await self.journal.append(batch)
+                future.set_result(None)
+            except Exception as e:
+                # 기록하지 못한 항목도 DB 반영은 계속 시도합니다. (재시작하면 유실될 수 있음)
+                print(f"저널 기록 오류 ({len(batch)}건): {e}")
+                for entry in batch:
+                    entry.seq = 0
+                future.set_exception(e)
+                future.exception()  # durable() 을 기다리는 곳이 없어도 경고가 남지 않도록 합니다.
+            finally:
+                self._inflight_future = None
+            self._wakeup.set()
+
+    def start(self):
+        if self._worker is None or self._worker.done():
+            self._worker = asyncio.create_task(self._run())
+
+    async def flush(self, timeout: float = 10.0):
+        # 종료 전에 남은 변경 사항을 DB에 반영합니다. (반영하지 못한 항목은 저널에 남아 다음 시작 때 재생됩니다)
+        try:
+            await asyncio.wait_for(self._idle.wait(), timeout)
+        except asyncio.TimeoutError:
+            print(f"서버 {self.guild_id} 저장 대기 시간 초과: {len(self._entries)}건 미반영 (저널에 보관)")
+
+    async def _run(self):
+        while True:
+            await self._wakeup.wait()
+            self._wakeup.clear()
+            # 저널에 기록된 앞쪽 항목부터 순서대로 반영합니다.
+            while self._entries and self._entries[0].seq is not None:
+                entry = self._entries[0]
+                handler, coalesce, park = self._handlers[entry.kind]
+                batch = [entry]
+                if coalesce:
+                    for following in list(self._entries)[1:]:
+                        if following.kind != entry.kind or following.seq is None:
+                            break
+                        batch.append(following)
+                values = [value for item in batch for value in item.values] if coalesce else entry.values
+                applied = await self._persist(handler, entry.kind, values, entry.key, park)
+                seqs = [item.seq for item in batch if item.seq]
+                try:
+                    if seqs:
+                        await (self.journal.ack(seqs) if applied else self.journal.park(seqs))
+                except Exception as e:
+                    print(f"저널 정리 오류: {e}")
+                for _ in batch:
+                    self._entries.popleft()
+            if not self._entries:
+                self._idle.set()
+
+    async def _persist(self, handler, kind: str, values, key: str, park: bool = True) -> bool:
+        attempt = 0
+        while True:
+            try:
+                await handler(values, key)
+                return True
+            except Exception as e:
+                attempt += 1
+                if is_transient(e):
+                    # DB가 느리거나 연결되지 않는 동안에는 버리지 않고 계속 기다립니다.
+                    print(f"서버 {self.guild_id} DB 반영 지연 ({kind}, {attempt}회째): {e!r}")
+                else:
+                    print(f"서버 {self.guild_id} DB 반영 오류 ({kind}, {attempt}/{self.max_retries}): {e}")
+                    if attempt == self.max_retries:
+                        if park:
+                            self._count('journal_parked_total', kind)
+                            log.error("서버 %s DB 반영 실패, failed_ops 로 옮깁니다: %s %s", self.guild_id, kind, values)
+                            return False
+                        # 메모리에 이미 반영된 변경이므로 버리지 않고, 운영자가 원인을 고칠 때까지 계속 재시도합니다. (뒤의 변경은 순서대로 대기)
+                        self._count('journal_stuck_total', kind)
+                        log.error("서버 %s DB 반영 실패, 반영될 때까지 계속 재시도합니다: %s %s (%s)", self.guild_id, kind, values, e)
+                await asyncio.sleep(min(2 ** attempt, self.max_delay))
+
+    def _count(self, name: str, kind: str):
+        if self.metrics is not None:
+            self.metrics.increment(f'{name}{{kind="{kind}"}}')
@@ -0,0 +1,121 @@
+# core/leaderboard.py
+
+from collections import OrderedDict
+
+import discord
+
+from .ranking import RankingIndex
+
+PAGE_SIZE = 10
+
+class LeaderboardPage:
+    def __init__(self, keys: list, start: int, low, high, embed: discord.Embed, has_prev: bool, has_next: bool):
+        self.keys = keys          # 이 페이지의 (-points, player_id) 목록
+        self.start = start        # 첫 항목의 위치 (0부터)
+        self.low = low            # 이 페이지 내용에 영향을 주는 키 범위 (None 이면 끝까지)
+        self.high = high
+        self.embed = embed
+        # 앞/뒤 페이지 유무는 범위 밖(앞/뒤쪽) 변경에도 바뀌므로 꺼낼 때마다 Leaderboard.page 가 다시 계산합니다.
+        self.has_prev = has_prev
+        self.has_next = has_next
+
+    @property
+    def first(self):
+        return self.keys[0] if self.keys else None
+
+    @property
+    def last(self):
+        return self.keys[-1] if self.keys else None
+
+# 페이지 단위 랭킹 (/랭킹 의 이전/다음 버튼)
+# - 페이지는 (포인트, player_id) 키셋 커서로 찾습니다. 오프셋이 없어 페이지를 넘기는 사이 순위가 바뀌어도 중복/누락이 없습니다.
+# - 그린 임베드는 커서별로 캐시하고, 포인트가 바뀌면 바뀐 키 범위(이전 키~새 키, 등록/삭제면 그 아래 전체)와 겹치는 페이지만 지웁니다.
+#   (그 범위 밖 페이지는 구성도 순위 숫자도 바뀌지 않습니다)
+# - 멘션은 <@id> 로 그리므로 페이지를 그릴 때 Discord API 호출이 없습니다.
+class Leaderboard:
+    def __init__(self, ranking: RankingIndex, page_size: int = PAGE_SIZE, max_pages: int = 256):
+        self.ranking = ranking
+        self.page_size = page_size
+        self.max_pages = max_pages
+        self._pages = OrderedDict()  # (방향, 커서 키) -> LeaderboardPage
+        self.hits = 0
+        self.misses = 0
+        ranking.listeners.append(self._on_change)
+
+    def __len__(self) -> int:
+        return len(self._pages)
+
+    def page(self, direction: str = 'after', cursor: tuple = None) -> LeaderboardPage:
+        # direction: 'after' 는 cursor 다음 페이지, 'before' 는 cursor 이전 페이지 (cursor 가 None 이면 첫 페이지)
+        cache_key = (direction, cursor)
+        page = self._pages.get(cache_key)
+        if page is not None:
+            self._pages.move_to_end(cache_key)
+            self.hits += 1
+        else:
+            self.misses += 1
+            page = self._render(direction, cursor)
+            self._pages[cache_key] = page
+            while len(self._pages) > self.max_pages:
+                self._pages.popitem(last=False)
+        # 페이지 아래쪽 유저가 삭제/이동되어도 페이지 내용은 그대로지만 '다음' 페이지가 사라질 수 있으므로 보낼 때 확인합니다. (O(log n))
+        page.has_prev = bool(page.keys) and bool(self.ranking.before(page.first, 1))
+        page.has_next = bool(page.keys) and bool(self.ranking.after(page.last, 1))
+        return page
+
+    def _render(self, direction: str, cursor: tuple) -> LeaderboardPage:
+        ranking, size = self.ranking, self.page_size
+        # low/high: 그 사이에 키가 생기거나 빠지면 이 커서로 찾은 페이지 내용이 바뀌는 범위
+        high = None
+        if direction == 'before' and cursor is not None:
+            keys = ranking.before(cursor, size)
+            if len(keys) < size:
+                # 앞쪽이 모자라면 첫 페이지를 보여줍니다.
+                keys, low = ranking.after(None, size), None
+            else:
+                low, high = keys[0], cursor
+        else:
+            keys, low = ranking.after(cursor, size), cursor
+            if not keys and cursor is not None:
+                # 예전 메시지의 커서 뒤에 남은 유저가 없으면(아래쪽 유저가 위로 이동/삭제) 마지막 페이지를 보여줍니다.
+                # 어떤 변경에도 내용이 바뀔 수 있으므로 범위를 전체(None, None)로 둡니다.
+                keys, low = ranking.before((float('inf'),), size), None
+
+        start = ranking.index_of(keys[0]) if keys else 0
+        has_prev = start > 0
+        has_next = start + len(keys) < len(ranking)
+        if high is None and has_next and keys:
+            high = keys[-1]
+        # 마지막 페이지는 뒤에 누가 추가되어도 바뀌므로 범위를 끝까지(None)로 둡니다.
+        lines = []
+        for neg_points, player_id in keys:
+            # 동점자는 같은 순위 (나보다 포인트가 많은 사람 수 + 1)
+            rank = ranking.index_of((neg_points,)) + 1
+            lines.append(f"`{rank:3d}` <@{player_id}> - **{-neg_points}점**")
+        embed = discord.Embed(title="🏆 내전 포인트 랭킹", color=discord.Color.blue())
+        embed.add_field(name=f"{start + 1}위 ~ {start + len(keys)}위" if keys else "랭킹", value="\n".join(lines) or "아직 랭킹 데이터가 없습니다.", inline=False)
+        return LeaderboardPage(keys, start, low, high, embed, has_prev, has_next)
+
+    def embed(self, page: LeaderboardPage) -> discord.Embed:
+        # 전체 인원/페이지 수는 아무 등록/삭제에나 바뀌므로 캐시한 임베드의 사본에 보낼 때마다 붙입니다.
+        total = len(self.ranking)
+        embed = page.embed.copy()
+        embed.set_footer(text=f"페이지 {page.start // self.page_size + 1} / {max(1, -(-total // self.page_size))} · 총 {total}명")
+        return embed
+
+    def _on_change(self, old_key, new_key):
+        if old_key is None and new_key is None:
+            self._pages.clear()
+            return
+        changed = [key for key in (old_key, new_key) if key is not None]
+        low = min(changed)
+        if old_key is None or new_key is None:
+            # 등록/삭제는 그 아래 모든 유저의 순위를 한 칸씩 바꿉니다.
+            high = (float('inf'),)
+        else:
+            # 순위 이동은 이전~새 위치 사이만 바꿉니다. 동점자 순위는 같은 포인트 그룹 전체에 영향을 주므로 그 포인트의 마지막 키까지 넓힙니다.
+            high = (max(changed)[0], float('inf'))
+        for cache_key, page in list(self._pages.items()):
+            # 바뀐 범위 [low, high] 가 페이지 범위 [page.low, page.high] 와 겹치면 구성이나 순위 숫자가 바뀝니다.
+            if (page.high is None or low <= page.high) and (page.low is None or high >= page.low):
+                del self._pages[cache_key]
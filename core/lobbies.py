@@ -0,0 +1,115 @@
+# core/lobbies.py
+
+import time
+
+from .queue_store import QueueStore
+from .teams import LOBBY_SIZE
+
+FORMING = 'forming'  # 인원 배정 완료, 시작 전
+PLAYING = 'playing'  # 내전 진행 중
+ENDING = 'ending'    # 정산 중
+
+class Lobby:
+    def __init__(self, lobby_id: int, player_ids: list):
+        self.id = lobby_id
+        self.player_ids = list(player_ids)
+        self.status = FORMING
+        self.created_at = time.time()
+        self.started_at = None
+
+# 서버 하나에서 동시에 진행되는 여러 내전(로비)
+# - 대기열 앞쪽에서 로비 인원을 떼어 내 hold() 하므로, 경기 중에도 다음 대기자가 바로 다음 로비로 배정됩니다.
+# - 로비마다 시작/종료/정산이 독립적이며, 정산은 GuildState.settle_match 로 해당 로비 인원에게만 적용됩니다.
+# - 로비 목록은 메모리에만 있습니다. 재시작하면 경기 중이던 유저는 원래 대기 순서로 돌아갑니다. (정산 전까지 DB 대기열에 남아 있음)
+class LobbyManager:
+    def __init__(self, queue_store: QueueStore):
+        self.queue_store = queue_store
+        self._lobbies = {}  # lobby_id -> Lobby
+        self._players = {}  # player_id -> lobby_id (경기 중인 유저)
+        self._next_id = 1
+
+    def __len__(self) -> int:
+        return len(self._lobbies)
+
+    def __iter__(self):
+        return iter(sorted(self._lobbies.values(), key=lambda lobby: lobby.id))
+
+    def get(self, lobby_id: int):
+        return self._lobbies.get(lobby_id)
+
+    def lobby_of(self, player_id: int):
+        lobby_id = self._players.get(player_id)
+        return self._lobbies.get(lobby_id) if lobby_id is not None else None
+
+    def in_play(self) -> int:
+        return len(self._players)
+
+    def create(self, count: int = 1, size: int = LOBBY_SIZE) -> list:
+        # 대기열 앞쪽에서 size 명씩 최대 count 개의 로비를 만듭니다. 인원이 모자라면 만들 수 있는 만큼만 만듭니다.
+        created = []
+        for _ in range(count):
+            player_ids = self.queue_store.head(size)
+            if len(player_ids) < size:
+                break
+            self.queue_store.hold(player_ids)
+            lobby = Lobby(self._next_id, player_ids)
+            self._next_id += 1
+            self._lobbies[lobby.id] = lobby
+            for player_id in player_ids:
+                self._players[player_id] = lobby.id
+            created.append(lobby)
+        return created
+
+    def start(self, lobby_id: int) -> Lobby:
+        lobby = self._require(lobby_id)
+        if lobby.status != FORMING:
+            raise ValueError(f"로비 {lobby_id}은(는) 이미 시작되었습니다.")
+        lobby.status = PLAYING
+        lobby.started_at = time.time()
+        return lobby
+
+    def begin_settle(self, lobby_id: int) -> Lobby:
+        # 같은 로비를 두 번 정산하지 않도록 정산 전에 상태를 바꿉니다.
+        lobby = self._require(lobby_id)
+        if lobby.status == ENDING:
+            raise ValueError(f"로비 {lobby_id}은(는) 이미 정산 중입니다.")
+        lobby.status = ENDING
+        return lobby
+
+    def finish(self, lobby: Lobby):
+        # 정산한 로비를 닫습니다. (대기열 제외는 settle_match 가 처리)
+        self._close(lobby)
+
+    def cancel(self, lobby_id: int) -> Lobby:
+        # 정산 없이 로비를 닫고 인원을 원래 대기 순서로 돌려보냅니다.
+        lobby = self._require(lobby_id)
+        if lobby.status == ENDING:
+            raise ValueError(f"로비 {lobby_id}은(는) 정산 중이라 취소할 수 없습니다.")
+        self._close(lobby)
+        self.queue_store.release(lobby.player_ids)
+        return lobby
+
+    def drop(self, player_ids) -> dict:
+        # 운영자가 제외한 유저를 로비에서 뺍니다. 이후 정산(settle_lobby)에서도 빠집니다. {lobby_id: [player_id]} 를 반환합니다.
+        # 이미 정산 중인 로비는 지급이 저널에 기록되었으므로 바꾸지 않습니다.
+        dropped = {}
+        for player_id in player_ids:
+            lobby = self.lobby_of(player_id)
+            if lobby is None or lobby.status == ENDING:
+                continue
+            lobby.player_ids.remove(player_id)
+            del self._players[player_id]
+            dropped.setdefault(lobby.id, []).append(player_id)
+        return dropped
+
+    def _close(self, lobby: Lobby):
+        self._lobbies.pop(lobby.id, None)
+        for player_id in lobby.player_ids:
+            if self._players.get(player_id) == lobby.id:
+                del self._players[player_id]
+
+    def _require(self, lobby_id: int) -> Lobby:
+        lobby = self._lobbies.get(lobby_id)
+        if lobby is None:
+            raise ValueError(f"로비 {lobby_id}을(를) 찾을 수 없습니다.")
+        return lobby
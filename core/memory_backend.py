@@ -0,0 +1,444 @@
+# core/memory_backend.py
+
+import copy
+import threading
+import time
+from bisect import bisect_left, insort
+from datetime import datetime, timezone
+
+from .seasons import current_season, next_streak, season_day
+
+# 로컬 테스트/벤치마크용 인메모리 Supabase 대체 클라이언트
+# 봇이 사용하는 PostgREST 빌더 문법(table().select().eq()...execute(), rpc())과
+# sql/ 폴더의 Postgres 함수와 같은 동작을 하는 프로시저만 구현합니다.
+
+def _now_iso() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+def _now_micros() -> int:
+    return time.time_ns() // 1000
+
+def _key_of(key: tuple, row: dict) -> tuple:
+    return tuple(row.get(column) for column in key)
+
+# 테이블별 기본 키(컬럼 튜플)와 기본값, NOT NULL 컬럼
+TABLES = {
+    'players': {'key': ('guild_id', 'id'), 'defaults': {'points': 0, 'strikes': 0, 'penalty_ends_at': None},
+                'not_null': ('guild_id', 'id', 'points', 'strikes', 'valorant_nickname', 'chzzk_nickname', 'highest_tier', 'current_tier')},
+    'queue': {'key': ('guild_id', 'player_id'), 'defaults': {'created_at': _now_iso, 'lane': 1, 'seq': _now_micros}},
+    'applied_ops': {'key': ('op_key',), 'defaults': {'applied_at': _now_iso}},
+    'matches': {'key': ('id',), 'defaults': {'created_at': _now_iso, 'op_key': None}},
+    'point_ledger': {'key': ('id',), 'defaults': {'created_at': _now_iso, 'match_id': None}},
+    'player_season_stats': {'key': ('guild_id', 'season', 'player_id'), 'defaults': {
+        'games': 0, 'match_points': 0, 'adjusted_points': 0, 'current_streak': 0, 'best_streak': 0, 'last_played_on': None, 'last_match_id': None,
+    }},
+    'test_logs': {'key': None, 'defaults': {'created_at': _now_iso}},
+}
+
+class MemoryResponse:
+    def __init__(self, data, count=None):
+        self.data = data
+        self.count = count
+
+class MemoryQuery:
+    def __init__(self, backend, table: str):
+        self.backend = backend
+        self.table = table
+        self.path = f'/{table}'
+        self._op = 'select'
+        self._columns = '*'
+        self._count = None
+        self._values = None
+        self._on_conflict = None
+        self._ignore_duplicates = False
+        self._filters = []
+        self._order = []
+        self._limit = None
+        self._single = None
+
+    # --- 작업 종류 ---
+    def select(self, columns: str = '*', count: str = None):
+        self._op, self._columns, self._count = 'select', columns, count
+        return self
+
+    def insert(self, values):
+        self._op, self._values = 'insert', values
+        return self
+
+    def upsert(self, values, on_conflict: str = None, ignore_duplicates: bool = False):
+        self._op, self._values = 'upsert', values
+        self._on_conflict, self._ignore_duplicates = on_conflict, ignore_duplicates
+        return self
+
+    def update(self, values: dict):
+        self._op, self._values = 'update', values
+        return self
+
+    def delete(self):
+        self._op = 'delete'
+        return self
+
+    # --- 필터/정렬 ---
+    def eq(self, column: str, value):
+        self._filters.append(lambda row: row.get(column) == value)
+        return self
+
+    def gt(self, column: str, value):
+        self._filters.append(lambda row: row.get(column) is not None and row.get(column) > value)
+        return self
+
+    def gte(self, column: str, value):
+        self._filters.append(lambda row: row.get(column) is not None and row.get(column) >= value)
+        return self
+
+    def in_(self, column: str, values):
+        values = set(values)
+        self._filters.append(lambda row: row.get(column) in values)
+        return self
+
+    def order(self, column: str, desc: bool = False):
+        self._order.append((column, desc))
+        return self
+
+    def limit(self, size: int):
+        self._limit = size
+        return self
+
+    def single(self):
+        self._single = 'single'
+        return self
+
+    def maybe_single(self):
+        self._single = 'maybe'
+        return self
+
+    def execute(self):
+        self.backend.round_trip(self.table)
+        with self.backend.lock:
+            return getattr(self, f'_execute_{self._op}')()
+
+    # --- 실행 ---
+    def _matches(self, row) -> bool:
+        return all(check(row) for check in self._filters)
+
+    def _project(self, row) -> dict:
+        if self._columns.strip() == '*':
+            return copy.deepcopy(row)
+        return {column.strip(): copy.deepcopy(row.get(column.strip())) for column in self._columns.split(',')}
+
+    def _execute_select(self):
+        rows = [row for row in self.backend.rows(self.table) if self._matches(row)]
+        count = len(rows) if self._count else None
+        # 여러 정렬 조건은 뒤에서부터 안정 정렬로 적용합니다.
+        for column, desc in reversed(self._order):
+            rows.sort(key=lambda row: (row.get(column) is None, row.get(column)), reverse=desc)
+        if self._limit is not None:
+            rows = rows[:self._limit]
+        # PostgREST 처럼 응답 하나에 담기는 행 수를 제한합니다. (잘린 조회를 벤치마크/테스트에서도 드러내기 위함)
+        rows = self.backend.cap(rows)
+        data = [self._project(row) for row in rows]
+        if self._single:
+            if not data:
+                if self._single == 'maybe':
+                    return None
+                raise LookupError(f"{self.table}: 행이 없습니다.")
+            return MemoryResponse(data[0], count)
+        return MemoryResponse(data, count)
+
+    def _execute_insert(self):
+        rows = self._values if isinstance(self._values, list) else [self._values]
+        # Postgres 처럼 한 행이라도 제약을 어기면 요청 전체를 거절합니다.
+        for row in rows:
+            self.backend.check_not_null(self.table, row)
+        return MemoryResponse([copy.deepcopy(self.backend.insert(self.table, row)) for row in rows])
+
+    def _execute_upsert(self):
+        rows = self._values if isinstance(self._values, list) else [self._values]
+        key = tuple(column.strip() for column in self._on_conflict.split(',')) if self._on_conflict else TABLES[self.table]['key']
+        for row in rows:
+            self.backend.check_not_null(self.table, row, new=self.backend.find(self.table, key, _key_of(key, row)) is None)
+        data = []
+        for row in rows:
+            existing = self.backend.find(self.table, key, _key_of(key, row))
+            if existing is None:
+                data.append(copy.deepcopy(self.backend.insert(self.table, row)))
+            elif not self._ignore_duplicates:
+                old = copy.deepcopy(existing)
+                existing.update(copy.deepcopy(row))
+                data.append(copy.deepcopy(existing))
+                self.backend.emit(self.table, 'UPDATE', existing, old)
+        return MemoryResponse(data)
+
+    def _execute_update(self):
+        self.backend.check_not_null(self.table, self._values, new=False)
+        data = []
+        for row in self.backend.rows(self.table):
+            if self._matches(row):
+                old = copy.deepcopy(row)
+                row.update(copy.deepcopy(self._values))
+                data.append(copy.deepcopy(row))
+                self.backend.emit(self.table, 'UPDATE', row, old)
+        return MemoryResponse(data)
+
+    def _execute_delete(self):
+        kept, data = [], []
+        for row in self.backend.rows(self.table):
+            (data if self._matches(row) else kept).append(row)
+        self.backend.tables[self.table] = kept
+        for row in data:
+            self.backend.emit(self.table, 'DELETE', None, row)
+        return MemoryResponse(data)
+
+class MemoryRpc:
+    def __init__(self, backend, name: str, params: dict):
+        self.backend = backend
+        self.name = name
+        self.path = f'/rpc/{name}'
+        self.params = params
+
+    def execute(self):
+        self.backend.round_trip(f'rpc:{self.name}')
+        with self.backend.lock:
+            data = self.backend.procedures[self.name](self.backend, **self.params)
+            return MemoryResponse(self.backend.cap(data) if isinstance(data, list) else data)
+
+class MemorySupabase:
+    def __init__(self, tables: dict = None, latency: float = 0.0, max_rows: int = 1000):
+        self.lock = threading.RLock()
+        # 요청마다 주입할 네트워크 지연(초) - 벤치마크용
+        self.latency = latency
+        # 조회/함수 응답 하나의 최대 행 수 (Supabase 기본 max_rows), None 이면 제한 없음
+        self.max_rows = max_rows
+        # 행 변경 이벤트를 받는 콜백 (core/change_feed.py 의 MemoryChangeFeed)
+        self.subscribers = []
+        self.tables = {name: [] for name in TABLES}
+        for name, rows in (tables or {}).items():
+            for row in rows:
+                self.insert(name, row)
+        self.procedures = dict(PROCEDURES)
+        self._serials = {}  # bigserial 대체 (테이블 -> 마지막 id)
+        self.round_trips = 0
+        self.round_trips_by_target = {}  # 테이블 또는 'rpc:이름' -> 요청 수
+
+    def round_trip(self, target: str):
+        with self.lock:
+            self.round_trips += 1
+            self.round_trips_by_target[target] = self.round_trips_by_target.get(target, 0) + 1
+        if self.latency:
+            time.sleep(self.latency)
+
+    def cap(self, rows: list) -> list:
+        return rows if self.max_rows is None else rows[:self.max_rows]
+
+    def table(self, name: str) -> MemoryQuery:
+        return MemoryQuery(self, name)
+
+    def rpc(self, name: str, params: dict = None) -> MemoryRpc:
+        return MemoryRpc(self, name, params or {})
+
+    # --- 내부 헬퍼 (프로시저에서도 사용) ---
+    def rows(self, table: str) -> list:
+        return self.tables.setdefault(table, [])
+
+    def find(self, table: str, key: tuple, value: tuple):
+        for row in self.rows(table):
+            if _key_of(key, row) == value:
+                return row
+        return None
+
+    def next_id(self, table: str) -> int:
+        self._serials[table] = self._serials.get(table, 0) + 1
+        return self._serials[table]
+
+    def insert(self, table: str, values: dict) -> dict:
+        schema = TABLES.get(table, {'key': None, 'defaults': {}})
+        key = schema['key']
+        if key and self.find(table, key, _key_of(key, values)) is not None:
+            raise ValueError(f"{table}: 중복된 {key} {_key_of(key, values)}")
+        row = {column: default() if callable(default) else default for column, default in schema['defaults'].items()}
+        row.update(copy.deepcopy(values))
+        self.rows(table).append(row)
+        self.emit(table, 'INSERT', row, None)
+        return row
+
+    def check_not_null(self, table: str, values: dict, new: bool = True):
+        # 봇의 쓰기 요청(insert/upsert/update)에만 적용합니다. (초기 데이터는 필요한 컬럼만 넣어도 됩니다)
+        # 새 행은 기본값을 채운 뒤 NOT NULL 컬럼이 모두 있어야 하고, 기존 행은 null 로 바꾸는 값만 거절합니다.
+        schema = TABLES.get(table, {})
+        row = {**schema.get('defaults', {}), **values} if new else values
+        for column in schema.get('not_null', ()):
+            if (new or column in row) and row.get(column) is None:
+                raise ValueError(f"{table}: {column} 컬럼은 null 일 수 없습니다. (NOT NULL)")
+
+    def emit(self, table: str, event_type: str, record, old_record):
+        # Supabase realtime 의 postgres_changes 페이로드와 같은 형태로 전달합니다. (REPLICA IDENTITY FULL 기준)
+        if not self.subscribers:
+            return
+        payload = {'ids': [], 'data': {
+            'schema': 'public',
+            'table': table,
+            'type': event_type,
+            'record': copy.deepcopy(record),
+            'old_record': copy.deepcopy(old_record),
+            'commit_timestamp': _now_iso(),
+        }}
+        for subscriber in self.subscribers:
+            subscriber(payload)
+
+# --- sql/ 의 Postgres 함수와 같은 동작을 하는 로컬 프로시저 ---
+
+def _settle_match(backend, p_guild_id, p_player_ids, p_points, p_op_key=None, p_season=None):
+    # sql/007_match_ledger.sql: settle_match
+    ids = set(p_player_ids)
+    if p_op_key is not None:
+        if backend.find('applied_ops', ('op_key',), (p_op_key,)) is not None:
+            # 이미 반영된 정산이면 현재 행만 반환합니다.
+            return [copy.deepcopy(row) for row in backend.rows('players') if row['guild_id'] == p_guild_id and row['id'] in ids]
+        backend.insert('applied_ops', {'op_key': p_op_key, 'guild_id': p_guild_id})
+    kept = []
+    for row in backend.rows('queue'):
+        if row['guild_id'] == p_guild_id and row['player_id'] in ids:
+            backend.emit('queue', 'DELETE', None, row)
+        else:
+            kept.append(row)
+    backend.tables['queue'] = kept
+    players = [row for row in backend.rows('players') if row['guild_id'] == p_guild_id and row['id'] in ids]
+    season = current_season(p_season)
+    match = backend.insert('matches', {'id': backend.next_id('matches'), 'guild_id': p_guild_id, 'season': season, 'points': p_points, 'player_count': len(players), 'op_key': p_op_key})
+    today = season_day()
+    data = []
+    for row in players:
+        backend.insert('point_ledger', {'id': backend.next_id('point_ledger'), 'guild_id': p_guild_id, 'season': season, 'player_id': row['id'], 'match_id': match['id'], 'reason': 'match', 'delta': p_points})
+        stats = _season_stats(backend, p_guild_id, season, row['id'])
+        stats['current_streak'] = next_streak(stats['current_streak'], stats['last_played_on'], today)
+        stats['best_streak'] = max(stats['best_streak'], stats['current_streak'])
+        stats['games'] += 1
+        stats['match_points'] += p_points
+        stats['last_played_on'] = today
+        stats['last_match_id'] = match['id']
+        old = copy.deepcopy(row)
+        row['points'] = (row.get('points') or 0) + p_points
+        data.append(copy.deepcopy(row))
+        backend.emit('players', 'UPDATE', row, old)
+    return data
+
+def _season_stats(backend, guild_id, season, player_id) -> dict:
+    stats = backend.find('player_season_stats', ('guild_id', 'season', 'player_id'), (guild_id, season, player_id))
+    if stats is None:
+        stats = backend.insert('player_season_stats', {'guild_id': guild_id, 'season': season, 'player_id': player_id})
+    return stats
+
+def _adjust_points(backend, p_guild_id, p_player_id, p_delta, p_season=None):
+    # sql/007_match_ledger.sql: adjust_points
+    row = backend.find('players', ('guild_id', 'id'), (p_guild_id, p_player_id))
+    if row is None:
+        return []
+    old = copy.deepcopy(row)
+    row['points'] = max(0, (row.get('points') or 0) + p_delta)
+    delta = row['points'] - (old.get('points') or 0)
+    if delta:
+        season = current_season(p_season)
+        backend.insert('point_ledger', {'id': backend.next_id('point_ledger'), 'guild_id': p_guild_id, 'season': season, 'player_id': p_player_id, 'reason': 'adjust', 'delta': delta})
+        _season_stats(backend, p_guild_id, season, p_player_id)['adjusted_points'] += delta
+    backend.emit('players', 'UPDATE', row, old)
+    return [copy.deepcopy(row)]
+
+def _targets(backend, guild_id, player_ids, after_id=None, limit=None, where=None) -> list:
+    # sql/009_bulk_admin.sql: p_player_ids 가 None 이면 서버 전체, id 순으로 after_id 다음부터 limit 명
+    ids = None if player_ids is None else set(player_ids)
+    rows = sorted(
+        (row for row in backend.rows('players') if row['guild_id'] == guild_id and (ids is None or row['id'] in ids)
+         and (after_id is None or row['id'] > after_id) and (where is None or where(row))),
+        key=lambda row: row['id'],
+    )
+    return rows if limit is None else rows[:limit]
+
+def _penalize_players(backend, p_guild_id, p_player_ids, p_strikes=0, p_penalty_ends_at=None, p_after_id=None, p_limit=None):
+    # sql/009_bulk_admin.sql: penalize_players
+    data = []
+    for row in _targets(backend, p_guild_id, p_player_ids, p_after_id, p_limit):
+        old = copy.deepcopy(row)
+        row['strikes'] = max(0, (row.get('strikes') or 0) + p_strikes)
+        if p_penalty_ends_at is not None:
+            row['penalty_ends_at'] = p_penalty_ends_at
+        data.append(copy.deepcopy(row))
+        backend.emit('players', 'UPDATE', row, old)
+    return data
+
+def _reset_strikes(backend, p_guild_id, p_player_ids, p_after_id=None, p_limit=None):
+    # sql/009_bulk_admin.sql: reset_strikes
+    data = []
+    for row in _targets(backend, p_guild_id, p_player_ids, p_after_id, p_limit, where=lambda row: row.get('strikes')):
+        old = copy.deepcopy(row)
+        row['strikes'] = 0
+        data.append(copy.deepcopy(row))
+        backend.emit('players', 'UPDATE', row, old)
+    return data
+
+def _adjust_points_many(backend, p_guild_id, p_player_ids, p_delta, p_season=None, p_after_id=None, p_limit=None):
+    # sql/009_bulk_admin.sql: adjust_points_many
+    season = current_season(p_season)
+    data = []
+    for row in _targets(backend, p_guild_id, p_player_ids, p_after_id, p_limit):
+        old = copy.deepcopy(row)
+        row['points'] = max(0, (row.get('points') or 0) + p_delta)
+        delta = row['points'] - (old.get('points') or 0)
+        if delta:
+            backend.insert('point_ledger', {'id': backend.next_id('point_ledger'), 'guild_id': p_guild_id, 'season': season, 'player_id': row['id'], 'reason': 'adjust', 'delta': delta})
+            _season_stats(backend, p_guild_id, season, row['id'])['adjusted_points'] += delta
+        data.append(copy.deepcopy(row))
+        backend.emit('players', 'UPDATE', row, old)
+    return data
+
+def _join_queue(backend, p_guild_id, p_entries, p_max_strikes=3):
+    # sql/008_join_queue.sql: join_queue
+    now = datetime.now(timezone.utc)
+    queued = {row['player_id']: row for row in backend.rows('queue') if row['guild_id'] == p_guild_id}
+    order = sorted((row['lane'], row['seq']) for row in queued.values())
+    result = []
+    for entry in p_entries:
+        player_id = entry['player_id']
+        player = backend.find('players', ('guild_id', 'id'), (p_guild_id, player_id))
+        position = None
+        if player is None:
+            status = 'not_registered'
+        elif (player.get('strikes') or 0) >= p_max_strikes:
+            status = 'too_many_strikes'
+        elif player.get('penalty_ends_at') and datetime.fromisoformat(player['penalty_ends_at']) > now:
+            status = 'timed_out'
+        else:
+            me = queued.get(player_id)
+            if me is None:
+                values = {'guild_id': p_guild_id, 'player_id': player_id}
+                values.update({column: entry[column] for column in ('lane', 'seq') if entry.get(column) is not None})
+                me = queued[player_id] = backend.insert('queue', values)
+                insort(order, (me['lane'], me['seq']))
+                status = 'joined'
+            else:
+                status = 'already_in_queue'
+            position = bisect_left(order, (me['lane'], me['seq'])) + 1
+        result.append({'player_id': player_id, 'status': status, 'queue_position': position})
+    return result
+
+def _increment_column(column):
+    def procedure(backend, p_guild_id, p_player_id, p_delta):
+        # sql/005_guild_partitions.sql: increment_points / increment_strikes
+        row = backend.find('players', ('guild_id', 'id'), (p_guild_id, p_player_id))
+        if row is None:
+            return []
+        old = copy.deepcopy(row)
+        row[column] = max(0, (row.get(column) or 0) + p_delta)
+        backend.emit('players', 'UPDATE', row, old)
+        return [copy.deepcopy(row)]
+    return procedure
+
+PROCEDURES = {
+    'settle_match': _settle_match,
+    'adjust_points': _adjust_points,
+    'join_queue': _join_queue,
+    'penalize_players': _penalize_players,
+    'reset_strikes': _reset_strikes,
+    'adjust_points_many': _adjust_points_many,
+    'increment_points': _increment_column('points'),
+    'increment_strikes': _increment_column('strikes'),
+}
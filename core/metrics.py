@@ -0,0 +1,146 @@
+# core/metrics.py
+
+import asyncio
+import time
+from collections import deque
+from contextlib import contextmanager
+
+from aiohttp import web
+
+# 지연 시간 히스토그램 버킷 (초)
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# 끝나지 않은 상호작용의 시작 시각을 보관하는 시간 (디스코드 상호작용 토큰 유효 시간 15분)
+INTERACTION_MAX_AGE = 900.0
+
+class Histogram:
+    def __init__(self, recent: int = 512):
+        self.counts = [0] * (len(BUCKETS) + 1)  # 마지막 칸은 +Inf
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+        self._recent = deque(maxlen=recent)  # 분위수 계산용 최근 값
+
+    def observe(self, seconds: float):
+        for i, bound in enumerate(BUCKETS):
+            if seconds <= bound:
+                self.counts[i] += 1
+                break
+        else:
+            self.counts[-1] += 1
+        self.count += 1
+        self.sum += seconds
+        self.max = max(self.max, seconds)
+        self._recent.append(seconds)
+
+    def quantile(self, q: float) -> float:
+        if not self._recent:
+            return 0.0
+        ordered = sorted(self._recent)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+# 봇 전체의 런타임 지표
+# - 명령어/버튼별 처리 시간, 테이블별 DB 왕복/오류 수, 이벤트 루프 지연, 기타 카운터
+class Metrics:
+    def __init__(self):
+        self.started_at = time.time()
+        self.latency = {}      # 이름 -> Histogram (예: 'command:포인트', 'button:join')
+        self.db_latency = {}   # 대상(테이블, rpc/이름) -> Histogram
+        self.db_errors = {}    # 대상 -> 오류 수
+        self.counters = {}     # 이름 -> 값
+        self.loop_lag = Histogram()
+        self._interaction_starts = {}  # interaction_id -> 시작 시각 (시작 순서대로)
+        self._lag_task = None
+
+    # --- 기록 ---
+    def observe(self, name: str, seconds: float):
+        self.latency.setdefault(name, Histogram()).observe(seconds)
+
+    @contextmanager
+    def timer(self, name: str):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - started)
+
+    def record_db(self, target: str, seconds: float, error: bool = False):
+        self.db_latency.setdefault(target, Histogram()).observe(seconds)
+        if error:
+            self.db_errors[target] = self.db_errors.get(target, 0) + 1
+
+    def increment(self, name: str, value: int = 1):
+        self.counters[name] = self.counters.get(name, 0) + value
+
+    def interaction_started(self, interaction_id: int):
+        now = time.perf_counter()
+        # 끝나지 않은(응답 없이 버려진) 상호작용은 오래된 것부터 정리합니다. 진행 중인 최근 기록은 남깁니다.
+        starts = self._interaction_starts
+        while starts:
+            oldest = next(iter(starts))
+            if now - starts[oldest] < INTERACTION_MAX_AGE:
+                break
+            del starts[oldest]
+        starts[interaction_id] = now
+
+    def interaction_finished(self, interaction_id: int, name: str):
+        started = self._interaction_starts.pop(interaction_id, None)
+        if started is not None:
+            self.observe(name, time.perf_counter() - started)
+
+    # --- 이벤트 루프 지연 측정 ---
+    def start_loop_monitor(self, interval: float = 0.5):
+        if self._lag_task is None or self._lag_task.done():
+            self._lag_task = asyncio.create_task(self._monitor_loop(interval))
+
+    async def _monitor_loop(self, interval: float):
+        loop = asyncio.get_running_loop()
+        while True:
+            started = loop.time()
+            await asyncio.sleep(interval)
+            self.loop_lag.observe(max(0.0, loop.time() - started - interval))
+
+    # --- 출력 ---
+    def render_text(self) -> str:
+        # Prometheus 텍스트 형식
+        lines = [f"valpassbot_uptime_seconds {time.time() - self.started_at:.0f}"]
+        for metric, histograms in (('valpassbot_handler_seconds', self.latency), ('valpassbot_db_seconds', self.db_latency)):
+            lines.append(f"# TYPE {metric} histogram")
+            for name, histogram in sorted(histograms.items()):
+                cumulative = 0
+                for bound, count in zip(BUCKETS + ('+Inf',), histogram.counts):
+                    cumulative += count
+                    lines.append(f'{metric}_bucket{{name="{name}",le="{bound}"}} {cumulative}')
+                lines.append(f'{metric}_sum{{name="{name}"}} {histogram.sum:.6f}')
+                lines.append(f'{metric}_count{{name="{name}"}} {histogram.count}')
+        lines.append("# TYPE valpassbot_db_errors_total counter")
+        for target, count in sorted(self.db_errors.items()):
+            lines.append(f'valpassbot_db_errors_total{{name="{target}"}} {count}')
+        lines.append("# TYPE valpassbot_loop_lag_seconds gauge")
+        lines.append(f'valpassbot_loop_lag_seconds{{quantile="0.5"}} {self.loop_lag.quantile(0.5):.6f}')
+        lines.append(f'valpassbot_loop_lag_seconds{{quantile="0.99"}} {self.loop_lag.quantile(0.99):.6f}')
+        lines.append(f'valpassbot_loop_lag_max_seconds {self.loop_lag.max:.6f}')
+        for name, value in sorted(self.counters.items()):
+            lines.append(f'valpassbot_{name} {value}')
+        return "\n".join(lines) + "\n"
+
+# 로컬에서만 접근 가능한 지표 노출 엔드포인트 (GET /metrics)
+class MetricsServer:
+    def __init__(self, metrics: Metrics, host: str = '127.0.0.1', port: int = 9091):
+        self.metrics = metrics
+        self.host = host
+        self.port = port
+        self._runner = None
+
+    async def start(self):
+        app = web.Application()
+        app.router.add_get('/metrics', self._handle)
+        self._runner = web.AppRunner(app)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, self.host, self.port).start()
+
+    async def stop(self):
+        if self._runner is not None:
+            await self._runner.cleanup()
+
+    async def _handle(self, request):
+        return web.Response(text=self.metrics.render_text(), content_type='text/plain')
@@ -0,0 +1,98 @@
+# core/penalties.py
+
+import asyncio
+import heapq
+from datetime import datetime, timezone
+
+from .repositories import PlayerRepository
+from .tasks import TaskSet
+
+MAX_STRIKES = 3
+
+def _parse(value):
+    if not value:
+        return None
+    return value if isinstance(value, datetime) else datetime.fromisoformat(value)
+
+# 참여 제한(스트라이크 누적, 타임아웃) 인덱스와 타임아웃 만료 스케줄러
+# - 제한 중인 유저만 메모리에 보관하므로 참여 가능 여부 확인은 집합 조회로 끝납니다.
+# - 타임아웃 종료 시각을 힙으로 관리해, 만료되는 순간 listeners 에 등록된 콜백(player_id)을 호출합니다.
+# - players 에 대한 모든 쓰기(멤버제외, 스트라이크감소/초기화, 변경 피드)는 PlayerRepository 리스너로 반영됩니다.
+class PenaltyScheduler:
+    def __init__(self, repo: PlayerRepository, max_strikes: int = MAX_STRIKES):
+        self.repo = repo
+        self.max_strikes = max_strikes
+        self._struck_out = set()  # 스트라이크 누적으로 참여가 제한된 유저
+        self._ends_at = {}        # player_id -> 타임아웃 종료 시각 (진행 중인 것만)
+        self._heap = []           # (종료 timestamp, player_id), 오래된 항목은 꺼낼 때 무시합니다.
+        self._wakeup = asyncio.Event()
+        self._worker = None
+        self.listeners = []       # 타임아웃 만료 시 호출되는 async 콜백(player_id)
+        self._listener_tasks = TaskSet("타임아웃 만료 알림")
+        repo.listeners.append(self._on_player_write)
+
+    def __len__(self) -> int:
+        return len(self._struck_out | self._ends_at.keys())
+
+    def is_struck_out(self, player_id: int) -> bool:
+        return player_id in self._struck_out
+
+    def timeout_ends_at(self, player_id: int):
+        # 진행 중인 타임아웃의 종료 시각, 없으면 None
+        ends_at = self._ends_at.get(player_id)
+        if ends_at is not None and ends_at <= datetime.now(timezone.utc):
+            return None
+        return ends_at
+
+    def update(self, player_id: int, strikes: int, penalty_ends_at):
+        if (strikes or 0) >= self.max_strikes:
+            self._struck_out.add(player_id)
+        else:
+            self._struck_out.discard(player_id)
+
+        ends_at = _parse(penalty_ends_at)
+        if ends_at is None or ends_at <= datetime.now(timezone.utc):
+            self._ends_at.pop(player_id, None)
+        elif self._ends_at.get(player_id) != ends_at:
+            self._ends_at[player_id] = ends_at
+            heapq.heappush(self._heap, (ends_at.timestamp(), player_id))
+            self._wakeup.set()
+
+    def _on_player_write(self, player_id: int, row, deleted: bool = False):
+        if deleted or row is None:
+            self._struck_out.discard(player_id)
+            self._ends_at.pop(player_id, None)
+        elif 'strikes' in row or 'penalty_ends_at' in row:
+            self.update(player_id, row.get('strikes'), row.get('penalty_ends_at'))
+
+    async def load(self):
+        self._struck_out.clear()
+        self._ends_at.clear()
+        self._heap = []
+        for row in await self.repo.list_penalized(datetime.now(timezone.utc).isoformat()):
+            self.update(row['id'], row.get('strikes'), row.get('penalty_ends_at'))
+
+    def start(self):
+        if self._worker is None or self._worker.done():
+            self._worker = asyncio.create_task(self._run())
+
+    async def _run(self):
+        while True:
+            self._wakeup.clear()
+            timeout = None
+            if self._heap:
+                timeout = max(0.0, self._heap[0][0] - datetime.now(timezone.utc).timestamp())
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout)
+                continue  # 더 이른 만료 시각이 추가되었으므로 다시 계산합니다.
+            except asyncio.TimeoutError:
+                pass
+            now = datetime.now(timezone.utc).timestamp()
+            while self._heap and self._heap[0][0] <= now:
+                timestamp, player_id = heapq.heappop(self._heap)
+                ends_at = self._ends_at.get(player_id)
+                if ends_at is None or ends_at.timestamp() != timestamp:
+                    continue  # 이후에 변경/해제된 타임아웃
+                del self._ends_at[player_id]
+                for listener in self.listeners:
+                    self._listener_tasks.spawn(listener(player_id))
@@ -0,0 +1,128 @@
+# core/player_io.py
+
+import csv
+import io
+import json
+
+from .repositories import PlayerRepository
+
+# 플레이어 정보 내보내기/가져오기 (/플레이어내보내기, /플레이어가져오기)
+# - 내보내기는 키셋 페이지(PlayerRepository.iter_pages)를 받는 대로 파일에 기록하므로 메모리에는 한 페이지만 올라갑니다.
+# - 가져오기는 파일을 한 줄씩 읽어 batch_size 행마다 upsert 한 번으로 반영합니다.
+# - 형식: csv (엑셀에서 한글이 깨지지 않도록 BOM 포함) / jsonl (한 줄에 한 명의 JSON 객체)
+# guild_id 는 명령어를 실행한 서버로 정해지므로 파일에 담지 않습니다. (다른 서버로 옮길 때도 그대로 사용)
+COLUMNS = ('id', 'valorant_nickname', 'chzzk_nickname', 'highest_tier', 'current_tier', 'points', 'strikes', 'penalty_ends_at')
+INT_COLUMNS = ('id', 'points', 'strikes')
+# 새 유저에게 꼭 필요한 컬럼 (/정보등록 에서 필수로 받는 항목, DB에서 NOT NULL)
+REQUIRED_COLUMNS = ('valorant_nickname', 'chzzk_nickname', 'highest_tier', 'current_tier')
+# DB 기본값(0)이 있는 NOT NULL 컬럼: 빈 값이면 컬럼을 빼서 기존 값(새 유저는 기본값)을 유지합니다.
+DEFAULTED_COLUMNS = ('points', 'strikes')
+FORMATS = ('csv', 'jsonl')
+
+def format_of(filename: str):
+    # 파일 확장자로 형식을 정합니다. 알 수 없으면 None
+    extension = filename.rsplit('.', 1)[-1].lower() if '.' in filename else ''
+    if extension == 'csv':
+        return 'csv'
+    if extension in ('jsonl', 'json', 'ndjson'):
+        return 'jsonl'
+    return None
+
+async def export_players(repo: PlayerRepository, fp, fmt: str = 'csv', page_size: int = 1000) -> int:
+    # fp 는 바이너리 파일 객체입니다. 기록한 인원 수를 반환합니다.
+    text = io.TextIOWrapper(fp, encoding='utf-8-sig' if fmt == 'csv' else 'utf-8', newline='')
+    count = 0
+    try:
+        writer = csv.DictWriter(text, COLUMNS, extrasaction='ignore') if fmt == 'csv' else None
+        if writer:
+            writer.writeheader()
+        async for rows in repo.iter_pages(', '.join(COLUMNS), page_size):
+            for row in rows:
+                if writer:
+                    writer.writerow(row)
+                else:
+                    text.write(json.dumps({column: row.get(column) for column in COLUMNS}, ensure_ascii=False) + '\n')
+            count += len(rows)
+        text.flush()
+    finally:
+        # 호출한 쪽이 fp 를 계속 쓸 수 있도록 닫지 않고 분리합니다.
+        text.detach()
+    return count
+
+def _read_rows(text, fmt: str):
+    # 형식에 맞게 한 행씩 dict 로 읽습니다. 읽을 수 없는 줄은 None
+    if fmt == 'csv':
+        yield from csv.DictReader(text)
+        return
+    for line in text:
+        if not line.strip():
+            continue
+        try:
+            value = json.loads(line)
+        except ValueError:
+            value = None
+        yield value if isinstance(value, dict) else None
+
+def _clean(raw) -> dict:
+    # 알려진 컬럼만 남기고 숫자 컬럼을 변환합니다. id 가 없거나 값이 잘못된 행은 None
+    if not raw:
+        return None
+    row = {}
+    for column in COLUMNS:
+        if column not in raw:
+            continue
+        value = raw[column]
+        if value == '':
+            value = None
+        if value is None and column in DEFAULTED_COLUMNS:
+            continue
+        if column in INT_COLUMNS and value is not None:
+            try:
+                value = int(value)
+            except (TypeError, ValueError):
+                return None
+            if value < 0:
+                return None
+        row[column] = value
+    return row if row.get('id') is not None else None
+
+async def _upsert_batch(repo: PlayerRepository, rows: list) -> tuple:
+    # 필수 컬럼이 빠진 행은 이미 등록된 유저일 때만 반영합니다. 새 유저 행이 하나라도 섞이면 DB가 요청 전체를 거절하므로 미리 건너뜁니다.
+    # (반영한 행 수, 건너뛴 행 수) 를 반환합니다.
+    incomplete = [row['id'] for row in rows if any(row.get(column) is None for column in REQUIRED_COLUMNS)]
+    if incomplete:
+        new_ids = set(incomplete) - await repo.existing_ids(incomplete)
+        rows = [row for row in rows if row['id'] not in new_ids]
+    else:
+        new_ids = ()
+    saved = await repo.upsert_many(rows) if rows else []
+    return len(saved), len(new_ids)
+
+async def import_players(repo: PlayerRepository, fp, fmt: str = 'csv', batch_size: int = 500) -> tuple:
+    # fp 는 바이너리 파일 객체입니다. 파일에 있는 컬럼만 덮어쓰며(없는 컬럼은 기존 값 유지), (반영한 행 수, 건너뛴 행 수) 를 반환합니다.
+    # 새 유저인데 필수 컬럼(REQUIRED_COLUMNS)이 없는 행은 건너뛴 행으로 셉니다.
+    # 포인트도 그대로 덮어쓰므로 원장/시즌 집계에는 남지 않습니다. (백업 복원/서버 이전용)
+    text = io.TextIOWrapper(fp, encoding='utf-8-sig', newline='')
+    imported = skipped = 0
+    batch, batch_columns = {}, None
+    try:
+        for raw in _read_rows(text, fmt):
+            row = _clean(raw)
+            if row is None:
+                skipped += 1
+                continue
+            # 한 번의 upsert 에 담는 행은 컬럼 구성이 같아야 합니다. (없는 컬럼을 null 로 덮어쓰지 않도록)
+            if batch and (row.keys() != batch_columns or len(batch) >= batch_size):
+                saved, bad = await _upsert_batch(repo, list(batch.values()))
+                imported, skipped = imported + saved, skipped + bad
+                batch = {}
+            batch_columns = row.keys()
+            # 같은 요청 안에서 같은 유저가 두 번 나오면 DB가 거절하므로 마지막 행만 남깁니다.
+            batch.pop(row['id'], None)
+            batch[row['id']] = row
+        if batch:
+            saved, bad = await _upsert_batch(repo, list(batch.values()))
+            imported, skipped = imported + saved, skipped + bad
+    finally:
+        text.detach()
+    return imported, skipped
@@ -0,0 +1,92 @@
+# core/queue_board.py
+
+import asyncio
+import time
+
+import discord
+
+from .queue_store import QueueStore
+
+# 모집 메시지(JoinView)에 붙는 실시간 대기열 현황판
+# 대기열이 바뀌면 메시지를 '변경됨'으로 표시하고, 메시지마다 interval 초에 최대 한 번만 수정합니다.
+class QueueBoard:
+    def __init__(self, bot, queue_store: QueueStore, interval: float = 5.0, top: int = 10):
+        self.bot = bot
+        self.queue_store = queue_store
+        self.interval = interval
+        self.top = top
+        self._messages = {}   # message_id -> (channel_id, 기본 embed)
+        self._last_edit = {}  # message_id -> 마지막 수정 시각
+        self._dirty = set()
+        self._wakeup = asyncio.Event()
+        self._worker = None
+        self.edits = 0
+        queue_store.listeners.append(self.mark_dirty)
+
+    def start(self):
+        if self._worker is None or self._worker.done():
+            self._worker = asyncio.create_task(self._run())
+
+    def __contains__(self, message_id: int) -> bool:
+        return message_id in self._messages
+
+    def register(self, message: discord.Message, base_embed: discord.Embed = None, refresh: bool = True):
+        # 재시작 후에는 버튼 클릭 시 해당 메시지를 다시 등록합니다. (현황판 필드는 매번 새로 그립니다)
+        base_embed = (base_embed or message.embeds[0]).copy().clear_fields()
+        self._messages[message.id] = (message.channel.id, base_embed)
+        if refresh:
+            self._dirty.add(message.id)
+            self._wakeup.set()
+        else:
+            self._last_edit[message.id] = time.monotonic()
+
+    def unregister(self, message_id: int):
+        self._messages.pop(message_id, None)
+        self._last_edit.pop(message_id, None)
+        self._dirty.discard(message_id)
+
+    def mark_dirty(self):
+        if self._messages:
+            self._dirty.update(self._messages)
+            self._wakeup.set()
+
+    def render(self, base_embed: discord.Embed) -> discord.Embed:
+        embed = base_embed.copy()
+        head = self.queue_store.head(self.top)
+        lines = [f"`{idx + 1:2d}` <@{player_id}>" for idx, player_id in enumerate(head)]
+        embed.add_field(name="👥 현재 대기 인원", value=f"**{len(self.queue_store)}명**", inline=False)
+        embed.add_field(name=f"📋 대기 순서 TOP {self.top}", value="\n".join(lines) if lines else "아직 대기 중인 멤버가 없습니다.", inline=False)
+        embed.add_field(name="🕒 마지막 갱신", value=f"<t:{int(time.time())}:T>", inline=False)
+        return embed
+
+    async def _run(self):
+        while True:
+            await self._wakeup.wait()
+            self._wakeup.clear()
+            now = time.monotonic()
+            due = [message_id for message_id in self._dirty if now - self._last_edit.get(message_id, 0) >= self.interval]
+            for message_id in due:
+                self._dirty.discard(message_id)
+                await self._edit(message_id)
+            if self._dirty:
+                # 아직 수정 간격이 지나지 않은 메시지는 가장 빠른 시점까지 기다렸다가 한 번에 반영합니다.
+                wait = min(self.interval - (time.monotonic() - self._last_edit.get(message_id, 0)) for message_id in self._dirty)
+                await asyncio.sleep(max(wait, 0))
+                self._wakeup.set()
+
+    async def _edit(self, message_id: int):
+        if message_id not in self._messages:
+            return
+        channel_id, base_embed = self._messages[message_id]
+        self._last_edit[message_id] = time.monotonic()
+        channel = self.bot.get_channel(channel_id)
+        if channel is None:
+            self.unregister(message_id)
+            return
+        try:
+            await channel.get_partial_message(message_id).edit(embed=self.render(base_embed))
+            self.edits += 1
+        except discord.NotFound:
+            self.unregister(message_id)
+        except discord.HTTPException as e:
+            print(f"대기열 현황판 수정 오류 ({message_id}): {e}")
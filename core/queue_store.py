@@ -0,0 +1,268 @@
+# core/queue_store.py
+
+import time
+from bisect import bisect_left, insort
+
+from .cache import EchoFilter, RecentKeys
+from .journal import JournalWriter
+from .repositories import QueueRepository
+from .tasks import TaskSet
+
+# 우선순위 레인: 숫자가 작을수록 먼저 호출됩니다.
+PRIORITY_LANE = 0  # 운영자/스트리머
+NORMAL_LANE = 1    # 일반 참여자 (선착순)
+
+# join_queue DB 함수(sql/008_join_queue.sql)가 대기열에 들어가 있다고 응답하는 상태
+REGISTERED = ('joined', 'already_in_queue')
+
+# 메모리에 유지하는 권위 있는(authoritative) 대기열
+# - 순서 키는 (lane, seq) 입니다. seq 는 등록 시각 기반(마이크로초)의 단조 증가 값으로, 레인 안에서 선착순을 보장합니다.
+# - 레인만 바꾸면 되므로 우선 참여 등 순서 조정에 타임스탬프를 다시 쓰지 않습니다.
+# - 변경 사항은 즉시 메모리에 반영하고 로컬 저널에 기록한 뒤, DB 반영은 JournalWriter 가 순서대로 처리합니다. (write-behind)
+# - 로비에 배정된(경기 중인) 유저는 hold() 로 대기 순서에서만 빠지고, 정산될 때까지 DB 대기열에는 남아 있습니다.
+class QueueStore:
+    def __init__(self, repo: QueueRepository, writer: JournalWriter):
+        self.repo = repo
+        self.writer = writer
+        self._keys = []     # 정렬된 (lane, seq, player_id) 목록 (대기 중인 유저만)
+        self._entries = {}  # player_id -> (lane, seq, player_id) (경기 중인 유저 포함)
+        self._held = set()  # 로비에 배정되어 경기 중인 유저
+        self._last_seq = 0
+        self.recent_writes = RecentKeys()
+        # 로컬에서 쓴 (lane, seq) 또는 삭제(None) 를 기억해 변경 피드의 에코를 값으로 알아봅니다.
+        self.echoes = EchoFilter()
+        # 대기열이 바뀔 때마다 호출되는 콜백 목록 (core/queue_board.py 등)
+        self.listeners = []
+        # DB가 등록을 거절해 대기열에서 뺀 유저마다 호출되는 async 콜백(player_id, status) 목록 (core/guilds.py)
+        self.refusal_listeners = []
+        self._listener_tasks = TaskSet("대기열 등록 거절 알림")
+        self.ready = False
+        # 연속된 등록/제외/레인 변경은 한 번의 요청으로 묶어 반영합니다.
+        writer.register('add', self._persist_add, coalesce=True)
+        writer.register('remove', self._persist_remove, coalesce=True)
+        writer.register('lane', self._persist_lane, coalesce=True)
+
+    # --- 조회 (네트워크 왕복 없음) ---
+    def __contains__(self, player_id: int) -> bool:
+        return player_id in self._entries
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def is_held(self, player_id: int) -> bool:
+        return player_id in self._held
+
+    def position(self, player_id: int):
+        # 1부터 시작하는 대기 순서, 대기열에 없거나 경기 중이면 None
+        key = self._entries.get(player_id)
+        if key is None or player_id in self._held:
+            return None
+        return bisect_left(self._keys, key) + 1
+
+    def head(self, limit: int = None) -> list:
+        keys = self._keys if limit is None else self._keys[:limit]
+        return [player_id for _, _, player_id in keys]
+
+    def lane(self, player_id: int):
+        key = self._entries.get(player_id)
+        return key[0] if key else None
+
+    # --- 변경 ---
+    def add(self, player_id: int, lane: int = NORMAL_LANE):
+        # 이미 대기 중이면 None, 새로 등록되면 대기 순서를 반환합니다.
+        if player_id in self._entries:
+            return None
+        key = (lane, self._next_seq(), player_id)
+        self._entries[player_id] = key
+        insort(self._keys, key)
+        self.recent_writes.touch(player_id)
+        self.echoes.expect(player_id, key[:2])
+        self._enqueue('add', [{'player_id': player_id, 'lane': lane, 'seq': key[1]}])
+        self._notify()
+        return self.position(player_id)
+
+    def move(self, player_id: int, lane: int):
+        # 레인만 바꾸고 seq(레인 안의 선착순)는 유지합니다. 대기열에 없으면 None
+        if player_id not in self._entries:
+            return None
+        if self._move(player_id, lane):
+            self.recent_writes.touch(player_id)
+            self.echoes.expect(player_id, self._entries[player_id][:2])
+            self._enqueue('lane', [{'player_id': player_id, 'lane': lane}])
+            self._notify()
+        return self.position(player_id)
+
+    def _move(self, player_id: int, lane: int) -> bool:
+        key = self._entries[player_id]
+        if key[0] == lane:
+            return False
+        self._unlink(player_id, key)
+        key = (lane, key[1], player_id)
+        self._link(player_id, key)
+        return True
+
+    def _link(self, player_id: int, key: tuple):
+        self._entries[player_id] = key
+        if player_id not in self._held:
+            insort(self._keys, key)
+
+    def _unlink(self, player_id: int, key: tuple):
+        if player_id not in self._held:
+            del self._keys[bisect_left(self._keys, key)]
+
+    def hold(self, player_ids) -> list:
+        # 로비에 배정된 유저를 대기 순서에서 뺍니다. (DB 변경 없음, 정산 시 settle_match 가 대기열에서 삭제)
+        held = []
+        for player_id in player_ids:
+            key = self._entries.get(player_id)
+            if key is not None and player_id not in self._held:
+                del self._keys[bisect_left(self._keys, key)]
+                self._held.add(player_id)
+                held.append(player_id)
+        if held:
+            self._notify()
+        return held
+
+    def release(self, player_ids) -> list:
+        # 로비가 취소되면 원래 대기 순서(lane, seq)로 되돌립니다.
+        released = []
+        for player_id in player_ids:
+            if player_id in self._held:
+                self._held.discard(player_id)
+                key = self._entries.get(player_id)
+                if key is not None:
+                    insort(self._keys, key)
+                    released.append(player_id)
+        if released:
+            self._notify()
+        return released
+
+    def remove(self, player_ids, persist: bool = True) -> list:
+        # persist=False 는 DB에서 이미 삭제된 경우(settle_match 등)에 사용합니다.
+        if isinstance(player_ids, int):
+            player_ids = [player_ids]
+        removed = []
+        for player_id in player_ids:
+            key = self._entries.pop(player_id, None)
+            if key is None:
+                continue
+            self._unlink(player_id, key)
+            self._held.discard(player_id)
+            self.recent_writes.touch(player_id)
+            # persist=False 여도 DB 삭제(settle_match 등)의 에코가 돌아오므로 기억합니다.
+            self.echoes.expect(player_id, None)
+            removed.append(player_id)
+        if removed and persist:
+            self._enqueue('remove', removed)
+        if removed:
+            self._notify()
+        return removed
+
+    def apply_remote(self, player_id: int, lane: int = None, seq: int = None, deleted: bool = False):
+        # 변경 피드로 받은 외부 변경을 메모리에만 반영합니다. (DB에 다시 쓰지 않음)
+        # 로컬에서 쓴 값의 에코인데 그 뒤에 더 쓴 값이 있으면 지난 값이므로 무시합니다. (core/cache.py EchoFilter)
+        if self.echoes.superseded(player_id, None if deleted else (lane, seq)):
+            return False
+        key = self._entries.get(player_id)
+        if key == (None if deleted else (lane, seq, player_id)):
+            return False
+        key = self._entries.pop(player_id, None)
+        if key is not None:
+            self._unlink(player_id, key)
+        if deleted:
+            self._held.discard(player_id)
+        else:
+            self._link(player_id, (lane, seq, player_id))
+            self._last_seq = max(self._last_seq, seq)
+        self._notify()
+        return True
+
+    def replay(self, kind: str, values: list):
+        # 저널에 남아 있는(아직 DB에 반영되지 않은) 변경을 DB 스냅샷 위에 다시 적용합니다. (다시 기록하지 않음)
+        if kind == 'add':
+            for value in values:
+                if value['player_id'] not in self._entries:
+                    self._link(value['player_id'], (value['lane'], value['seq'], value['player_id']))
+                    self._last_seq = max(self._last_seq, value['seq'])
+                    self.echoes.expect(value['player_id'], (value['lane'], value['seq']))
+        elif kind == 'remove':
+            self.remove(values, persist=False)
+        elif kind == 'lane':
+            for value in values:
+                if value['player_id'] in self._entries:
+                    self._move(value['player_id'], value['lane'])
+                    self.echoes.expect(value['player_id'], self._entries[value['player_id']][:2])
+        self._notify()
+
+    def _notify(self):
+        for listener in self.listeners:
+            listener()
+
+    def _next_seq(self) -> int:
+        # DB 기본값(sql/003)과 같은 에포크 마이크로초 기준이며, 같은 시각이어도 항상 증가합니다.
+        self._last_seq = max(self._last_seq + 1, time.time_ns() // 1000)
+        return self._last_seq
+
+    # --- DB 동기화 ---
+    async def load(self):
+        # 재시작 시 queue 테이블에서 메모리 상태를 다시 구성합니다.
+        rows = await self.repo.list_ordered('player_id, lane, seq')
+        entries = {row['player_id']: (row['lane'], row['seq'], row['player_id']) for row in rows}
+        # 다시 불러오는 동안 로컬에서 바뀐 유저는 메모리 상태를 유지합니다. (아직 DB에 반영 중일 수 있음)
+        for player_id in list(self._entries.keys() | entries.keys()):
+            if player_id in self.recent_writes:
+                if player_id in self._entries:
+                    entries[player_id] = self._entries[player_id]
+                else:
+                    entries.pop(player_id, None)
+        self._entries = entries
+        # 경기 중인 유저는 DB에 남아 있어도 대기 순서에서 계속 뺍니다.
+        self._held &= entries.keys()
+        self._keys = sorted(key for player_id, key in entries.items() if player_id not in self._held)
+        self._last_seq = max([key[1] for key in entries.values()], default=self._last_seq)
+        self.ready = True
+        self._notify()
+
+    async def durable(self):
+        # 지금까지의 변경이 로컬 저널에 기록될 때까지 기다립니다. (DB 왕복 없음)
+        await self.writer.durable()
+
+    async def flush(self, timeout: float = 10.0):
+        # 남은 변경 사항을 DB에 반영합니다.
+        await self.writer.flush(timeout)
+
+    def _enqueue(self, op: str, values: list):
+        self.writer.enqueue(op, values)
+
+    async def _persist_add(self, values: list, key: str):
+        # 운영자 우선 참여(/운영자참여)는 참여 제한을 확인하지 않으므로 그대로 등록합니다.
+        priority = [value for value in values if value['lane'] == PRIORITY_LANE]
+        if priority:
+            await self.repo.add_many(priority)
+        normal = [value for value in values if value['lane'] != PRIORITY_LANE]
+        if not normal:
+            return
+        # 일반 참여는 DB 함수가 참여 자격을 다시 확인합니다. 메모리 상태가 뒤처져 있던 사이(대시보드에서 타임아웃 부여 등) DB가 거절한
+        # 유저는 그 등록이 아직 메모리에 남아 있을 때만 대기열에서 뺍니다. (이후 다시 참여한 경우는 유지)
+        seqs = {value['player_id']: value['seq'] for value in normal}
+        refused = [row for row in await self.repo.join(normal) if row['status'] not in REGISTERED]
+        stale = [row for row in refused if self._entries.get(row['player_id'], (None, None))[1] == seqs.get(row['player_id'])]
+        for row in refused:
+            print(f"서버 {self.repo.guild_id}: DB가 {row['player_id']} 대기열 등록을 거절했습니다. ({row['status']})")
+        if stale:
+            self.remove([row['player_id'] for row in stale], persist=False)
+        # 버튼에는 이미 참여 완료로 응답했으므로, 실제로 대기열에서 빠진 유저는 콜백으로 알립니다. (cogs/events.py 에서 DM 발송)
+        for row in stale:
+            for listener in self.refusal_listeners:
+                self._listener_tasks.spawn(listener(row['player_id'], row['status']))
+
+    async def _persist_remove(self, values: list, key: str):
+        await self.repo.remove(values)
+
+    async def _persist_lane(self, values: list, key: str):
+        # 같은 유저의 레인이 여러 번 바뀌었으면 마지막 값만 반영합니다.
+        lanes = {}
+        for value in values:
+            lanes[value['player_id']] = value['lane']
+        for lane in sorted(set(lanes.values())):
+            await self.repo.set_lane([player_id for player_id, value in lanes.items() if value == lane], lane)
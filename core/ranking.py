@@ -0,0 +1,116 @@
+# core/ranking.py
+
+from bisect import bisect_left, bisect_right, insort
+
+from .repositories import PlayerRepository
+
+# 포인트 랭킹 인덱스
+# - (-포인트, player_id) 순으로 정렬된 목록을 유지하므로 순위/상위 K명 조회가 O(log n) 입니다.
+# - 동점자는 같은 순위를 받습니다. (1, 2, 2, 4 ...) 목록 표시 순서는 player_id 오름차순입니다.
+class RankingIndex:
+    def __init__(self, repo: PlayerRepository):
+        self.repo = repo
+        self._keys = []    # 정렬된 (-points, player_id) 목록
+        self._points = {}  # player_id -> points
+        self.ready = False
+        self._watch = None  # check_consistency 가 DB를 읽는 동안 바뀐 player_id
+        # 순서 키가 바뀔 때 (이전 키, 새 키) 로 호출되는 콜백 목록 (core/leaderboard.py), 전체를 다시 구성하면 (None, None)
+        self.listeners = []
+        # 포인트가 바뀌는 모든 쓰기(upsert/update)를 통해 인덱스를 갱신합니다.
+        repo.listeners.append(self._on_player_write)
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def __contains__(self, player_id: int) -> bool:
+        return player_id in self._points
+
+    def points(self, player_id: int):
+        return self._points.get(player_id)
+
+    def rank(self, player_id: int):
+        # 나보다 포인트가 많은 사람 수 + 1, 랭킹에 없으면 None
+        points = self._points.get(player_id)
+        if points is None:
+            return None
+        return bisect_left(self._keys, (-points,)) + 1
+
+    def top(self, limit: int) -> list:
+        return [(player_id, -neg_points) for neg_points, player_id in self._keys[:limit]]
+
+    def index_of(self, key: tuple) -> int:
+        # 정렬 목록에서 key 가 들어갈 위치 (0부터)
+        return bisect_left(self._keys, key)
+
+    def after(self, key: tuple, limit: int) -> list:
+        # 키셋 페이지: (-points, player_id) 가 key 보다 뒤(순위가 낮은 쪽)인 limit 개, key 가 None 이면 1위부터
+        # 기준 유저의 포인트가 그 사이 바뀌었거나 삭제되었어도 키 값 기준이므로 중복/누락 없이 이어집니다.
+        start = 0 if key is None else bisect_right(self._keys, key)
+        return self._keys[start:start + limit]
+
+    def before(self, key: tuple, limit: int) -> list:
+        # 키셋 페이지: key 보다 앞(순위가 높은 쪽) limit 개
+        end = bisect_left(self._keys, key)
+        return self._keys[max(0, end - limit):end]
+
+    def set(self, player_id: int, points: int):
+        if self._watch is not None:
+            self._watch.add(player_id)
+        old = self._points.get(player_id)
+        if old == points:
+            return
+        if old is not None:
+            del self._keys[bisect_left(self._keys, (-old, player_id))]
+        self._points[player_id] = points
+        insort(self._keys, (-points, player_id))
+        self._notify((-old, player_id) if old is not None else None, (-points, player_id))
+
+    def remove(self, player_id: int):
+        if self._watch is not None:
+            self._watch.add(player_id)
+        old = self._points.pop(player_id, None)
+        if old is not None:
+            del self._keys[bisect_left(self._keys, (-old, player_id))]
+            self._notify((-old, player_id), None)
+
+    def _notify(self, old_key, new_key):
+        for listener in self.listeners:
+            listener(old_key, new_key)
+
+    def _on_player_write(self, player_id: int, row, deleted: bool = False):
+        if deleted:
+            self.remove(player_id)
+        elif row is not None and 'points' in row:
+            self.set(player_id, row.get('points') or 0)
+
+    def _build(self, rows: list):
+        self._points = {row['id']: row.get('points') or 0 for row in rows}
+        self._keys = sorted((-points, player_id) for player_id, points in self._points.items())
+        self._notify(None, None)
+
+    async def load(self):
+        self._build(await self.repo.list_by_points())
+        self.ready = True
+
+    async def check_consistency(self, repair: bool = True) -> list:
+        # DB와 비교해 어긋난 (player_id, 인덱스 값, DB 값) 목록을 반환하고, 필요하면 어긋난 유저만 고칩니다.
+        # DB를 읽는 동안 바뀌었거나 최근 로컬에서 쓴 유저는 DB 스냅샷이 더 오래되었을 수 있으므로 비교하지 않습니다.
+        # 아직 DB에 반영되지 않은 저널 항목이 있으면 호출하지 않습니다. (GuildState.check_ranking)
+        self._watch = set()
+        try:
+            rows = await self.repo.list_by_points()
+        finally:
+            skip, self._watch = self._watch, None
+        db_points = {row['id']: row.get('points') or 0 for row in rows}
+        mismatches = [
+            (player_id, self._points.get(player_id), db_points.get(player_id))
+            for player_id in self._points.keys() | db_points.keys()
+            if self._points.get(player_id) != db_points.get(player_id) and player_id not in skip and player_id not in self.repo.recent_writes
+        ]
+        if repair:
+            for player_id, _, points in mismatches:
+                if points is None:
+                    self.remove(player_id)
+                else:
+                    self.set(player_id, points)
+        return mismatches
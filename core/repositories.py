@@ -0,0 +1,270 @@
+# core/repositories.py
+
+from datetime import datetime
+
+from .cache import MISSING, EchoFilter, RecentKeys, TTLCache
+from .database import Database
+
+# PostgREST(Supabase) 가 응답 하나에 담는 최대 행 수 (max_rows 기본값)
+# 이보다 많을 수 있는 조회는 아래 키셋 페이지로 나눠 읽습니다.
+PAGE_SIZE = 1000
+
+async def keyset_pages(db: Database, make_query, key: str = 'id', page_size: int = PAGE_SIZE):
+    # make_query() 가 만든 조회를 key 오름차순으로 page_size 개씩 읽어 목록 단위로 돌려줍니다. (조회 컬럼에 key 가 있어야 합니다)
+    # OFFSET 이 아니라 마지막 key 다음부터 읽으므로 뒤 페이지도 인덱스 범위 조회 한 번이며, 도중에 행이 바뀌어도 중복이 없습니다.
+    cursor = None
+    while True:
+        query = make_query()
+        if cursor is not None:
+            query = query.gt(key, cursor)
+        response = await db.execute(query.order(key).limit(page_size))
+        if not response.data:
+            return
+        yield response.data
+        if len(response.data) < page_size:
+            return
+        cursor = response.data[-1][key]
+
+async def _collect(pages) -> list:
+    rows = []
+    async for page in pages:
+        rows.extend(page)
+    return rows
+
+def _normalize(value):
+    # PostgREST 응답과 변경 피드는 같은 timestamptz 를 다른 문자열로 보낼 수 있으므로 시각으로 바꿔 비교합니다.
+    if isinstance(value, str):
+        try:
+            return datetime.fromisoformat(value)
+        except ValueError:
+            return value
+    return value
+
+def _same_row(written, row) -> bool:
+    # 로컬에서 쓴 행(쓰기 응답)과 변경 피드의 행이 같은 값인지 비교합니다. (둘 다 None 이면 삭제)
+    if written is None or row is None:
+        return written is None and row is None
+    return all(_normalize(value) == _normalize(row[column]) for column, value in written.items() if column in row)
+
+# players 테이블 접근 계층 (서버 하나의 파티션, 기본 키는 (guild_id, id))
+# 행 전체를 읽기 관통(read-through) 캐시에 보관하고, 모든 쓰기 경로에서 캐시를 갱신합니다.
+class PlayerRepository:
+    def __init__(self, db: Database, guild_id: int, cache: TTLCache = None):
+        self.db = db
+        self.guild_id = guild_id
+        self.cache = cache or TTLCache()
+        # 쓰기 후 (player_id, 최신 행 또는 None) 을 전달받는 콜백 목록
+        self.listeners = []
+        self.recent_writes = RecentKeys()
+        self.echoes = EchoFilter(_same_row)
+
+    def _table(self):
+        return self.db.table('players')
+
+    async def get(self, player_id: int):
+        # 등록되지 않은 유저는 None 을 반환합니다. (미등록 결과도 캐시합니다)
+        row = self.cache.get(player_id)
+        if row is not MISSING:
+            return row
+        response = await self.db.execute(self._table().select('*').eq('guild_id', self.guild_id).eq('id', player_id).maybe_single())
+        row = response.data if response else None
+        self.cache.set(player_id, row)
+        return row
+
+    async def get_many(self, player_ids):
+        rows, missing = [], []
+        for player_id in player_ids:
+            row = self.cache.get(player_id)
+            if row is MISSING:
+                missing.append(player_id)
+            elif row:
+                rows.append(row)
+        if missing:
+            response = await self.db.execute(self._table().select('*').eq('guild_id', self.guild_id).in_('id', missing))
+            fetched = {row['id']: row for row in response.data}
+            for player_id in missing:
+                self.cache.set(player_id, fetched.get(player_id))
+            rows.extend(fetched.values())
+        return rows
+
+    async def upsert(self, row: dict):
+        response = await self.db.execute(self._table().upsert({**row, 'guild_id': self.guild_id}, on_conflict='guild_id,id'))
+        self._store(row['id'], response.data)
+        return response.data
+
+    async def update(self, player_id: int, fields: dict):
+        response = await self.db.execute(self._table().update(fields).eq('guild_id', self.guild_id).eq('id', player_id))
+        self._store(player_id, response.data)
+        return response.data
+
+    async def increment(self, player_id: int, column: str, delta: int):
+        # DB 함수로 원자적으로 증감합니다. (0 미만 불가) 등록되지 않은 유저면 None
+        response = await self.db.execute(self.db.rpc(f'increment_{column}', {'p_guild_id': self.guild_id, 'p_player_id': player_id, 'p_delta': delta}))
+        self._store(player_id, response.data)
+        return response.data[0] if response.data else None
+
+    async def adjust_points(self, player_id: int, delta: int, season: str = None):
+        # 포인트 증감(0 미만 불가)과 원장/시즌 집계 기록을 한 번의 왕복으로 처리합니다. 등록되지 않은 유저면 None
+        response = await self.db.execute(self.db.rpc('adjust_points', {'p_guild_id': self.guild_id, 'p_player_id': player_id, 'p_delta': delta, 'p_season': season}))
+        self._store(player_id, response.data)
+        return response.data[0] if response.data else None
+
+    async def settle_match(self, player_ids: list, points: int, op_key: str = None, season: str = None) -> list:
+        # 참여자 포인트 지급, 대기열 제외, 원장/시즌 집계 기록을 한 트랜잭션(한 번의 왕복)으로 처리하고 갱신된 행을 반환합니다.
+        # 같은 op_key 로 다시 호출하면 지급하지 않고 현재 행만 반환합니다. (저널 재생 시 중복 지급 방지)
+        response = await self.db.execute(self.db.rpc('settle_match', {'p_guild_id': self.guild_id, 'p_player_ids': list(player_ids), 'p_points': points, 'p_op_key': op_key, 'p_season': season}))
+        for row in response.data:
+            self._store(row['id'], [row])
+        return response.data
+
+    # --- 여러 유저 일괄 처리 (sql/009_bulk_admin.sql) ---
+    # player_ids 가 None 이면 이 서버에 등록된 모든 유저가 대상입니다. 응답이 최대 행 수로 잘리지 않도록 PAGE_SIZE 명씩 나눠
+    # id 순으로 처리하며, 각 구간은 DB 함수 한 번(집합 단위 문장 하나)입니다. 갱신된 행을 모두 반환합니다.
+    async def penalize_many(self, player_ids, strikes: int = 0, penalty_ends_at: str = None) -> list:
+        return await self._rpc_many('penalize_players', player_ids, {'p_strikes': strikes, 'p_penalty_ends_at': penalty_ends_at})
+
+    async def reset_strikes_many(self, player_ids) -> list:
+        # 스트라이크가 남아 있던 유저의 행만 반환합니다.
+        return await self._rpc_many('reset_strikes', player_ids, {})
+
+    async def adjust_points_many(self, player_ids, delta: int, season: str = None) -> list:
+        return await self._rpc_many('adjust_points_many', player_ids, {'p_delta': delta, 'p_season': season})
+
+    async def _rpc_many(self, name: str, player_ids, params: dict) -> list:
+        rows = []
+        if player_ids is not None:
+            ids = sorted(set(player_ids))
+            for start in range(0, len(ids), PAGE_SIZE):
+                rows.extend(await self._rpc_chunk(name, {'p_player_ids': ids[start:start + PAGE_SIZE], **params}))
+            return rows
+        cursor = None
+        while True:
+            chunk = await self._rpc_chunk(name, {'p_player_ids': None, 'p_after_id': cursor, 'p_limit': PAGE_SIZE, **params})
+            rows.extend(chunk)
+            if len(chunk) < PAGE_SIZE:
+                return rows
+            cursor = max(row['id'] for row in chunk)
+
+    async def _rpc_chunk(self, name: str, params: dict) -> list:
+        response = await self.db.execute(self.db.rpc(name, {'p_guild_id': self.guild_id, **params}))
+        for row in response.data:
+            self._store(row['id'], [row])
+        return response.data
+
+    async def existing_ids(self, player_ids) -> set:
+        # 가져오기(import)용: 이미 등록된 유저 id 만 한 번의 조회로 확인합니다.
+        response = await self.db.execute(self._table().select('id').eq('guild_id', self.guild_id).in_('id', list(player_ids)))
+        return {row['id'] for row in response.data}
+
+    async def upsert_many(self, rows: list) -> list:
+        # 가져오기(import)용: 여러 행을 한 번의 요청으로 등록/덮어쓰기합니다.
+        rows = [{**row, 'guild_id': self.guild_id} for row in rows]
+        response = await self.db.execute(self._table().upsert(rows, on_conflict='guild_id,id'))
+        for row in response.data:
+            self._store(row['id'], [row])
+        return response.data
+
+    def iter_pages(self, columns: str = '*', page_size: int = PAGE_SIZE):
+        # 내보내기(export)용 키셋 페이지: (guild_id, id) 기본 키 순으로 page_size 개씩 읽습니다. (전체를 한 번에 메모리에 올리지 않음)
+        return keyset_pages(self.db, lambda: self._table().select(columns).eq('guild_id', self.guild_id), 'id', page_size)
+
+    def _store(self, player_id: int, data):
+        # 쓰기 응답(returning=representation)에 담긴 최신 행으로 캐시를 교체합니다.
+        self.recent_writes.touch(player_id)
+        self.echoes.expect(player_id, data[0] if data else None)
+        if data:
+            self.cache.set(player_id, data[0])
+        else:
+            self.cache.invalidate(player_id)
+        self._notify(player_id, data[0] if data else None)
+
+    def apply_remote(self, player_id: int, row):
+        # 변경 피드로 받은 외부 변경을 캐시와 리스너에 반영합니다. (row 가 None 이면 삭제)
+        # 로컬에서 쓴 값의 에코인데 그 뒤에 더 쓴 값이 있으면 지난 값이므로 무시합니다. (core/cache.py EchoFilter)
+        if self.echoes.superseded(player_id, row):
+            return False
+        if row is None:
+            self.cache.invalidate(player_id)
+        else:
+            self.cache.set(player_id, row)
+        self._notify(player_id, row, deleted=row is None)
+        return True
+
+    def _notify(self, player_id: int, row, deleted: bool = False):
+        for listener in self.listeners:
+            listener(player_id, row, deleted)
+
+    async def list_penalized(self, now_iso: str) -> list:
+        # 스트라이크가 3개 이상이거나 타임아웃이 진행 중인 유저
+        columns = 'id, strikes, penalty_ends_at'
+        struck_out = await _collect(keyset_pages(self.db, lambda: self._table().select(columns).eq('guild_id', self.guild_id).gte('strikes', 3)))
+        timed_out = await _collect(keyset_pages(self.db, lambda: self._table().select(columns).eq('guild_id', self.guild_id).gt('penalty_ends_at', now_iso)))
+        return list({row['id']: row for row in struck_out + timed_out}.values())
+
+    async def list_by_points(self, limit: int = None):
+        # 상위 limit 명만 필요하면 포인트 순 조회 한 번, 전체는 id 키셋 페이지로 모두 읽은 뒤 포인트 순으로 정렬합니다.
+        if limit:
+            response = await self.db.execute(self._table().select('id, points').eq('guild_id', self.guild_id).order('points', desc=True).limit(limit))
+            return response.data
+        rows = await _collect(self.iter_pages('id, points'))
+        rows.sort(key=lambda row: -(row.get('points') or 0))
+        return rows
+
+# queue 테이블 접근 계층 (서버 하나의 파티션, lane, seq 오름차순이 대기 순서이며 queue_guild_lane_seq_idx 인덱스를 사용합니다)
+class QueueRepository:
+    def __init__(self, db: Database, guild_id: int):
+        self.db = db
+        self.guild_id = guild_id
+
+    def _table(self):
+        return self.db.table('queue')
+
+    async def list_ordered(self, columns: str = 'player_id', limit: int = None):
+        # 앞쪽 limit 명만 필요하면 대기 순서 조회 한 번, 전체는 player_id 키셋 페이지(queue_guild_player_id_key)로 모두 읽은 뒤 정렬합니다.
+        if limit:
+            response = await self.db.execute(self._table().select(columns).eq('guild_id', self.guild_id).order('lane').order('seq').limit(limit))
+            return response.data
+        rows = await _collect(keyset_pages(self.db, lambda: self._table().select(columns).eq('guild_id', self.guild_id), 'player_id'))
+        if rows and 'lane' in rows[0] and 'seq' in rows[0]:
+            rows.sort(key=lambda row: (row['lane'], row['seq']))
+        return rows
+
+    async def count(self) -> int:
+        response = await self.db.execute(self._table().select('player_id', count='exact').eq('guild_id', self.guild_id))
+        return response.count
+
+    async def add_many(self, rows: list):
+        # 재시도 시 중복 등록되지 않도록 (guild_id, player_id) 충돌은 무시합니다. (sql/005_guild_partitions.sql)
+        rows = [{**row, 'guild_id': self.guild_id} for row in rows]
+        response = await self.db.execute(self._table().upsert(rows, on_conflict='guild_id,player_id', ignore_duplicates=True))
+        return response.data
+
+    async def join(self, entries: list, max_strikes: int = 3) -> list:
+        # 참여 자격 확인과 멱등 등록, 대기 순서 계산을 DB 함수 한 번(한 번의 왕복)으로 처리합니다. (sql/008_join_queue.sql)
+        # entries: [{'player_id', 'lane', 'seq'}] -> 입력 순서대로 [{'player_id', 'status', 'queue_position'}]
+        response = await self.db.execute(self.db.rpc('join_queue', {'p_guild_id': self.guild_id, 'p_entries': entries, 'p_max_strikes': max_strikes}))
+        return response.data
+
+    async def set_lane(self, player_ids, lane: int):
+        response = await self.db.execute(self._table().update({'lane': lane}).eq('guild_id', self.guild_id).in_('player_id', list(player_ids)))
+        return response.data
+
+    async def remove(self, player_ids):
+        if isinstance(player_ids, int):
+            player_ids = [player_ids]
+        response = await self.db.execute(self._table().delete().eq('guild_id', self.guild_id).in_('player_id', list(player_ids)))
+        return response.data
+
+# player_season_stats 테이블 접근 계층 (sql/007_match_ledger.sql)
+# 집계는 정산/포인트 조정 DB 함수가 같은 트랜잭션에서 갱신하므로 여기서는 읽기만 합니다.
+class SeasonStatsRepository:
+    def __init__(self, db: Database, guild_id: int):
+        self.db = db
+        self.guild_id = guild_id
+
+    async def get(self, player_id: int, season: str):
+        # 기본 키 조회 한 번, 기록이 없으면 None
+        response = await self.db.execute(
+            self.db.table('player_season_stats').select('*').eq('guild_id', self.guild_id).eq('season', season).eq('player_id', player_id).maybe_single()
+        )
+        return response.data if response else None
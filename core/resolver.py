@@ -0,0 +1,75 @@
+# core/resolver.py
+
+import asyncio
+
+import discord
+
+from .cache import MISSING, TTLCache
+
+# 유저 ID -> discord.User/Member 변환기
+# 게이트웨이 캐시(get_user, 길드 멤버 캐시) → LRU 캐시 → 멤버 청킹(query_members) → REST(fetch_user) 순으로 찾습니다.
+class UserResolver:
+    def __init__(self, bot, maxsize: int = 2048, ttl: float = 3600.0):
+        self.bot = bot
+        self.cache = TTLCache(maxsize, ttl)  # user_id -> User/Member, 찾을 수 없으면 None
+        self.rest_calls = 0
+
+    async def resolve(self, user_id: int, guild: discord.Guild = None):
+        return (await self.resolve_many([user_id], guild))[user_id]
+
+    async def resolve_many(self, user_ids, guild: discord.Guild = None) -> dict:
+        resolved, missing = {}, []
+        for user_id in dict.fromkeys(user_ids):
+            user = self._from_gateway(user_id, guild)
+            if user is None:
+                user = self.cache.get(user_id)
+            if user is MISSING:
+                missing.append(user_id)
+            else:
+                resolved[user_id] = user
+
+        # 길드 멤버는 게이트웨이 청킹으로 최대 100명씩 한 번에 가져옵니다. (REST 요청 없음)
+        if missing and guild is not None and not guild.chunked:
+            for i in range(0, len(missing), 100):
+                try:
+                    members = await guild.query_members(user_ids=missing[i:i + 100], limit=100, cache=True)
+                except (asyncio.TimeoutError, discord.ClientException) as e:
+                    print(f"멤버 청킹 조회 오류: {e}")
+                    continue
+                for member in members:
+                    resolved[member.id] = member
+                    self.cache.set(member.id, member)
+            missing = [user_id for user_id in missing if user_id not in resolved]
+
+        # 서버를 떠난 유저 등 남은 인원만 REST로 동시에 조회합니다.
+        if missing:
+            users = await asyncio.gather(*(self._fetch(user_id) for user_id in missing))
+            for user_id, user in zip(missing, users):
+                if user is MISSING:
+                    # 일시적인 오류는 캐시에 남기지 않고 이번에만 찾을 수 없음으로 표시합니다.
+                    resolved[user_id] = None
+                    continue
+                resolved[user_id] = user
+                self.cache.set(user_id, user)
+        return resolved
+
+    def _from_gateway(self, user_id: int, guild: discord.Guild):
+        if guild is not None:
+            member = guild.get_member(user_id)
+            if member is not None:
+                return member
+        return self.bot.get_user(user_id)
+
+    async def _fetch(self, user_id: int):
+        self.rest_calls += 1
+        try:
+            return await self.bot.fetch_user(user_id)
+        except discord.NotFound:
+            return None
+        except discord.HTTPException as e:
+            # 403, 5xx, 재시도 후에도 남은 rate limit 등: 한 명 때문에 전체 화면이 실패하지 않도록 호출한 쪽은 mention(None, id) 로 표시합니다.
+            print(f"유저 {user_id} 조회 오류: {e.status} {e}")
+            return MISSING
+
+def mention(user, user_id: int, missing_text: str = "찾을 수 없음") -> str:
+    return user.mention if user else f"ID: {user_id} ({missing_text})"
@@ -0,0 +1,33 @@
+# core/seasons.py
+
+from datetime import date, datetime, timedelta, timezone
+
+# 시즌과 연속 참여 일수는 한국 시간 기준으로 나눕니다. (DB 함수와 같은 기준, sql/007_match_ledger.sql)
+SEASON_TIMEZONE = timezone(timedelta(hours=9))
+
+def current_season(fixed: str = None, now: datetime = None) -> str:
+    # 고정 시즌(SEASON 환경 변수)이 없으면 분기 단위 시즌을 사용합니다. 예: '2026-Q4'
+    if fixed:
+        return fixed
+    now = (now or datetime.now(timezone.utc)).astimezone(SEASON_TIMEZONE)
+    return f"{now.year}-Q{(now.month - 1) // 3 + 1}"
+
+def season_day(now: datetime = None) -> date:
+    return (now or datetime.now(timezone.utc)).astimezone(SEASON_TIMEZONE).date()
+
+def next_streak(current: int, last_played_on, today: date) -> int:
+    # 같은 날 여러 번 참여해도 1일로 세고, 하루라도 빠지면 1부터 다시 셉니다.
+    if last_played_on == today:
+        return max(current or 0, 1)
+    if last_played_on == today - timedelta(days=1):
+        return (current or 0) + 1
+    return 1
+
+def active_streak(current: int, last_played_on, today: date = None) -> int:
+    # 저장된 연속 참여 일수는 다음 참여 때 갱신되므로, 조회 시점에 이미 끊긴 기록은 0으로 봅니다.
+    if not last_played_on:
+        return 0
+    if isinstance(last_played_on, str):
+        last_played_on = date.fromisoformat(last_played_on)
+    today = today or season_day()
+    return (current or 0) if today - last_played_on <= timedelta(days=1) else 0
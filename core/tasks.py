@@ -0,0 +1,29 @@
+# core/tasks.py
+
+import asyncio
+import traceback
+
+# 결과를 기다리지 않는 백그라운드 작업 모음 (알림 콜백 등)
+# 이벤트 루프는 작업을 약한 참조로만 들고 있으므로 끝날 때까지 여기서 참조를 유지하고, 실패하면 오류를 남깁니다.
+class TaskSet:
+    def __init__(self, name: str):
+        self.name = name
+        self._tasks = set()
+
+    def __len__(self) -> int:
+        return len(self._tasks)
+
+    def spawn(self, coro) -> asyncio.Task:
+        task = asyncio.create_task(coro)
+        self._tasks.add(task)
+        task.add_done_callback(self._finished)
+        return task
+
+    def _finished(self, task: asyncio.Task):
+        self._tasks.discard(task)
+        if task.cancelled():
+            return
+        error = task.exception()
+        if error is not None:
+            print(f"{self.name} 작업 오류: {error!r}")
+            traceback.print_exception(error)
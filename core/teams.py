@@ -0,0 +1,161 @@
+# core/teams.py
+
+import re
+from functools import lru_cache
+from itertools import combinations
+
+import numpy as np
+
+TEAM_SIZE = 5
+LOBBY_SIZE = TEAM_SIZE * 2
+
+# 발로란트 티어 (낮은 순서)와 자유 입력에서 흔히 쓰는 별칭
+TIERS = [
+    ('아이언', ('아이언', '아언', 'iron')),
+    ('브론즈', ('브론즈', '브론', 'bronze')),
+    ('실버', ('실버', 'silver')),
+    ('골드', ('골드', 'gold')),
+    ('플래티넘', ('플래티넘', '플레티넘', '플래', '플레', 'platinum', 'plat')),
+    ('다이아몬드', ('다이아몬드', '다이아', '다야', 'diamond', 'dia')),
+    ('초월자', ('초월자', '초월', 'ascendant', 'asc')),
+    ('불멸', ('불멸', 'immortal', 'imm')),
+    ('레디언트', ('레디언트', '레디', 'radiant')),
+]
+DIVISIONS = 3
+# 정보가 없거나 읽을 수 없는 티어는 골드 2 로 봅니다.
+DEFAULT_RATING = 3 * DIVISIONS + 1
+# 현재 티어와 최고 티어의 반영 비율
+CURRENT_WEIGHT = 0.7
+
+_ALIASES = sorted(((alias, index) for index, (_, aliases) in enumerate(TIERS) for alias in aliases), key=lambda item: -len(item[0]))
+
+def parse_tier(text: str):
+    # '다이아몬드 1', '플레3', 'Immortal 2', '레디언트' 등을 0(아이언 1)~24(레디언트) 점수로 바꿉니다. 읽을 수 없으면 None
+    if not text:
+        return None
+    normalized = text.strip().lower()
+    for alias, index in _ALIASES:
+        position = normalized.find(alias)
+        if position < 0:
+            continue
+        if index == len(TIERS) - 1:
+            return index * DIVISIONS
+        division = re.search(r'[1-3]', normalized[position + len(alias):])
+        # 단계가 없으면 중간(2)으로 봅니다.
+        return index * DIVISIONS + (int(division.group()) - 1 if division else 1)
+    return None
+
+def tier_name(rating: float) -> str:
+    index, division = divmod(int(round(rating)), DIVISIONS)
+    if index >= len(TIERS) - 1:
+        return TIERS[-1][0]
+    return f"{TIERS[index][0]} {division + 1}"
+
+def player_rating(player: dict) -> float:
+    current, highest = parse_tier(player.get('current_tier')), parse_tier(player.get('highest_tier'))
+    if current is None and highest is None:
+        return float(DEFAULT_RATING)
+    if current is None or highest is None:
+        return float(current if current is not None else highest)
+    return CURRENT_WEIGHT * current + (1 - CURRENT_WEIGHT) * highest
+
+@lru_cache(maxsize=1)
+def _split_masks() -> np.ndarray:
+    # 10명을 5:5로 나누는 252가지 경우 (True 가 A팀), (252, 10) bool 배열
+    masks = np.zeros((252, LOBBY_SIZE), dtype=bool)
+    for row, members in enumerate(combinations(range(LOBBY_SIZE), TEAM_SIZE)):
+        masks[row, list(members)] = True
+    return masks
+
+class TeamSplit:
+    def __init__(self, team_a: list, team_b: list, sum_a: float, sum_b: float, violations: int = 0):
+        self.team_a = team_a          # 선수 인덱스(입력 순서) 목록
+        self.team_b = team_b
+        self.sum_a = sum_a
+        self.sum_b = sum_b
+        self.violations = violations  # 지키지 못한 조건 수
+
+    @property
+    def diff(self) -> float:
+        return abs(self.sum_a - self.sum_b)
+
+def _pair_penalty(same_team, together: list, apart: list):
+    # same_team(i, j) 가 (경우 수,) bool 배열을 돌려주는 함수일 때 조건 위반 수를 계산합니다.
+    penalty = 0
+    for i, j in together:
+        penalty = penalty + ~same_team(i, j)
+    for i, j in apart:
+        penalty = penalty + same_team(i, j)
+    return penalty
+
+def balance_lobby(ratings, together=(), apart=()) -> TeamSplit:
+    # 10명의 252가지 5:5 분할을 한 번에 평가해 조건 위반이 가장 적고, 그중 팀 합계 차이가 가장 작은 분할을 고릅니다.
+    # 동점이면 두 팀 최고 점수 차이가 작은 쪽을 고릅니다. (에이스 한쪽 쏠림 방지)
+    ratings = np.asarray(ratings, dtype=float)
+    masks = _split_masks()
+    sum_a = masks @ ratings
+    diff = np.abs(2 * sum_a - ratings.sum())
+    max_a = np.where(masks, ratings, -np.inf).max(axis=1)
+    max_b = np.where(~masks, ratings, -np.inf).max(axis=1)
+    violations = _pair_penalty(lambda i, j: masks[:, i] == masks[:, j], list(together), list(apart))
+    violations = np.broadcast_to(np.asarray(violations), diff.shape)
+    best = np.lexsort((np.abs(max_a - max_b), diff, violations))[0]
+    team_a = np.flatnonzero(masks[best]).tolist()
+    team_b = np.flatnonzero(~masks[best]).tolist()
+    return TeamSplit(team_a, team_b, float(sum_a[best]), float(ratings.sum() - sum_a[best]), int(violations[best]))
+
+def _assignment_cost(teams: np.ndarray, ratings: np.ndarray, team_count: int, together: list, apart: list) -> np.ndarray:
+    # teams: (경우 수, 인원) 팀 번호 배열. 로비(팀 2k, 2k+1)마다의 팀 합계 차이 + 조건 위반 벌점
+    onehot = teams[:, :, None] == np.arange(team_count)
+    sums = np.einsum('snt,n->st', onehot, ratings)
+    cost = np.abs(sums[:, 0::2] - sums[:, 1::2]).sum(axis=1)
+    violations = _pair_penalty(lambda i, j: teams[:, i] == teams[:, j], together, apart)
+    return cost + 1000.0 * violations
+
+def balance_pool(ratings, together=(), apart=(), max_rounds: int = 200) -> list:
+    # 10명 단위 여러 로비용 휴리스틱: 점수 순 스네이크 드래프트로 팀을 나눈 뒤,
+    # 서로 다른 팀 선수끼리의 모든 맞교환을 한 번에 평가해 가장 좋아지는 교환을 반복하고(로컬 서치),
+    # 마지막으로 로비마다 252가지 분할로 다시 다듬습니다.
+    ratings = np.asarray(ratings, dtype=float)
+    count = len(ratings)
+    if count % LOBBY_SIZE:
+        raise ValueError(f"인원은 {LOBBY_SIZE}의 배수여야 합니다.")
+    if count == LOBBY_SIZE:
+        return [balance_lobby(ratings, together, apart)]
+    team_count = count // TEAM_SIZE
+    together, apart = list(together), list(apart)
+
+    teams = np.empty(count, dtype=int)
+    for rank, player in enumerate(np.argsort(-ratings, kind='stable')):
+        draft_round, pick = divmod(rank, team_count)
+        teams[player] = pick if draft_round % 2 == 0 else team_count - 1 - pick
+
+    left, right = np.triu_indices(count, k=1)
+    cost = _assignment_cost(teams[None, :], ratings, team_count, together, apart)[0]
+    for _ in range(max_rounds):
+        movable = teams[left] != teams[right]
+        i, j = left[movable], right[movable]
+        candidates = np.repeat(teams[None, :], len(i), axis=0)
+        rows = np.arange(len(i))
+        candidates[rows, i], candidates[rows, j] = teams[j], teams[i]
+        costs = _assignment_cost(candidates, ratings, team_count, together, apart)
+        best = int(np.argmin(costs))
+        if costs[best] >= cost - 1e-9:
+            break
+        teams, cost = candidates[best], costs[best]
+
+    splits = []
+    for lobby in range(team_count // 2):
+        members = np.flatnonzero((teams == 2 * lobby) | (teams == 2 * lobby + 1))
+        local = {player: index for index, player in enumerate(members.tolist())}
+        split = balance_lobby(
+            ratings[members],
+            [(local[i], local[j]) for i, j in together if i in local and j in local],
+            [(local[i], local[j]) for i, j in apart if i in local and j in local],
+        )
+        # 다른 로비로 갈라진 같은 팀 조건도 위반으로 셉니다. (앞 사람이 속한 로비에서 한 번만)
+        split.violations += sum(i in local and j not in local for i, j in together)
+        split.team_a = [int(members[index]) for index in split.team_a]
+        split.team_b = [int(members[index]) for index in split.team_b]
+        splits.append(split)
+    return splits
@@ -0,0 +1,68 @@
+# core/throttle.py
+
+import asyncio
+import math
+import time
+from collections import OrderedDict
+
+class Throttled(Exception):
+    def __init__(self, scope: str, retry_after: float):
+        super().__init__(f"{scope}: {retry_after:.1f}초 뒤에 다시 시도할 수 있습니다.")
+        self.scope = scope
+        self.retry_after = retry_after
+
+    @property
+    def notice(self) -> str:
+        # 유저에게 보여 줄 안내 문구
+        return f"⏳ 요청이 너무 잦습니다. {math.ceil(self.retry_after)}초 뒤에 다시 시도해주세요."
+
+# 유저별 요청 제한 (토큰 버킷) + 같은 요청 합치기 (single-flight)
+# - 범위(scope, 예: 'join', 'points')마다 (초당 충전량, 최대 토큰) 을 두고, 요청마다 토큰 하나를 씁니다.
+# - 같은 유저의 같은 요청이 처리 중이면 새로 실행하지 않고 진행 중인 결과를 함께 받습니다. (토큰도 쓰지 않음)
+# - 거절/합친 요청 수는 metrics 카운터(throttle_rejected_total, throttle_deduped_total)로 집계합니다.
+class Throttle:
+    def __init__(self, limits: dict, default: tuple = (1.0, 5), metrics=None, max_buckets: int = 10000):
+        self.limits = limits      # scope -> (초당 충전 토큰 수, 최대 토큰 수)
+        self.default = default
+        self.metrics = metrics
+        self.max_buckets = max_buckets
+        self._buckets = OrderedDict()  # (scope, guild_id, user_id) -> [토큰, 마지막 갱신 시각]
+        self._inflight = {}            # (scope, guild_id, user_id, 인자) -> Task
+
+    def take(self, scope: str, guild_id: int, user_id: int):
+        # 토큰이 있으면 하나 쓰고, 없으면 Throttled 를 발생시킵니다.
+        rate, burst = self.limits.get(scope, self.default)
+        key = (scope, guild_id, user_id)
+        now = time.monotonic()
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = self._buckets[key] = [float(burst), now]
+            # 오래 쓰지 않은 버킷부터 정리합니다. (가득 찬 버킷과 같은 상태라 지워도 동작이 같습니다)
+            while len(self._buckets) > self.max_buckets:
+                self._buckets.popitem(last=False)
+        else:
+            self._buckets.move_to_end(key)
+            bucket[0] = min(burst, bucket[0] + (now - bucket[1]) * rate)
+            bucket[1] = now
+        if bucket[0] < 1:
+            self._count('throttle_rejected_total', scope)
+            raise Throttled(scope, (1 - bucket[0]) / rate if rate > 0 else float('inf'))
+        bucket[0] -= 1
+
+    async def run(self, scope: str, guild_id: int, user_id: int, factory, args: tuple = ()):
+        # factory() 는 코루틴을 만드는 함수입니다. 같은 요청(같은 인자)이 진행 중이면 그 결과를 그대로 돌려줍니다.
+        # 토큰은 인자와 관계없이 범위 단위로 씁니다. (인자를 바꿔 가며 제한을 피할 수 없도록)
+        key = (scope, guild_id, user_id, args)
+        task = self._inflight.get(key)
+        if task is not None:
+            self._count('throttle_deduped_total', scope)
+        else:
+            self.take(scope, guild_id, user_id)
+            task = self._inflight[key] = asyncio.ensure_future(factory())
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        # 먼저 요청한 상호작용이 취소되어도 함께 기다리는 요청은 결과를 받도록 합니다.
+        return await asyncio.shield(task)
+
+    def _count(self, name: str, scope: str):
+        if self.metrics is not None:
+            self.metrics.increment(f'{name}{{scope="{scope}"}}')
@@ -0,0 +1,3 @@
+-- sql/001_queue_player_unique.sql
+-- 대기열 저장 작업자가 재시도할 때 같은 유저가 중복 등록되지 않도록 합니다.
+create unique index if not exists queue_player_id_key on public.queue (player_id);
@@ -0,0 +1,40 @@
+-- sql/002_atomic_player_updates.sql
+-- 포인트/스트라이크를 읽고-쓰기 없이 DB 안에서 원자적으로 증감합니다.
+-- 로컬 대체 구현: core/memory_backend.py 의 PROCEDURES
+
+-- 내전 종료 정산: 참여자 전원에게 포인트를 지급하고 대기열에서 제외합니다. (한 트랜잭션, 한 번의 왕복)
+create or replace function public.settle_match(p_player_ids bigint[], p_points integer)
+returns setof public.players
+language plpgsql
+as $$
+begin
+    delete from public.queue where player_id = any(p_player_ids);
+    return query
+        update public.players
+        set points = coalesce(points, 0) + p_points
+        where id = any(p_player_ids)
+        returning *;
+end;
+$$;
+
+-- 포인트 증감 (0 미만으로 내려가지 않음). 등록되지 않은 유저면 빈 결과를 반환합니다.
+create or replace function public.increment_points(p_player_id bigint, p_delta integer)
+returns setof public.players
+language sql
+as $$
+    update public.players
+    set points = greatest(0, coalesce(points, 0) + p_delta)
+    where id = p_player_id
+    returning *;
+$$;
+
+-- 스트라이크 증감 (0 미만으로 내려가지 않음)
+create or replace function public.increment_strikes(p_player_id bigint, p_delta integer)
+returns setof public.players
+language sql
+as $$
+    update public.players
+    set strikes = greatest(0, coalesce(strikes, 0) + p_delta)
+    where id = p_player_id
+    returning *;
+$$;
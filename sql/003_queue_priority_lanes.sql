@@ -0,0 +1,15 @@
+-- sql/003_queue_priority_lanes.sql
+-- 대기열 순서를 created_at 대신 명시적인 (lane, seq) 키로 관리합니다.
+-- lane: 0 = 운영자/스트리머 우선, 1 = 일반 (core/queue_store.py 의 PRIORITY_LANE / NORMAL_LANE)
+-- seq : 레인 안의 선착순 키 (에포크 마이크로초 기반 단조 증가 값, 봇이 직접 지정하고 외부 입력은 기본값 사용)
+
+alter table public.queue add column if not exists lane smallint not null default 1;
+alter table public.queue add column if not exists seq bigint;
+
+-- 기존 행은 신청 시각 순서를 그대로 유지합니다.
+update public.queue set seq = (extract(epoch from created_at) * 1000000)::bigint where seq is null;
+
+alter table public.queue alter column seq set default (extract(epoch from clock_timestamp()) * 1000000)::bigint;
+alter table public.queue alter column seq set not null;
+
+create index if not exists queue_lane_seq_idx on public.queue (lane, seq);
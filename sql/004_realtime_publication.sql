@@ -0,0 +1,8 @@
+-- sql/004_realtime_publication.sql
+-- 봇이 players/queue 의 외부 변경(대시보드, 다른 봇 프로세스)을 실시간으로 받도록 합니다. (core/change_feed.py)
+
+alter publication supabase_realtime add table public.players, public.queue;
+
+-- UPDATE/DELETE 이벤트에 변경 전 행 전체가 담기도록 합니다.
+alter table public.players replica identity full;
+alter table public.queue replica identity full;
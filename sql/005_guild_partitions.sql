@@ -0,0 +1,84 @@
+-- sql/005_guild_partitions.sql
+-- 여러 서버(길드)를 한 봇으로 운영할 수 있도록 players/queue 를 서버별로 나눕니다. (core/guilds.py)
+-- 포인트/스트라이크는 서버마다 따로 쌓이고, 대기열도 서버마다 따로 관리됩니다.
+-- 로컬 대체 구현: core/memory_backend.py 의 PROCEDURES
+
+-- 기존 데이터는 지금까지 봇을 운영하던 서버의 것으로 채웁니다. 그 서버 ID를 psql 변수로 넘겨 실행합니다.
+--   psql "$DATABASE_URL" -v ON_ERROR_STOP=1 -v legacy_guild_id=123456789012345678 -f sql/005_guild_partitions.sql
+\if :{?legacy_guild_id}
+\else
+    \echo 'legacy_guild_id 변수가 필요합니다: -v legacy_guild_id=<기존 서버 ID>'
+    \quit
+\endif
+
+begin;
+
+alter table public.players add column if not exists guild_id bigint;
+alter table public.queue add column if not exists guild_id bigint;
+update public.players set guild_id = :legacy_guild_id where guild_id is null;
+update public.queue set guild_id = :legacy_guild_id where guild_id is null;
+alter table public.players alter column guild_id set not null;
+alter table public.queue alter column guild_id set not null;
+
+-- 같은 유저가 서버마다 한 행씩 가질 수 있도록 기본 키를 (guild_id, id) 로 바꿉니다.
+-- 기본 키를 참조하는 queue -> players 외래 키는 먼저 이름으로 지우고, 아래에서 (guild_id, player_id) 기준으로 다시 만듭니다.
+-- (cascade 로 지우면 다른 외래 키까지 조용히 사라지므로 쓰지 않습니다. 다른 참조가 남아 있으면 여기서 오류로 멈춥니다)
+alter table public.queue drop constraint if exists queue_player_id_fkey;
+alter table public.players drop constraint if exists players_pkey;
+alter table public.players add primary key (guild_id, id);
+create index if not exists players_guild_points_idx on public.players (guild_id, points desc);
+
+-- 대기열 중복 방지와 순서 인덱스도 서버 단위로 바꿉니다. (001, 003 대체)
+drop index if exists public.queue_player_id_key;
+drop index if exists public.queue_lane_seq_idx;
+create unique index if not exists queue_guild_player_id_key on public.queue (guild_id, player_id);
+create index if not exists queue_guild_lane_seq_idx on public.queue (guild_id, lane, seq);
+
+-- 대기열에는 그 서버에 등록된 유저만 있을 수 있습니다. 유저 정보가 삭제되면 대기열 항목도 함께 지웁니다.
+alter table public.queue drop constraint if exists queue_guild_player_fkey;
+alter table public.queue add constraint queue_guild_player_fkey
+    foreign key (guild_id, player_id) references public.players (guild_id, id) on delete cascade;
+
+commit;
+
+-- 002 의 함수들을 서버 인자를 받는 형태로 바꿉니다.
+drop function if exists public.settle_match(bigint[], integer);
+drop function if exists public.increment_points(bigint, integer);
+drop function if exists public.increment_strikes(bigint, integer);
+
+-- 내전 종료 정산: 참여자 전원에게 포인트를 지급하고 대기열에서 제외합니다. (한 트랜잭션, 한 번의 왕복)
+create or replace function public.settle_match(p_guild_id bigint, p_player_ids bigint[], p_points integer)
+returns setof public.players
+language plpgsql
+as $$
+begin
+    delete from public.queue where guild_id = p_guild_id and player_id = any(p_player_ids);
+    return query
+        update public.players
+        set points = coalesce(points, 0) + p_points
+        where guild_id = p_guild_id and id = any(p_player_ids)
+        returning *;
+end;
+$$;
+
+-- 포인트 증감 (0 미만으로 내려가지 않음). 등록되지 않은 유저면 빈 결과를 반환합니다.
+create or replace function public.increment_points(p_guild_id bigint, p_player_id bigint, p_delta integer)
+returns setof public.players
+language sql
+as $$
+    update public.players
+    set points = greatest(0, coalesce(points, 0) + p_delta)
+    where guild_id = p_guild_id and id = p_player_id
+    returning *;
+$$;
+
+-- 스트라이크 증감 (0 미만으로 내려가지 않음)
+create or replace function public.increment_strikes(p_guild_id bigint, p_player_id bigint, p_delta integer)
+returns setof public.players
+language sql
+as $$
+    update public.players
+    set strikes = greatest(0, coalesce(strikes, 0) + p_delta)
+    where guild_id = p_guild_id and id = p_player_id
+    returning *;
+$$;
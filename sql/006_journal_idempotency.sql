@@ -0,0 +1,39 @@
+-- sql/006_journal_idempotency.sql
+-- 봇은 대기열/정산 변경을 로컬 저널(core/journal.py)에 먼저 기록하고 DB에는 나중에 재생합니다.
+-- 응답을 받기 전에 연결이 끊겨 같은 정산이 다시 전송되어도 포인트가 두 번 지급되지 않도록 멱등 키를 기록합니다.
+-- 로컬 대체 구현: core/memory_backend.py 의 PROCEDURES
+
+create table if not exists public.applied_ops (
+    op_key text primary key,
+    guild_id bigint not null,
+    applied_at timestamptz not null default now()
+);
+create index if not exists applied_ops_applied_at_idx on public.applied_ops (applied_at);
+
+-- 오래된 키 정리 (저널은 재시작 후 바로 재생되므로 며칠이면 충분합니다)
+-- delete from public.applied_ops where applied_at < now() - interval '7 days';
+
+drop function if exists public.settle_match(bigint, bigint[], integer);
+
+-- 내전 종료 정산: 참여자 전원에게 포인트를 지급하고 대기열에서 제외합니다. (한 트랜잭션, 한 번의 왕복)
+-- p_op_key 가 이미 기록되어 있으면 아무것도 바꾸지 않고 현재 행을 반환합니다.
+create or replace function public.settle_match(p_guild_id bigint, p_player_ids bigint[], p_points integer, p_op_key text default null)
+returns setof public.players
+language plpgsql
+as $$
+begin
+    if p_op_key is not null then
+        insert into public.applied_ops (op_key, guild_id) values (p_op_key, p_guild_id) on conflict (op_key) do nothing;
+        if not found then
+            return query select * from public.players where guild_id = p_guild_id and id = any(p_player_ids);
+            return;
+        end if;
+    end if;
+    delete from public.queue where guild_id = p_guild_id and player_id = any(p_player_ids);
+    return query
+        update public.players
+        set points = coalesce(points, 0) + p_points
+        where guild_id = p_guild_id and id = any(p_player_ids)
+        returning *;
+end;
+$$;
@@ -0,0 +1,136 @@
+-- sql/007_match_ledger.sql
+-- 내전 정산과 포인트 조정을 원장(point_ledger)에 남기고, 시즌별 집계(player_season_stats)를 같은 트랜잭션에서 증분 갱신합니다.
+-- /전적 은 집계 행 하나만 읽으므로 기록이 아무리 쌓여도 조회 비용이 같습니다.
+-- 시즌은 봇이 p_season 으로 전달합니다. (SEASON 환경 변수, 없으면 한국 시간 기준 분기 'YYYY-Qn')
+-- 로컬 대체 구현: core/memory_backend.py 의 PROCEDURES
+
+create table if not exists public.matches (
+    id bigserial primary key,
+    guild_id bigint not null,
+    season text not null,
+    points integer not null,
+    player_count integer not null,
+    op_key text unique,
+    created_at timestamptz not null default now()
+);
+create index if not exists matches_guild_season_idx on public.matches (guild_id, season, id desc);
+
+create table if not exists public.point_ledger (
+    id bigserial primary key,
+    guild_id bigint not null,
+    season text not null,
+    player_id bigint not null,
+    match_id bigint references public.matches (id),
+    reason text not null,  -- 'match' | 'adjust'
+    delta integer not null,
+    created_at timestamptz not null default now()
+);
+create index if not exists point_ledger_player_idx on public.point_ledger (guild_id, player_id, id desc);
+
+create table if not exists public.player_season_stats (
+    guild_id bigint not null,
+    season text not null,
+    player_id bigint not null,
+    games integer not null default 0,
+    match_points integer not null default 0,
+    adjusted_points integer not null default 0,
+    current_streak integer not null default 0,  -- 연속 참여 일수 (한국 시간 기준)
+    best_streak integer not null default 0,
+    last_played_on date,
+    last_match_id bigint,
+    primary key (guild_id, season, player_id)
+);
+
+create or replace function public.season_of(p_season text)
+returns text
+language sql
+stable
+as $$
+    select coalesce(p_season, to_char(now() at time zone 'Asia/Seoul', 'YYYY-"Q"Q'));
+$$;
+
+drop function if exists public.settle_match(bigint, bigint[], integer, text);
+
+-- 내전 종료 정산: 포인트 지급, 대기열 제외, 원장 기록, 시즌 집계 갱신을 한 트랜잭션(한 번의 왕복)으로 처리합니다.
+-- p_op_key 가 이미 기록되어 있으면 아무것도 바꾸지 않고 현재 행을 반환합니다. (sql/006_journal_idempotency.sql)
+create or replace function public.settle_match(p_guild_id bigint, p_player_ids bigint[], p_points integer, p_op_key text default null, p_season text default null)
+returns setof public.players
+language plpgsql
+as $$
+declare
+    v_season text := public.season_of(p_season);
+    v_today date := (now() at time zone 'Asia/Seoul')::date;
+    v_match_id bigint;
+begin
+    if p_op_key is not null then
+        insert into public.applied_ops (op_key, guild_id) values (p_op_key, p_guild_id) on conflict (op_key) do nothing;
+        if not found then
+            return query select * from public.players where guild_id = p_guild_id and id = any(p_player_ids);
+            return;
+        end if;
+    end if;
+    delete from public.queue where guild_id = p_guild_id and player_id = any(p_player_ids);
+
+    insert into public.matches (guild_id, season, points, player_count, op_key)
+    select p_guild_id, v_season, p_points, count(*), p_op_key
+    from public.players where guild_id = p_guild_id and id = any(p_player_ids)
+    returning id into v_match_id;
+
+    insert into public.point_ledger (guild_id, season, player_id, match_id, reason, delta)
+    select p_guild_id, v_season, id, v_match_id, 'match', p_points
+    from public.players where guild_id = p_guild_id and id = any(p_player_ids);
+
+    insert into public.player_season_stats as s (guild_id, season, player_id, games, match_points, current_streak, best_streak, last_played_on, last_match_id)
+    select p_guild_id, v_season, id, 1, p_points, 1, 1, v_today, v_match_id
+    from public.players where guild_id = p_guild_id and id = any(p_player_ids)
+    on conflict (guild_id, season, player_id) do update set
+        games = s.games + 1,
+        match_points = s.match_points + excluded.match_points,
+        current_streak = case
+            when s.last_played_on = v_today then greatest(s.current_streak, 1)
+            when s.last_played_on = v_today - 1 then s.current_streak + 1
+            else 1 end,
+        best_streak = greatest(s.best_streak, case
+            when s.last_played_on = v_today then greatest(s.current_streak, 1)
+            when s.last_played_on = v_today - 1 then s.current_streak + 1
+            else 1 end),
+        last_played_on = v_today,
+        last_match_id = excluded.last_match_id;
+
+    return query
+        update public.players
+        set points = coalesce(points, 0) + p_points
+        where guild_id = p_guild_id and id = any(p_player_ids)
+        returning *;
+end;
+$$;
+
+-- 운영자 포인트 조정 (/포인트관리): 0 미만으로 내려가지 않으며, 실제로 바뀐 만큼만 원장과 시즌 집계에 남깁니다.
+-- 등록되지 않은 유저면 빈 결과를 반환합니다.
+create or replace function public.adjust_points(p_guild_id bigint, p_player_id bigint, p_delta integer, p_season text default null)
+returns setof public.players
+language plpgsql
+as $$
+declare
+    v_season text := public.season_of(p_season);
+    v_old integer;
+    v_row public.players;
+begin
+    select coalesce(points, 0) into v_old from public.players where guild_id = p_guild_id and id = p_player_id for update;
+    if not found then
+        return;
+    end if;
+    update public.players
+    set points = greatest(0, v_old + p_delta)
+    where guild_id = p_guild_id and id = p_player_id
+    returning * into v_row;
+    if v_row.points <> v_old then
+        insert into public.point_ledger (guild_id, season, player_id, reason, delta)
+        values (p_guild_id, v_season, p_player_id, 'adjust', v_row.points - v_old);
+        insert into public.player_season_stats as s (guild_id, season, player_id, adjusted_points)
+        values (p_guild_id, v_season, p_player_id, v_row.points - v_old)
+        on conflict (guild_id, season, player_id) do update set adjusted_points = s.adjusted_points + excluded.adjusted_points;
+    end if;
+    return next v_row;
+end;
+$$;
@@ -0,0 +1,53 @@
+-- sql/008_join_queue.sql
+-- 대기열 참여를 DB 함수 하나(한 번의 왕복)로 처리합니다: 등록 여부, 스트라이크, 타임아웃 확인 + 멱등 등록 + 대기 순서 계산
+-- 확인과 등록이 같은 트랜잭션이라 빠른 중복 클릭이나 다른 프로세스(대시보드 등)의 변경과 겹쳐도 두 번 등록되지 않습니다.
+-- 봇은 클릭에 메모리 상태로 바로 응답하고, 저널에 쌓인 연속 참여를 이 함수로 한꺼번에 반영합니다. (core/queue_store.py)
+-- 로컬 대체 구현: core/memory_backend.py 의 PROCEDURES
+--
+-- p_entries: [{"player_id": 1, "lane": 1, "seq": 1760000000000000}, ...] (lane/seq 를 비우면 기본값)
+-- 반환: 입력 순서대로 (player_id, status, queue_position)
+--   status: joined | already_in_queue | not_registered | too_many_strikes | timed_out
+--   queue_position: joined / already_in_queue 일 때 1부터 시작하는 대기 순서, 그 밖에는 null
+
+create or replace function public.join_queue(p_guild_id bigint, p_entries jsonb, p_max_strikes integer default 3)
+returns table (player_id bigint, status text, queue_position bigint)
+language plpgsql
+as $$
+#variable_conflict use_column
+declare
+    v_entry jsonb;
+    v_player public.players;
+    v_player_id bigint;
+begin
+    for v_entry in select value from jsonb_array_elements(p_entries) loop
+        v_player_id := (v_entry->>'player_id')::bigint;
+        player_id := v_player_id;
+        queue_position := null;
+        -- 같은 유저의 동시 요청은 플레이어 행 잠금으로 순서대로 처리됩니다.
+        select * into v_player from public.players p where p.guild_id = p_guild_id and p.id = v_player_id for update;
+        if not found then
+            status := 'not_registered';
+        elsif coalesce(v_player.strikes, 0) >= p_max_strikes then
+            status := 'too_many_strikes';
+        elsif v_player.penalty_ends_at is not null and v_player.penalty_ends_at > now() then
+            status := 'timed_out';
+        else
+            insert into public.queue (guild_id, player_id, lane, seq)
+            values (
+                p_guild_id,
+                v_player_id,
+                coalesce((v_entry->>'lane')::smallint, 1),
+                coalesce((v_entry->>'seq')::bigint, (extract(epoch from clock_timestamp()) * 1000000)::bigint)
+            )
+            on conflict (guild_id, player_id) do nothing;
+            status := case when found then 'joined' else 'already_in_queue' end;
+            -- queue_guild_lane_seq_idx 범위 조회
+            select count(*) + 1 into queue_position
+            from public.queue me
+            join public.queue q on q.guild_id = me.guild_id and (q.lane, q.seq) < (me.lane, me.seq)
+            where me.guild_id = p_guild_id and me.player_id = v_player_id;
+        end if;
+        return next;
+    end loop;
+end;
+$$;
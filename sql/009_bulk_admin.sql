@@ -0,0 +1,83 @@
+-- sql/009_bulk_admin.sql
+-- 여러 유저(멘션 목록, 역할, 서버 전체)에 대한 운영자 작업을 유저 수와 관계없이 집합 단위 쿼리 한 번(한 번의 왕복)으로 처리합니다.
+-- 대상은 요청 본문(JSON)의 배열로 전달하므로 인원이 많아도 URL 길이 제한에 걸리지 않습니다.
+-- p_player_ids 가 null 이면 이 서버에 등록된 모든 유저가 대상입니다.
+-- 반환 행은 PostgREST 최대 행 수(max_rows)로 잘리므로, 봇은 대상을 p_limit 명씩 id 순(p_after_id 다음부터)으로 나눠 호출합니다. (core/repositories.py)
+-- 각 호출은 그 구간 전체를 문장 하나로 처리합니다. (p_limit 이 null 이면 한 번에 전부)
+-- 로컬 대체 구현: core/memory_backend.py 의 PROCEDURES
+
+-- 일괄 페널티 (/멤버일괄제외): 스트라이크 증감(0 미만 불가)과 타임아웃 부여(null 이면 유지)
+create or replace function public.penalize_players(p_guild_id bigint, p_player_ids bigint[], p_strikes integer default 0, p_penalty_ends_at timestamptz default null, p_after_id bigint default null, p_limit integer default null)
+returns setof public.players
+language sql
+as $$
+    update public.players p
+    set strikes = greatest(0, coalesce(p.strikes, 0) + p_strikes),
+        penalty_ends_at = coalesce(p_penalty_ends_at, p.penalty_ends_at)
+    from (
+        select id from public.players
+        where guild_id = p_guild_id and (p_player_ids is null or id = any(p_player_ids)) and (p_after_id is null or id > p_after_id)
+        order by id
+        limit p_limit
+        for update
+    ) t
+    where p.guild_id = p_guild_id and p.id = t.id
+    returning p.*;
+$$;
+
+-- 일괄 스트라이크 초기화 (/스트라이크일괄초기화): 스트라이크가 남아 있는 유저만 바꿉니다.
+create or replace function public.reset_strikes(p_guild_id bigint, p_player_ids bigint[], p_after_id bigint default null, p_limit integer default null)
+returns setof public.players
+language sql
+as $$
+    update public.players p
+    set strikes = 0
+    from (
+        select id from public.players
+        where guild_id = p_guild_id and (p_player_ids is null or id = any(p_player_ids)) and (p_after_id is null or id > p_after_id)
+            and coalesce(strikes, 0) <> 0
+        order by id
+        limit p_limit
+        for update
+    ) t
+    where p.guild_id = p_guild_id and p.id = t.id
+    returning p.*;
+$$;
+
+-- 일괄 포인트 조정 (/포인트일괄관리): adjust_points(sql/007_match_ledger.sql)와 같은 규칙을 대상 전체에 한 번에 적용합니다.
+-- 0 미만으로 내려가지 않으며, 실제로 바뀐 만큼만 원장과 시즌 집계에 남깁니다.
+create or replace function public.adjust_points_many(p_guild_id bigint, p_player_ids bigint[], p_delta integer, p_season text default null, p_after_id bigint default null, p_limit integer default null)
+returns setof public.players
+language plpgsql
+as $$
+declare
+    v_season text := public.season_of(p_season);
+begin
+    return query
+    with targets as (
+        select id, coalesce(points, 0) as old_points
+        from public.players
+        where guild_id = p_guild_id and (p_player_ids is null or id = any(p_player_ids)) and (p_after_id is null or id > p_after_id)
+        order by id
+        limit p_limit
+        for update
+    ), changed as (
+        update public.players p
+        set points = greatest(0, t.old_points + p_delta)
+        from targets t
+        where p.guild_id = p_guild_id and p.id = t.id
+        returning p as player, p.points - t.old_points as delta
+    ), ledger as (
+        insert into public.point_ledger (guild_id, season, player_id, reason, delta)
+        select p_guild_id, v_season, (player).id, 'adjust', delta from changed where delta <> 0
+    ), stats as (
+        insert into public.player_season_stats as s (guild_id, season, player_id, adjusted_points)
+        select p_guild_id, v_season, (player).id, delta from changed where delta <> 0
+        on conflict (guild_id, season, player_id) do update set adjusted_points = s.adjusted_points + excluded.adjusted_points
+    )
+    -- 데이터 변경 CTE 의 결과는 같은 문장의 players 조회에 보이지 않으므로 RETURNING 의 새 행을 그대로 반환합니다.
+    select (player).* from changed;
+end;
+$$;
+
+-- 키셋 페이지 조회 (플레이어 내보내기)용: (guild_id, id) 기본 키 인덱스로 id > 커서 범위를 바로 읽습니다. 추가 인덱스 없음.
@@ -0,0 +1,7 @@
+# tests/conftest.py
+
+import os
+import sys
+
+# 저장소 루트에서 core/ 를 바로 불러올 수 있도록 합니다. (pytest 를 어느 위치에서 실행해도 동작)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,108 @@
+# tests/test_change_feed.py
+
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+from bench.fakes import FakeBot, FakeUser
+from core.change_feed import ChangeFeedSync, MemoryChangeFeed
+from core.memory_backend import MemorySupabase
+
+GUILD_ID = 1
+
+def test_closed_feed_resubscribes_and_resyncs():
+    async def scenario():
+        backend = MemorySupabase({'players': [{'guild_id': GUILD_ID, 'id': 1, 'points': 10}]})
+        bot = FakeBot(backend, {1: FakeUser(1)})
+        feed = MemoryChangeFeed(backend)
+        sync = ChangeFeedSync(feed, bot.guild_states, reconnect_delay=0)
+        try:
+            state = await bot.guild_states.get(GUILD_ID)
+            await sync.start()
+            feed.disconnect()
+            assert not feed.connected
+            # 끊긴 동안의 변경은 재연결 후 스냅샷으로 다시 맞춥니다.
+            backend.find('players', ('guild_id', 'id'), (GUILD_ID, 1))['points'] = 50
+            for _ in range(100):
+                if sync.resyncs:
+                    break
+                await asyncio.sleep(0.01)
+            assert feed.connected
+            assert state.ranking.points(1) == 50
+        finally:
+            await sync.stop()
+            bot.close()
+    asyncio.run(scenario())
+
+def test_stop_does_not_reconnect():
+    async def scenario():
+        backend = MemorySupabase()
+        bot = FakeBot(backend, {})
+        feed = MemoryChangeFeed(backend)
+        sync = ChangeFeedSync(feed, bot.guild_states, reconnect_delay=0)
+        try:
+            await sync.start()
+            await sync.stop()
+            feed.disconnect()
+            await asyncio.sleep(0.05)
+            assert not feed.connected
+        finally:
+            bot.close()
+    asyncio.run(scenario())
+
+def _event(table: str, kind: str, record: dict):
+    return {'table': table, 'type': kind, 'record': None if kind == 'DELETE' else record, 'old_record': record if kind == 'DELETE' else None}
+
+def test_echoes_are_matched_by_value_not_time():
+    async def scenario():
+        backend = MemorySupabase({'players': [{'guild_id': GUILD_ID, 'id': 1, 'points': 10}, {'guild_id': GUILD_ID, 'id': 2, 'points': 0}]})
+        bot = FakeBot(backend, {1: FakeUser(1), 2: FakeUser(2)})
+        sync = ChangeFeedSync(MemoryChangeFeed(backend), bot.guild_states)
+        try:
+            state = await bot.guild_states.get(GUILD_ID)
+            first = (await state.player_repo.adjust_points(1, 5))
+            second = (await state.player_repo.adjust_points(1, 5))
+            # 먼저 쓴 값의 에코는 지난 값이므로 무시하고, 마지막 값의 에코는 그대로입니다.
+            sync._apply(_event('players', 'UPDATE', first))
+            assert state.ranking.points(1) == 20
+            sync._apply(_event('players', 'UPDATE', second))
+            assert state.ranking.points(1) == 20
+            # 로컬에서 방금 쓴 유저라도 다른 곳(대시보드)에서 바꾼 값은 바로 반영합니다.
+            sync._apply(_event('players', 'UPDATE', {**second, 'points': 99}))
+            assert state.ranking.points(1) == 99
+
+            # 저널 재생처럼 늦게 도착한 등록 에코가 그 뒤의 제외를 되돌리지 않습니다.
+            state.queue_store.add(2)
+            lane, seq, _ = state.queue_store._entries[2]
+            state.queue_store.remove(2)
+            sync._apply(_event('queue', 'INSERT', {'guild_id': GUILD_ID, 'player_id': 2, 'lane': lane, 'seq': seq}))
+            assert 2 not in state.queue_store
+            sync._apply(_event('queue', 'DELETE', {'guild_id': GUILD_ID, 'player_id': 2, 'lane': lane, 'seq': seq}))
+            assert 2 not in state.queue_store
+            # 외부에서 등록한 유저는 반영합니다.
+            sync._apply(_event('queue', 'INSERT', {'guild_id': GUILD_ID, 'player_id': 2, 'lane': 1, 'seq': seq + 1}))
+            assert state.queue_store.position(2) == 1
+        finally:
+            bot.close()
+    asyncio.run(scenario())
+
+def test_lag_is_measured_independently_of_clock_skew():
+    backend = MemorySupabase()
+    bot = FakeBot(backend, {})
+    sync = ChangeFeedSync(MemoryChangeFeed(backend), bot.guild_states, max_lag=30)
+    resyncs = []
+    sync.schedule_resync = lambda: resyncs.append(1)
+
+    def at(seconds_ago: float) -> dict:
+        committed = datetime.now(timezone.utc) - timedelta(seconds=seconds_ago)
+        return {'commit_timestamp': committed.isoformat(), 'table': 'players', 'type': 'UPDATE', 'record': {'guild_id': GUILD_ID, 'id': 1}, 'old_record': None}
+
+    try:
+        # DB 시계가 로컬보다 1시간 느려도 제때 도착한 이벤트는 지연으로 보지 않습니다.
+        for _ in range(3):
+            sync._on_event(at(3600))
+        assert resyncs == [] and sync.applied == 3
+        # 기준보다 60초 늦게 도착한 이벤트는 지연입니다.
+        sync._on_event(at(3660))
+        assert resyncs == [1]
+    finally:
+        bot.close()
@@ -0,0 +1,41 @@
+# tests/test_database.py
+
+import asyncio
+import threading
+import time
+
+import pytest
+
+from core.database import Database
+
+class SlowQuery:
+    path = '/slow'
+
+    def __init__(self, tracker, seconds: float):
+        self.tracker = tracker
+        self.seconds = seconds
+
+    def execute(self):
+        with self.tracker['lock']:
+            self.tracker['running'] += 1
+            self.tracker['peak'] = max(self.tracker['peak'], self.tracker['running'])
+        time.sleep(self.seconds)
+        with self.tracker['lock']:
+            self.tracker['running'] -= 1
+        return 'ok'
+
+def test_timed_out_request_keeps_its_slot_until_the_thread_finishes():
+    async def scenario():
+        tracker = {'lock': threading.Lock(), 'running': 0, 'peak': 0}
+        db = Database(None, max_concurrency=1, timeout=0.05)
+        try:
+            with pytest.raises(asyncio.TimeoutError):
+                await db.execute(SlowQuery(tracker, 0.3))
+            # 앞 요청의 스레드가 아직 실행 중이므로 자리가 비지 않습니다. 다음 요청은 그것이 끝난 뒤에 보내지고,
+            # 스레드 풀 대기열에서 타임아웃 시간을 써 버리지 않습니다.
+            assert db._semaphore.locked()
+            assert await db.execute(SlowQuery(tracker, 0.01), timeout=0.1) == 'ok'
+            assert tracker['peak'] == 1
+        finally:
+            db.close()
+    asyncio.run(scenario())
@@ -0,0 +1,53 @@
+# tests/test_dm.py
+
+import asyncio
+
+import discord
+
+from bench.fakes import FakeBot, FakeUser, _FakeHTTPResponse
+from core.dm import DMDispatcher
+from core.memory_backend import MemorySupabase
+
+class FlakyUser(FakeUser):
+    # errors 를 차례로 발생시킨 뒤 DM을 받습니다.
+    def __init__(self, user_id: int, errors: list):
+        super().__init__(user_id)
+        self.errors = errors
+        self.attempts = 0
+
+    async def send(self, content=None, **kwargs):
+        self.attempts += 1
+        if self.errors:
+            raise self.errors.pop(0)
+        await super().send(content, **kwargs)
+
+def _error(cls, status: int):
+    return cls(_FakeHTTPResponse(status), f"HTTP {status}")
+
+def test_transient_errors_are_retried_and_blocked_dms_are_not():
+    async def scenario():
+        members = {
+            1: FlakyUser(1, [_error(discord.HTTPException, 503), _error(discord.HTTPException, 429)]),
+            2: FlakyUser(2, [_error(discord.Forbidden, 403)]),
+            3: FlakyUser(3, [_error(discord.HTTPException, 400)]),
+            4: FlakyUser(4, [_error(discord.HTTPException, 500)] * 3),
+            5: FlakyUser(5, []),
+        }
+        bot = FakeBot(MemorySupabase(), members)
+        dispatcher = DMDispatcher(bot, max_retries=3, backoff=0.001)
+        progress = []
+
+        async def on_progress(done, total):
+            progress.append((done, total))
+        try:
+            sent, failed = await dispatcher.send_many([1, 2, 3, 4, 5, 6], progress=on_progress, content="내전 시작")
+            assert [user.id for user in sent] == [1, 5]
+            assert [(user_id, reason) for user_id, _, reason in failed] == [(2, "DM 차단"), (3, "HTTP 400"), (4, "HTTP 500"), (6, "유저를 찾을 수 없음")]
+            assert members[1].attempts == 3 and members[1].dms == ["내전 시작"]
+            assert members[2].attempts == 1  # 403 은 재시도하지 않습니다.
+            assert members[3].attempts == 1
+            assert members[4].attempts == 3  # max_retries 번 시도 후 포기
+            assert progress[-1] == (6, 6) and len(progress) == 6
+        finally:
+            bot.close()
+    asyncio.run(scenario())
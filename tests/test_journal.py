@@ -0,0 +1,118 @@
+# tests/test_journal.py
+
+import asyncio
+
+from postgrest.exceptions import APIError
+
+from bench.fakes import FakeBot, FakeUser
+from core.journal import Journal, JournalWriter
+from core.memory_backend import MemorySupabase
+from core.metrics import Metrics
+
+GUILD_ID = 1
+
+def _players(player_ids):
+    return [{'guild_id': GUILD_ID, 'id': player_id, 'points': 0} for player_id in player_ids]
+
+def test_pending_entries_are_replayed_after_restart(tmp_path):
+    path = str(tmp_path / 'journal.sqlite3')
+
+    async def crashed_run():
+        # DB에 반영하기 전에 종료된 실행: 저널에만 기록됩니다.
+        journal = Journal(path)
+        try:
+            writer = JournalWriter(journal, GUILD_ID)
+            writer.enqueue('add', [{'player_id': player_id, 'lane': 1, 'seq': player_id} for player_id in (1, 2, 3)])
+            writer.enqueue('remove', [2])
+            await writer.durable()
+        finally:
+            journal.close()
+
+    async def restarted_run():
+        backend = MemorySupabase({'players': _players(range(1, 4))})
+        bot = FakeBot(backend, {player_id: FakeUser(player_id) for player_id in range(1, 4)})
+        bot.journal.close()
+        bot.journal = Journal(path)
+        try:
+            state = await bot.guild_states.get(GUILD_ID)
+            # DB 스냅샷에는 없지만 저널을 다시 적용해 바로 대기열에 보입니다.
+            assert state.queue_store.head() == [1, 3]
+            await state.writer.flush()
+            assert sorted(row['player_id'] for row in backend.tables['queue']) == [1, 3]
+            assert await bot.journal.pending(GUILD_ID) == []
+        finally:
+            bot.close()
+
+    asyncio.run(crashed_run())
+    asyncio.run(restarted_run())
+
+def test_consecutive_joins_are_coalesced_into_one_request():
+    async def scenario():
+        player_ids = list(range(1, 51))
+        backend = MemorySupabase({'players': _players(player_ids)})
+        bot = FakeBot(backend, {player_id: FakeUser(player_id) for player_id in player_ids})
+        try:
+            state = await bot.guild_states.get(GUILD_ID)
+            before = backend.round_trips_by_target.get('rpc:join_queue', 0)
+            for player_id in player_ids:
+                state.queue_store.add(player_id)
+            await state.writer.flush()
+            assert backend.round_trips_by_target.get('rpc:join_queue', 0) - before == 1
+            assert len(backend.tables['queue']) == len(player_ids)
+            assert len(state.writer) == 0
+        finally:
+            bot.close()
+    asyncio.run(scenario())
+
+def _writer(metrics, handlers):
+    journal = Journal(':memory:')
+    writer = JournalWriter(journal, GUILD_ID, max_retries=3, metrics=metrics)
+    writer.max_delay = 0
+    for kind, (handler, park) in handlers.items():
+        writer.register(kind, handler, park=park)
+    writer.start()
+    return journal, writer
+
+def _failing(errors: list, applied: list):
+    # errors 를 차례로 발생시킨 뒤 성공하는 핸들러
+    async def handler(values, key):
+        if errors:
+            raise errors.pop(0)
+        applied.append(values)
+    return handler
+
+def test_unavailable_responses_are_retried_until_applied():
+    async def scenario():
+        metrics, applied = Metrics(), []
+        errors = [APIError({'code': 'PGRST001', 'message': 'db down'}), APIError({'code': 503, 'message': 'bad gateway'}), APIError({'code': '429'})] * 3
+        journal, writer = _writer(metrics, {'add': (_failing(errors, applied), True)})
+        try:
+            writer.enqueue('add', [1])
+            await writer.flush()
+            assert applied == [[1]]
+            assert await journal.pending(GUILD_ID) == []
+            assert not any(name.startswith('journal_') for name in metrics.counters)
+        finally:
+            journal.close()
+    asyncio.run(scenario())
+
+def test_settle_is_never_parked_and_parked_entries_are_counted():
+    async def scenario():
+        metrics, settled, added = Metrics(), [], []
+        journal, writer = _writer(metrics, {
+            'settle': (_failing([ValueError('constraint')] * 5, settled), False),
+            'add': (_failing([ValueError('constraint')] * 3, added), True),
+        })
+        try:
+            writer.enqueue('settle', [1, 2])
+            writer.enqueue('add', [3])
+            await writer.flush()
+            # 정산은 재시도 끝에 반영되고, 일반 항목은 max_retries 뒤 failed_ops 로 옮겨집니다.
+            assert settled == [[1, 2]]
+            assert added == []
+            assert metrics.counters['journal_stuck_total{kind="settle"}'] == 1
+            assert metrics.counters['journal_parked_total{kind="add"}'] == 1
+            assert journal._conn.execute("select kind from failed_ops").fetchall() == [('add',)]
+        finally:
+            journal.close()
+    asyncio.run(scenario())
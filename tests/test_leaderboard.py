@@ -0,0 +1,58 @@
+# tests/test_leaderboard.py
+
+import random
+
+from core.leaderboard import Leaderboard
+from core.ranking import RankingIndex
+
+class StubRepo:
+    def __init__(self):
+        self.listeners = []
+
+def make_leaderboard(points: dict, page_size: int = 2):
+    ranking = RankingIndex(StubRepo())
+    ranking._build([{'id': player_id, 'points': value} for player_id, value in points.items()])
+    return ranking, Leaderboard(ranking, page_size=page_size)
+
+def snapshot(leaderboard, page):
+    return page.keys, page.start, page.has_prev, page.has_next, page.embed.fields[0].value
+
+def test_stale_next_cursor_falls_back_to_last_page():
+    ranking, leaderboard = make_leaderboard({1: 50, 2: 40, 3: 30})
+    first = leaderboard.page()
+    assert first.has_next
+    # 3번 유저가 1위로 올라가면 예전 '다음' 커서(2번 유저) 뒤에는 아무도 없습니다.
+    ranking.set(3, 60)
+    page = leaderboard.page('after', first.last)
+    assert page.keys == [(-50, 1), (-40, 2)]
+    assert not page.has_next
+
+def test_removing_last_player_disables_next_on_cached_page():
+    ranking, leaderboard = make_leaderboard({1: 50, 2: 40, 3: 30})
+    assert leaderboard.page().has_next
+    ranking.remove(3)
+    page = leaderboard.page()
+    assert not page.has_next
+    assert leaderboard.embed(page).footer.text.startswith("페이지 1 / 1")
+
+def test_cached_pages_match_fresh_render():
+    rng = random.Random(7)
+    ranking, leaderboard = make_leaderboard({player_id: rng.randrange(20) for player_id in range(1, 30)}, page_size=3)
+    cursors = [('after', None)]
+    for _ in range(3000):
+        op = rng.random()
+        player_id = rng.randrange(1, 40)
+        if op < 0.6:
+            ranking.set(player_id, rng.randrange(20))
+        elif op < 0.7:
+            ranking.remove(player_id)
+        direction, cursor = rng.choice(cursors)
+        page = leaderboard.page(direction, cursor)
+        reference = Leaderboard(ranking, page_size=3)
+        ranking.listeners.remove(reference._on_change)
+        fresh = reference.page(direction, cursor)
+        assert snapshot(leaderboard, page) == snapshot(leaderboard, fresh)
+        if page.keys:
+            cursors.append(('after', page.last))
+            cursors.append(('before', page.first))
+        cursors = cursors[-50:]
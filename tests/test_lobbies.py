@@ -0,0 +1,34 @@
+# tests/test_lobbies.py
+
+import asyncio
+
+from bench.fakes import FakeBot, FakeUser
+from core.memory_backend import MemorySupabase
+
+GUILD_ID = 1
+
+def test_kicked_player_leaves_lobby_and_is_not_paid():
+    async def scenario():
+        player_ids = list(range(1, 11))
+        backend = MemorySupabase({'players': [{'guild_id': GUILD_ID, 'id': player_id, 'points': 0} for player_id in player_ids]})
+        bot = FakeBot(backend, {player_id: FakeUser(player_id) for player_id in player_ids})
+        try:
+            state = await bot.guild_states.get(GUILD_ID)
+            for player_id in player_ids:
+                state.queue_store.add(player_id)
+            [lobby] = state.lobbies.create(1, 10)
+
+            removed, dropped = state.kick([3])
+            assert removed == [3]
+            assert dropped == {lobby.id: [3]}
+            assert state.lobbies.lobby_of(3) is None
+            assert 3 not in lobby.player_ids
+
+            await state.settle_lobby(lobby.id, 10)
+            await state.writer.flush()
+            assert state.ranking.points(3) == 0
+            assert state.ranking.points(4) == 10
+            assert backend.find('players', ('guild_id', 'id'), (GUILD_ID, 3))['points'] == 0
+        finally:
+            bot.close()
+    asyncio.run(scenario())
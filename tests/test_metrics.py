@@ -0,0 +1,25 @@
+# tests/test_metrics.py
+
+from core import metrics as metrics_module
+from core.metrics import Metrics
+
+def test_stale_interaction_starts_are_evicted_by_age(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(metrics_module.time, 'perf_counter', lambda: now[0])
+    metrics = Metrics()
+
+    metrics.interaction_started(1)
+    now[0] += metrics_module.INTERACTION_MAX_AGE / 2
+    for interaction_id in range(2, 2002):
+        metrics.interaction_started(interaction_id)
+    # 개수와 관계없이 진행 중인 기록은 남습니다.
+    assert len(metrics._interaction_starts) == 2001
+
+    now[0] += metrics_module.INTERACTION_MAX_AGE / 2 + 1
+    metrics.interaction_started(3000)
+    assert 1 not in metrics._interaction_starts
+    assert 2 in metrics._interaction_starts
+
+    metrics.interaction_finished(2, 'command_error:포인트')
+    assert metrics.latency['command_error:포인트'].count == 1
+    assert metrics.latency['command_error:포인트'].max == metrics_module.INTERACTION_MAX_AGE / 2 + 1
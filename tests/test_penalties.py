@@ -0,0 +1,68 @@
+# tests/test_penalties.py
+
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+from bench.fakes import FakeBot, FakeUser
+from core.memory_backend import MemorySupabase
+
+GUILD_ID = 1
+
+def _in(seconds: float) -> str:
+    return (datetime.now(timezone.utc) + timedelta(seconds=seconds)).isoformat()
+
+def test_expired_timeouts_fire_once_at_their_latest_end():
+    async def scenario():
+        player_ids = [1, 2, 3]
+        backend = MemorySupabase({'players': [{'guild_id': GUILD_ID, 'id': player_id, 'points': 0} for player_id in player_ids]})
+        bot = FakeBot(backend, {player_id: FakeUser(player_id) for player_id in player_ids})
+        try:
+            penalties = (await bot.guild_states.get(GUILD_ID)).penalties
+            expired = []
+
+            async def on_expired(player_id):
+                expired.append(player_id)
+            penalties.listeners.append(on_expired)
+
+            penalties.update(1, 0, _in(0.05))
+            penalties.update(2, 0, _in(0.05))
+            penalties.update(2, 0, _in(0.2))   # 연장: 처음 종료 시각에는 알리지 않습니다.
+            penalties.update(3, 0, _in(0.05))
+            penalties.update(3, 0, None)        # 해제: 알리지 않습니다.
+            assert penalties.timeout_ends_at(1) is not None
+            assert penalties.timeout_ends_at(3) is None
+
+            await asyncio.sleep(0.12)
+            assert expired == [1]
+            assert penalties.timeout_ends_at(1) is None
+            assert penalties.timeout_ends_at(2) is not None
+
+            await asyncio.sleep(0.15)
+            assert expired == [1, 2]
+            assert len(penalties) == 0
+        finally:
+            bot.close()
+    asyncio.run(scenario())
+
+def test_restart_reloads_active_penalties_only():
+    async def scenario():
+        past = (datetime.now(timezone.utc) - timedelta(minutes=5)).isoformat()
+        backend = MemorySupabase({'players': [
+            {'guild_id': GUILD_ID, 'id': 1, 'points': 0, 'strikes': 3},
+            {'guild_id': GUILD_ID, 'id': 2, 'points': 0, 'strikes': 0, 'penalty_ends_at': _in(3600)},
+            {'guild_id': GUILD_ID, 'id': 3, 'points': 0, 'strikes': 2, 'penalty_ends_at': past},
+        ]})
+        bot = FakeBot(backend, {})
+        try:
+            penalties = (await bot.guild_states.get(GUILD_ID)).penalties
+            assert penalties.is_struck_out(1)
+            assert penalties.timeout_ends_at(2) is not None
+            assert not penalties.is_struck_out(3) and penalties.timeout_ends_at(3) is None
+            assert len(penalties) == 2
+
+            # DB 쓰기(스트라이크 초기화)도 리스너로 바로 반영됩니다.
+            await penalties.repo.update(1, {'strikes': 0})
+            assert not penalties.is_struck_out(1)
+        finally:
+            bot.close()
+    asyncio.run(scenario())
@@ -0,0 +1,94 @@
+# tests/test_player_io.py
+
+import asyncio
+import io
+import json
+
+from core.database import Database
+from core.memory_backend import MemorySupabase
+from core.player_io import export_players, import_players
+from core.repositories import PlayerRepository
+
+GUILD_ID = 1
+
+def _players(count):
+    return [{'guild_id': GUILD_ID, 'id': player_id, 'valorant_nickname': f'닉네임{player_id}', 'chzzk_nickname': f'치지직{player_id}',
+             'highest_tier': '골드 2', 'current_tier': '실버 1', 'points': player_id % 97, 'strikes': player_id % 3, 'penalty_ends_at': None}
+            for player_id in range(1, count + 1)]
+
+def _repo(backend):
+    db = Database(backend)
+    return db, PlayerRepository(db, GUILD_ID)
+
+def test_export_import_round_trip_beyond_row_cap():
+    async def scenario():
+        source = MemorySupabase({'players': _players(1200)}, max_rows=500)
+        target = MemorySupabase({}, max_rows=500)
+        source_db, source_repo = _repo(source)
+        target_db, target_repo = _repo(target)
+        try:
+            for fmt in ('csv', 'jsonl'):
+                fp = io.BytesIO()
+                assert await export_players(source_repo, fp, fmt, page_size=500) == 1200
+                fp.seek(0)
+                assert await import_players(target_repo, fp, fmt, batch_size=300) == (1200, 0)
+                copied = {row['id']: row for row in target.tables['players']}
+                assert len(copied) == 1200
+                assert copied[1111]['valorant_nickname'] == '닉네임1111'
+                assert copied[1111]['points'] == 1111 % 97
+                assert copied[1111]['strikes'] == 1111 % 3
+        finally:
+            source_db.close()
+            target_db.close()
+    asyncio.run(scenario())
+
+def test_import_skips_bad_lines_and_keeps_missing_columns():
+    async def scenario():
+        backend = MemorySupabase({'players': _players(3)})
+        db, repo = _repo(backend)
+        lines = [
+            {'id': 1, 'points': 50},
+            'not json',
+            {'id': 2, 'points': -5},         # 음수는 거절
+            {'points': 10},                  # id 없음
+            {'id': 3, 'points': 7},
+            {'id': 3, 'points': 8},          # 같은 묶음의 중복 id 는 마지막 행만 반영
+            {'id': 4, 'valorant_nickname': '새 유저'},  # 새 유저인데 필수 컬럼이 없음
+        ]
+        text = '\n'.join(line if isinstance(line, str) else json.dumps(line, ensure_ascii=False) for line in lines)
+        try:
+            imported, skipped = await import_players(repo, io.BytesIO(text.encode('utf-8')), 'jsonl')
+            assert (imported, skipped) == (2, 4)
+            rows = {row['id']: row for row in backend.tables['players']}
+            assert rows[1]['points'] == 50
+            assert rows[1]['valorant_nickname'] == '닉네임1'  # 파일에 없는 컬럼은 기존 값 유지
+            assert rows[2]['points'] == 2
+            assert rows[3]['points'] == 8
+            assert 4 not in rows
+        finally:
+            db.close()
+    asyncio.run(scenario())
+
+def test_incomplete_new_player_does_not_fail_its_batch():
+    async def scenario():
+        backend = MemorySupabase({'players': _players(2)})
+        db, repo = _repo(backend)
+        lines = [
+            {'id': 1, 'points': 30},
+            {'id': 5, 'points': 3},  # 기존 유저가 아니므로 INSERT 되며 NOT NULL 컬럼이 비어 있음
+            {'id': 6, 'valorant_nickname': '새 유저', 'chzzk_nickname': '새 치지직', 'highest_tier': '다이아 1', 'current_tier': '플래티넘 3'},
+            {'id': 2, 'strikes': 2},
+        ]
+        text = '\n'.join(json.dumps(line, ensure_ascii=False) for line in lines)
+        try:
+            imported, skipped = await import_players(repo, io.BytesIO(text.encode('utf-8')), 'jsonl')
+            assert (imported, skipped) == (3, 1)
+            rows = {row['id']: row for row in backend.tables['players']}
+            assert sorted(rows) == [1, 2, 6]
+            assert rows[1]['points'] == 30
+            assert rows[2]['strikes'] == 2
+            # 새 유저의 기본값 컬럼은 DB 기본값으로 채워집니다.
+            assert rows[6]['points'] == 0 and rows[6]['strikes'] == 0
+        finally:
+            db.close()
+    asyncio.run(scenario())
@@ -0,0 +1,43 @@
+# tests/test_queue_board.py
+
+import asyncio
+
+import discord
+
+from bench.fakes import FakeBot, FakeUser
+from core.memory_backend import MemorySupabase
+
+GUILD_ID = 1
+
+def test_join_burst_is_coalesced_into_one_edit():
+    async def scenario():
+        player_ids = list(range(1, 31))
+        backend = MemorySupabase({'players': [{'guild_id': GUILD_ID, 'id': player_id, 'points': 0} for player_id in player_ids]})
+        bot = FakeBot(backend, {player_id: FakeUser(player_id) for player_id in player_ids})
+        try:
+            state = await bot.guild_states.get(GUILD_ID)
+            board = state.queue_board
+            board.interval = 0.1
+            # /내전모집 처럼 방금 보낸 메시지를 등록합니다. (바로 수정하지 않음)
+            message = await bot.channel.send(embed=discord.Embed(title="내전 모집"))
+            board.register(message, refresh=False)
+
+            for player_id in player_ids:
+                state.queue_store.add(player_id)
+            await asyncio.sleep(0.02)
+            assert message.edits == 0  # 수정 간격이 지나기 전에는 수정하지 않습니다.
+
+            await asyncio.sleep(0.15)
+            assert message.edits == 1
+            assert board.edits == 1
+            fields = {field.name: field.value for field in message.embeds[0].fields}
+            assert fields["👥 현재 대기 인원"] == "**30명**"
+            assert fields["📋 대기 순서 TOP 10"].splitlines() == [f"`{idx + 1:2d}` <@{player_id}>" for idx, player_id in enumerate(player_ids[:10])]
+            assert message.embeds[0].title == "내전 모집"
+
+            # 변경이 없으면 더 수정하지 않습니다.
+            await asyncio.sleep(0.15)
+            assert message.edits == 1
+        finally:
+            bot.close()
+    asyncio.run(scenario())
@@ -0,0 +1,40 @@
+# tests/test_queue_store.py
+
+import asyncio
+
+from bench.fakes import FakeBot, FakeUser
+from cogs.events import Events
+from core.memory_backend import MemorySupabase
+
+GUILD_ID = 1
+
+def test_refused_join_is_dropped_and_player_notified():
+    async def scenario():
+        player_ids = list(range(1, 11))
+        backend = MemorySupabase({'players': [{'guild_id': GUILD_ID, 'id': player_id, 'points': 0} for player_id in player_ids]})
+        members = {player_id: FakeUser(player_id) for player_id in player_ids}
+        bot = FakeBot(backend, members)
+        events = Events(bot)
+        events.ranking_check.cancel()  # 주기 점검은 이 테스트와 무관합니다.
+        try:
+            state = await bot.guild_states.get(GUILD_ID)
+            # 메모리 상태가 뒤처진 사이 대시보드에서 스트라이크가 부여된 경우
+            backend.find('players', ('guild_id', 'id'), (GUILD_ID, 3))['strikes'] = 3
+            for player_id in player_ids:
+                state.queue_store.add(player_id)
+            [lobby] = state.lobbies.create(1, 10)
+
+            await state.writer.flush()
+            for _ in range(5):
+                await asyncio.sleep(0)
+
+            assert 3 not in state.queue_store
+            assert 3 not in lobby.player_ids
+            assert state.lobbies.lobby_of(3) is None
+            assert len(members[3].dms) == 1 and '스트라이크' in members[3].dms[0]
+            assert all(not members[player_id].dms for player_id in player_ids if player_id != 3)
+            assert bot.metrics.counters['join_refused_total'] == 1
+        finally:
+            events.cog_unload()
+            bot.close()
+    asyncio.run(scenario())
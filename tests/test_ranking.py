@@ -0,0 +1,55 @@
+# tests/test_ranking.py
+
+import asyncio
+
+from bench.fakes import FakeBot, FakeUser
+from core.memory_backend import MemorySupabase
+
+GUILD_ID = 1
+
+def make_bot(player_count: int = 5):
+    player_ids = list(range(1, player_count + 1))
+    backend = MemorySupabase({'players': [{'guild_id': GUILD_ID, 'id': player_id, 'points': player_id * 10} for player_id in player_ids]})
+    return backend, FakeBot(backend, {player_id: FakeUser(player_id) for player_id in player_ids})
+
+def test_check_is_deferred_while_settlement_is_unreplayed():
+    async def scenario():
+        backend, bot = make_bot()
+        try:
+            state = await bot.guild_states.get(GUILD_ID)
+            backend.latency = 0.2  # DB 반영이 끝나기 전에 확인하도록 느린 DB를 흉내 냅니다.
+            await state.settle_match([1, 2], 5)
+            # 저널 반영 전에는 DB가 메모리보다 뒤처져 있으므로 확인을 미루고, 정산 결과를 되돌리지 않습니다.
+            assert len(state.writer)
+            assert await state.check_ranking() is None
+            assert state.ranking.points(1) == 15
+            await state.writer.flush()
+            assert await state.check_ranking() == []
+            assert state.ranking.points(1) == 15
+        finally:
+            bot.close()
+    asyncio.run(scenario())
+
+def test_repair_fixes_only_diverged_players_and_keeps_concurrent_writes():
+    async def scenario():
+        backend, bot = make_bot()
+        try:
+            state = await bot.guild_states.get(GUILD_ID)
+            # 봇을 거치지 않은 DB 변경 (대시보드 등)
+            backend.find('players', ('guild_id', 'id'), (GUILD_ID, 3))['points'] = 99
+            list_by_points = state.player_repo.list_by_points
+
+            async def slow_snapshot():
+                rows = await list_by_points()
+                # DB를 읽는 사이 메모리에 반영된 변경은 스냅샷보다 새롭습니다.
+                state.ranking.set(4, 1000)
+                return rows
+            state.player_repo.list_by_points = slow_snapshot
+
+            mismatches = await state.check_ranking()
+            assert mismatches == [(3, 30, 99)]
+            assert state.ranking.points(3) == 99
+            assert state.ranking.points(4) == 1000
+        finally:
+            bot.close()
+    asyncio.run(scenario())
@@ -0,0 +1,37 @@
+# tests/test_resolver.py
+
+import asyncio
+
+import discord
+
+from bench.fakes import FakeBot, FakeUser, _FakeHTTPResponse
+from core.memory_backend import MemorySupabase
+from core.resolver import mention
+
+def test_http_errors_fall_back_to_missing_without_caching():
+    async def scenario():
+        bot = FakeBot(MemorySupabase(), {1: FakeUser(1), 2: FakeUser(2)})
+        bot.get_user = lambda user_id: None  # 게이트웨이 캐시에 없는 유저
+        fetch_user = bot.fetch_user
+        failing = {2}
+
+        async def flaky_fetch(user_id):
+            if user_id in failing:
+                raise discord.HTTPException(_FakeHTTPResponse(503), "Service Unavailable")
+            return await fetch_user(user_id)
+        bot.fetch_user = flaky_fetch
+        try:
+            resolved = await bot.user_resolver.resolve_many([1, 2, 3])
+            assert resolved[1].id == 1
+            assert resolved[2] is None and resolved[3] is None
+            assert mention(resolved[2], 2) == "ID: 2 (찾을 수 없음)"
+
+            # 없는 유저(404)는 캐시되고, 일시적인 오류는 다음 조회에서 다시 시도합니다.
+            failing.clear()
+            calls = bot.user_resolver.rest_calls
+            resolved = await bot.user_resolver.resolve_many([2, 3])
+            assert resolved[2].id == 2 and resolved[3] is None
+            assert bot.user_resolver.rest_calls - calls == 1
+        finally:
+            bot.close()
+    asyncio.run(scenario())
@@ -0,0 +1,30 @@
+# tests/test_seasons.py
+
+from datetime import date, datetime, timezone
+
+from core.seasons import active_streak, current_season, next_streak, season_day
+
+def _utc(*args) -> datetime:
+    return datetime(*args, tzinfo=timezone.utc)
+
+def test_quarter_boundaries_follow_kst():
+    # 한국 시간 4월 1일 0시 = UTC 3월 31일 15시
+    assert current_season(now=_utc(2026, 3, 31, 14, 59, 59)) == '2026-Q1'
+    assert current_season(now=_utc(2026, 3, 31, 15, 0, 0)) == '2026-Q2'
+    assert current_season(now=_utc(2025, 12, 31, 14, 59, 59)) == '2025-Q4'
+    assert current_season(now=_utc(2025, 12, 31, 15, 0, 0)) == '2026-Q1'
+    assert current_season('시즌1', now=_utc(2026, 3, 31, 15, 0, 0)) == '시즌1'
+    assert season_day(_utc(2026, 3, 31, 15, 0, 0)) == date(2026, 4, 1)
+
+def test_streaks_count_consecutive_kst_days():
+    today = date(2026, 4, 1)
+    assert next_streak(0, None, today) == 1
+    assert next_streak(3, today, today) == 3             # 같은 날 여러 번 참여
+    assert next_streak(0, today, today) == 1
+    assert next_streak(3, date(2026, 3, 31), today) == 4  # 월/분기가 바뀌어도 이어집니다.
+    assert next_streak(3, date(2026, 3, 30), today) == 1  # 하루 빠지면 다시 1
+
+    assert active_streak(4, date(2026, 3, 31), today) == 4
+    assert active_streak(4, '2026-04-01', today) == 4
+    assert active_streak(4, date(2026, 3, 30), today) == 0
+    assert active_streak(4, None, today) == 0
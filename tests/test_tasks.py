@@ -0,0 +1,31 @@
+# tests/test_tasks.py
+
+import asyncio
+import gc
+
+from core.tasks import TaskSet
+
+def test_spawned_tasks_are_kept_alive_and_failures_logged(capsys):
+    async def scenario():
+        tasks = TaskSet("알림")
+        finished = []
+
+        async def slow():
+            await asyncio.sleep(0.01)
+            finished.append(1)
+
+        async def failing():
+            raise RuntimeError("boom")
+
+        for _ in range(5):
+            tasks.spawn(slow())
+        tasks.spawn(failing())
+        assert len(tasks) == 6
+        gc.collect()  # 호출한 쪽이 참조를 버려도 끝까지 실행됩니다.
+        await asyncio.sleep(0.05)
+        assert finished == [1] * 5
+        assert len(tasks) == 0
+    asyncio.run(scenario())
+    output = capsys.readouterr()
+    assert "알림 작업 오류: RuntimeError('boom')" in output.out
+    assert "Task exception was never retrieved" not in output.err
@@ -0,0 +1,48 @@
+# tests/test_teams.py
+
+import pytest
+
+from core.teams import balance_lobby, balance_pool, parse_tier
+
+RATINGS = [24, 21, 18, 15, 12, 10, 8, 6, 3, 0]
+
+def _same_team(split, i, j):
+    return (i in split.team_a) == (j in split.team_a)
+
+def test_parse_tier_aliases():
+    assert parse_tier('아이언 1') == 0
+    assert parse_tier('플레3') == 14
+    assert parse_tier('Immortal 2') == 22
+    assert parse_tier('레디언트') == 24
+    assert parse_tier('다이아') == 16  # 단계가 없으면 2단계
+    assert parse_tier('') is None
+    assert parse_tier('모름') is None
+
+def test_balance_lobby_respects_constraints():
+    split = balance_lobby(RATINGS)
+    assert sorted(split.team_a + split.team_b) == list(range(10))
+    assert len(split.team_a) == len(split.team_b) == 5
+    assert split.violations == 0
+    assert split.diff <= 1
+
+    # 상위 두 명을 같은 팀으로, 3위와 4위는 다른 팀으로
+    split = balance_lobby(RATINGS, together=[(0, 1)], apart=[(2, 3)])
+    assert split.violations == 0
+    assert _same_team(split, 0, 1)
+    assert not _same_team(split, 2, 3)
+
+    # 동시에 지킬 수 없는 조건은 위반 수로 알려줍니다.
+    split = balance_lobby(RATINGS, together=[(0, 1)], apart=[(0, 1)])
+    assert split.violations == 1
+
+def test_balance_pool_splits_into_lobbies():
+    ratings = [float(rating % 25) for rating in range(7, 7 + 30 * 7, 7)]
+    splits = balance_pool(ratings, together=[(0, 1)], apart=[(2, 3)])
+    assert len(splits) == 3
+    players = sorted(player for split in splits for player in split.team_a + split.team_b)
+    assert players == list(range(30))
+    assert all(split.violations == 0 for split in splits)
+    together = next(split for split in splits if 0 in split.team_a + split.team_b)
+    assert _same_team(together, 0, 1) and 1 in together.team_a + together.team_b
+    with pytest.raises(ValueError):
+        balance_pool(ratings[:15])
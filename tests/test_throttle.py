@@ -0,0 +1,46 @@
+# tests/test_throttle.py
+
+import asyncio
+
+import pytest
+
+from core.metrics import Metrics
+from core.throttle import Throttle, Throttled
+
+def test_concurrent_identical_requests_run_once():
+    async def scenario():
+        metrics = Metrics()
+        throttle = Throttle({'join': (1.0, 1)}, metrics=metrics)
+        calls = []
+
+        async def work():
+            calls.append(1)
+            await asyncio.sleep(0.01)
+            return 'ok'
+
+        results = await asyncio.gather(*(throttle.run('join', 1, 7, work) for _ in range(10)))
+        assert results == ['ok'] * 10
+        assert len(calls) == 1
+        # 합친 요청은 토큰을 쓰지 않으므로 버스트 1개로 충분합니다.
+        assert metrics.counters['throttle_deduped_total{scope="join"}'] == 9
+        assert 'throttle_rejected_total{scope="join"}' not in metrics.counters
+    asyncio.run(scenario())
+
+def test_requests_beyond_burst_are_rejected():
+    async def scenario():
+        metrics = Metrics()
+        throttle = Throttle({'points': (0.5, 2)}, metrics=metrics)
+
+        async def work():
+            return None
+
+        await throttle.run('points', 1, 7, work)
+        await throttle.run('points', 1, 7, work)
+        with pytest.raises(Throttled) as caught:
+            await throttle.run('points', 1, 7, work)
+        assert 0 < caught.value.retry_after <= 2
+        # 다른 유저/서버의 버킷에는 영향이 없습니다.
+        await throttle.run('points', 1, 8, work)
+        await throttle.run('points', 2, 7, work)
+        assert metrics.counters['throttle_rejected_total{scope="points"}'] == 1
+    asyncio.run(scenario())